@@ -0,0 +1,110 @@
+"""Performance benchmarks of the simulators framework. They are not part of
+the test suite, each module of this package can be executed on its own from
+the repository main directory, i.e.::
+
+    $ python -m benchmarks.engines
+
+Results are printed on the standard output as JSON, in order for different
+runs to be easily compared."""
+import json
+import os
+import socket
+import multiprocessing as mp
+
+
+def free_address():
+    """Returns a local address with a currently unused TCP port.
+
+    :return: the address
+    :rtype: (ip, port)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()
+
+
+def percentile(values, percent):
+    """Returns the given percentile of a list of values, using the nearest
+    rank method.
+
+    :param values: the list of values
+    :param percent: the desired percentile, between 0 and 100
+    :type values: list
+    :type percent: float
+
+    >>> percentile([1, 2, 3, 4], 50)
+    2
+    >>> percentile([1, 2, 3, 4], 99)
+    4
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return values[int(index)]
+
+
+def latency_summary(latencies):
+    """Summarizes a list of latencies, expressed in seconds, into a dictionary
+    of percentiles expressed in microseconds.
+
+    :param latencies: the list of measured latencies, in seconds
+    :type latencies: list
+    :return: the count of samples and their p50, p95, p99 and max values
+    :rtype: dict"""
+    summary = {'count': len(latencies)}
+    for name, percent in (('p50', 50), ('p95', 95), ('p99', 99)):
+        value = percentile(latencies, percent)
+        summary[f'{name}_us'] = round(value * 1e6, 1) if latencies else None
+    summary['max_us'] = round(max(latencies) * 1e6, 1) if latencies else None
+    return summary
+
+
+def process_threads(pid):
+    """Returns the number of threads of the given process.
+
+    :param pid: the process identifier
+    :type pid: int
+    :rtype: int"""
+    with open(f'/proc/{pid}/status', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('Threads:'):
+                return int(line.split()[1])
+    return None  # skip coverage
+
+
+def start_server(server):
+    """Runs the given `Server` object in a forked process, returning as soon
+    as the server is accepting connections.
+
+    :param server: the server to be started
+    :type server: simulators.server.Server
+    :return: the server process, to be terminated when done
+    :rtype: multiprocessing.Process"""
+    context = mp.get_context('fork')
+    started = context.Event()
+    process = context.Process(
+        target=server.serve_forever,
+        args=(started,),
+        daemon=True
+    )
+    process.start()
+    started.wait()
+    return process
+
+
+def stop_server(process):
+    """Terminates a server process started with `start_server`.
+
+    :param process: the process to be terminated
+    :type process: multiprocessing.Process"""
+    process.terminate()
+    process.join()
+
+
+def report(results):
+    """Prints the results of a benchmark as JSON.
+
+    :param results: the benchmark results
+    :type results: dict"""
+    results.setdefault('cpus', os.cpu_count())
+    print(json.dumps(results, indent=2))
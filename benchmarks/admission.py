@@ -0,0 +1,178 @@
+"""Measures how well the update thread of an ACU keeps its schedule while its
+sending server is hit by a connection storm, with and without the admission
+control enabled by the `max_connections` server option.
+
+The ACU publishes its status into a shared memory segment, by means of the
+`shared_memory` server option, and every status carries the
+`perf_counter()` time it has been built at. The benchmark polls the segment
+and reports the percentiles of the lateness of every status, with respect to
+the sampling time of the ACU. Meanwhile the storm clients, each one in a
+process of its own, keep as many connections as they can open to the
+sending server, closing the oldest one and opening a new one back to back.
+The peak number of threads of the server process and the counters of the
+admission control are reported as well.
+
+Usage::
+
+    $ python -m benchmarks.admission --duration 5 --clients 8 --limit 32
+"""
+import os
+import json
+import time
+import socket
+import threading
+import multiprocessing as mp
+from collections import deque
+from argparse import ArgumentParser
+from socketserver import ThreadingTCPServer
+from simulators.server import Server
+from simulators.shared_status import SharedStatusReader
+from benchmarks import (
+    free_address, latency_summary, process_threads, start_server,
+    stop_server, report
+)
+from benchmarks.unix import StampedSystem, STAMP
+
+
+SAMPLING_TIME = 0.01
+CONNECTIONS_PER_CLIENT = 64
+
+
+def _storm(address, deadline, results):
+    connections = deque()
+    opened = refused = 0
+    while time.perf_counter() < deadline:
+        if len(connections) >= CONNECTIONS_PER_CLIENT:
+            connections.popleft().close()
+        try:
+            connections.append(socket.create_connection(address, timeout=1))
+            opened += 1
+        except OSError:
+            refused += 1
+    for sock in connections:
+        sock.close()
+    results.put((opened, refused))
+
+
+def _lateness(name, deadline):
+    """Polls the shared memory segment and returns how late every status
+    has been built, with respect to the previous one and the sampling
+    time."""
+    lateness = []
+    while not os.path.exists(os.path.join('/dev/shm', name)):
+        time.sleep(0.01)
+    with SharedStatusReader(name) as reader:
+        while reader.read() is None:
+            time.sleep(0.01)
+        generation, status = reader.read()
+        stamp, = STAMP.unpack_from(status, 12)
+        while time.perf_counter() < deadline:
+            time.sleep(SAMPLING_TIME / 10)
+            current, status = reader.read()
+            if current == generation:
+                continue
+            current_stamp, = STAMP.unpack_from(status, 12)
+            interval = (current_stamp - stamp) / (current - generation)
+            lateness.append(max(0, interval - SAMPLING_TIME))
+            generation, stamp = current, current_stamp
+    return lateness
+
+
+def _counters(address):
+    """Asks the sending server for the counters of its admission control,
+    the answer is interleaved with the status stream."""
+    with socket.create_connection(address, timeout=5) as sock:
+        sock.sendall(b'$connections%%%%%')
+        received = b''
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return None
+            received += chunk
+            start = received.find(b'$connections:')
+            end = received.find(b'%%%%%', start)
+            if start >= 0 and end >= 0:
+                return json.loads(received[start + 13:end])
+
+
+def run(clients, duration, options):
+    """Runs the storm against an ACU served with the given options.
+
+    :param clients: the number of storm processes
+    :param duration: the duration of the run, in seconds
+    :param options: the server options
+    :return: the results of the run
+    :rtype: dict"""
+    address = free_address()
+    name = f'discos-admission-{address[1]}'
+    options = dict(options, shared_memory=name)
+    process = start_server(
+        Server(
+            StampedSystem, ThreadingTCPServer,
+            {'sampling_time': SAMPLING_TIME},
+            s_address=address, options=options
+        )
+    )
+    try:
+        baseline = latency_summary(_lateness(name, time.perf_counter() + 1))
+        context = mp.get_context('fork')
+        queue = context.Queue()
+        deadline = time.perf_counter() + duration
+        storm = [
+            context.Process(target=_storm, args=(address, deadline, queue))
+            for _ in range(clients)
+        ]
+        peak = []
+
+        def _sample():
+            while time.perf_counter() < deadline:
+                peak.append(process_threads(process.pid))
+                time.sleep(0.05)
+        sampler = threading.Thread(target=_sample)
+        for client in storm:
+            client.start()
+        sampler.start()
+        loaded = latency_summary(_lateness(name, deadline))
+        outcomes = [queue.get() for _ in storm]
+        for client in storm:
+            client.join()
+        sampler.join()
+        time.sleep(0.5)  # Let the server close the storm connections
+        counters = _counters(address)
+    finally:
+        stop_server(process)
+    return {
+        'idle_lateness': baseline,
+        'storm_lateness': loaded,
+        'connections_opened': sum(outcome[0] for outcome in outcomes),
+        'connections_refused': sum(outcome[1] for outcome in outcomes),
+        'server_threads': max(peak, default=None),
+        'admission': counters,
+    }
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--limit', type=int, default=32)
+    args = parser.parse_args()
+    results = {
+        'clients': args.clients,
+        'duration_s': args.duration,
+        'sampling_time_s': SAMPLING_TIME,
+    }
+    for name, options in (
+        ('unbounded', {}),
+        ('reject', {'max_connections': args.limit}),
+        ('evict_oldest', {
+            'max_connections': args.limit,
+            'admission': 'evict-oldest',
+        }),
+    ):
+        results[name] = run(args.clients, args.duration, options)
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Measures the CPU usage of an ACU sending server while the number of its
+subscribed clients grows.
+
+Every client keeps its connection open and reads the status messages from a
+single selector loop running in the benchmark process, so that the measured
+CPU time, read from `/proc`, only belongs to the server process. The number
+of received messages per second is reported too, to verify that every client
+keeps receiving the status at the expected rate.
+
+With ``--multicast`` the server publishes the status to a multicast group by
+means of the `multicast` server option, and the clients join the group
+instead of connecting to the server.
+
+Usage::
+
+    $ python -m benchmarks.broadcast --duration 5 --subscribers 1 10 100
+    $ python -m benchmarks.broadcast --multicast --subscribers 1 10 100
+"""
+import os
+import time
+import socket
+import selectors
+from argparse import ArgumentParser
+from socketserver import ThreadingTCPServer
+from simulators.server import Server
+from simulators.acu import System
+from simulators.broadcast import DatagramSubscriber, listen_datagrams
+from benchmarks import (
+    free_address, process_threads, start_server, stop_server, report
+)
+
+
+STATUS_LENGTH = 813
+
+
+def process_cpu_time(pid):
+    """Returns the CPU time spent by the given process, in seconds.
+
+    :param pid: the process identifier
+    :type pid: int
+    :rtype: float"""
+    with open(f'/proc/{pid}/stat', encoding='utf-8') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    # utime and stime are the 14th and 15th fields of the whole line
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def _read(selector, deadline, received):
+    while time.perf_counter() < deadline:
+        timeout = max(0, deadline - time.perf_counter())
+        for key, _ in selector.select(timeout):
+            try:
+                data = key.fileobj.recv(65536)
+            except BlockingIOError:  # skip coverage
+                continue
+            if key.fileobj.type == socket.SOCK_DGRAM:
+                data = DatagramSubscriber.unpack(data)[1]
+            received[key.fd] += len(data)
+
+
+def run(subscribers, duration, multicast=False):
+    """Connects the given number of clients to an ACU sending server and
+    measures the server CPU usage while they receive the status messages.
+
+    :param subscribers: the number of connected clients
+    :param duration: the duration of the measurement, in seconds
+    :param multicast: if True, the clients join the multicast group the
+        status is published to instead of connecting to the server
+    :return: the server CPU usage and the rate of received messages
+    :rtype: dict"""
+    address = free_address()
+    options = {'multicast': True} if multicast else {}
+    server = Server(
+        System, ThreadingTCPServer, {}, s_address=address, options=options
+    )
+    process = start_server(server)
+    selector = selectors.DefaultSelector()
+    sockets = []
+    results = {}
+    try:
+        for _ in range(subscribers):
+            if multicast:
+                sock = listen_datagrams(
+                    (DatagramSubscriber.default_group, address[1])
+                )
+            else:
+                sock = socket.create_connection(address, timeout=5)
+            sock.setblocking(False)
+            selector.register(sock, selectors.EVENT_READ)
+            sockets.append(sock)
+        received = {sock.fileno(): 0 for sock in sockets}
+        # Let every connection settle before measuring
+        _read(selector, time.perf_counter() + 1, received)
+        received = dict.fromkeys(received, 0)
+        cpu_start = process_cpu_time(process.pid)
+        _read(selector, time.perf_counter() + duration, received)
+        cpu = process_cpu_time(process.pid) - cpu_start
+        results['server_cpu_percent'] = round(cpu / duration * 100, 1)
+        results['server_threads'] = process_threads(process.pid)
+        rates = [
+            count / STATUS_LENGTH / duration for count in received.values()
+        ]
+        results['messages_per_second_min'] = round(min(rates), 1)
+        results['messages_per_second_max'] = round(max(rates), 1)
+    finally:
+        for sock in sockets:
+            selector.unregister(sock)
+            sock.close()
+        selector.close()
+        stop_server(process)
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument(
+        '--subscribers',
+        type=int,
+        nargs='+',
+        default=[1, 10, 50, 100, 200]
+    )
+    parser.add_argument('--multicast', action='store_true')
+    args = parser.parse_args()
+    results = {'duration_s': args.duration, 'multicast': args.multicast}
+    for subscribers in args.subscribers:
+        results[str(subscribers)] = run(
+            subscribers,
+            args.duration,
+            args.multicast
+        )
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Measures the latency of the `discos-simulator` command line interface,
+running each of the given actions multiple times in a fresh interpreter and
+reporting the wall time of the whole command.
+
+Usage::
+
+    $ python -m benchmarks.cli --repeat 5 --actions list status
+"""
+import os
+import sys
+import time
+import subprocess
+from argparse import ArgumentParser
+from benchmarks import percentile, report
+
+
+SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'scripts',
+    'discos-simulator'
+)
+
+
+def cli(*args, check=True):
+    """Runs the `discos-simulator` script with the given arguments,
+    discarding its output. The package of this repository is the one being
+    imported.
+
+    :param args: the command line arguments
+    :param check: whether to raise if the command fails
+    :type check: bool
+    :return: the completed process
+    :rtype: subprocess.CompletedProcess"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(SCRIPT))] + sys.path
+    )
+    return subprocess.run(
+        [sys.executable, SCRIPT] + list(args),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=check
+    )
+
+
+def run(args, repeat):
+    """Runs the command with the given arguments multiple times.
+
+    :param args: the command line arguments
+    :param repeat: how many times the command is run
+    :type args: list
+    :type repeat: int
+    :return: the median and the maximum wall time, in milliseconds
+    :rtype: dict"""
+    durations = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cli(*args, check=False)
+        durations.append(time.perf_counter() - t0)
+    return {
+        'p50_ms': round(percentile(durations, 50) * 1e3, 1),
+        'max_ms': round(max(durations) * 1e3, 1),
+    }
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument(
+        '--actions',
+        nargs='+',
+        default=['list', 'status']
+    )
+    args = parser.parse_args()
+    results = {'repeat': args.repeat}
+    for action in args.actions:
+        results[action] = run(action.split(), args.repeat)
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Measures how long the `discos-simulator` command line interface takes to
+query and to stop the running simulators.
+
+All the simulators are started at once, then the benchmark measures the
+`status` command, repeated multiple times, and the `stop` command of the
+Active Surface simulator alone (96 servers) and of all the remaining
+simulators. All the simulators must be stopped before running the
+benchmark.
+
+Usage::
+
+    $ python -m benchmarks.control --repeat 5
+"""
+import time
+from argparse import ArgumentParser
+from benchmarks import report
+from benchmarks.cli import cli, run as run_cli
+from benchmarks.zygote import simulator_pids
+
+
+def _timed(*args):
+    t0 = time.perf_counter()
+    cli(*args)
+    return round((time.perf_counter() - t0) * 1e3, 1)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    if simulator_pids():
+        parser.error('Stop the running simulators first.')
+    cli('--zygote', 'start')
+    results = {
+        'status': run_cli(['status'], args.repeat),
+        'stop_active_surface_ms': _timed('-s', 'active_surface', 'stop'),
+        'stop_all_ms': _timed('stop'),
+    }
+    while simulator_pids():
+        time.sleep(0.1)
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Compares the UDP servers of the framework serving a weather station.
+
+Every client sends a read request and waits for its answer, back to back,
+for the given duration, each one from its own socket. The benchmark is run
+against a `ThreadingUDPServer`, which spawns a thread for each datagram, an
+`AsyncUDPServer`, a `BatchedUDPServer` and as many `BatchedUDPServer`
+copies as the given workers, bound to the same port by means of the
+`reuse_port` server option. For each server the answered datagrams per
+second, the latency percentiles and the number of threads of the server
+processes are reported.
+
+Usage::
+
+    $ python -m benchmarks.datagrams --duration 5 --clients 16 --workers 4
+"""
+import os
+import socket
+import time
+import threading
+import multiprocessing as mp
+from argparse import ArgumentParser
+from socketserver import ThreadingUDPServer
+from simulators.server import Server, AsyncUDPServer, BatchedUDPServer
+from simulators.weather_station import System
+from benchmarks import (
+    free_address, latency_summary, process_threads, start_server,
+    stop_server, report
+)
+
+
+REQUEST = b'r th01'
+
+
+def _client(address, deadline, results):
+    latencies = []
+    timeouts = 0
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(1)
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            sock.sendto(REQUEST, address)
+            try:
+                sock.recv(1024)
+            except socket.timeout:
+                timeouts += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+    results.put((latencies, timeouts))
+
+
+def _run_clients(address, clients, duration, pids):
+    """Runs the clients in processes of their own, so that they are not
+    slowed down by the global interpreter lock of a single process. The
+    threads of the server processes are sampled meanwhile."""
+    context = mp.get_context('fork')
+    results = context.Queue()
+    deadline = time.perf_counter() + duration
+    peak = []
+
+    def _sample():
+        while time.perf_counter() < deadline:
+            peak.append(sum(process_threads(pid) for pid in pids))
+            time.sleep(0.05)
+    processes = [
+        context.Process(target=_client, args=(address, deadline, results))
+        for _ in range(clients)
+    ]
+    sampler = threading.Thread(target=_sample)
+    for process in processes:
+        process.start()
+    sampler.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    sampler.join()
+    latencies = [value for outcome in outcomes for value in outcome[0]]
+    timeouts = sum(outcome[1] for outcome in outcomes)
+    return latencies, timeouts, max(peak, default=None)
+
+
+def run(server_type, clients, duration, workers=1):
+    """Loads a weather station served by the given type of server.
+
+    :param server_type: the type of server to benchmark
+    :param clients: the number of concurrent clients
+    :param duration: the duration of the run, in seconds
+    :param workers: the number of server processes sharing the port, only
+        for the `BatchedUDPServer`
+    :return: the results of the run
+    :rtype: dict"""
+    address = free_address()
+    options = {'reuse_port': workers} if workers > 1 else {}
+    processes = [
+        start_server(
+            Server(System, server_type, {}, l_address=address, options=options)
+        )
+        for _ in range(workers)
+    ]
+    try:
+        latencies, timeouts, threads = _run_clients(
+            address, clients, duration, [p.pid for p in processes]
+        )
+    finally:
+        for process in processes:
+            stop_server(process)
+    results = latency_summary(latencies)
+    results['datagrams_per_second'] = round(len(latencies) / duration)
+    results['timeouts'] = timeouts
+    results['server_threads'] = threads
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    results = {
+        'clients': args.clients,
+        'duration_s': args.duration,
+    }
+    for name, server_type, workers in (
+        ('threading', ThreadingUDPServer, 1),
+        ('asyncio', AsyncUDPServer, 1),
+        ('batched', BatchedUDPServer, 1),
+        (f'batched_reuse_port_{args.workers}', BatchedUDPServer, args.workers),
+    ):
+        results[name] = run(server_type, args.clients, args.duration, workers)
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
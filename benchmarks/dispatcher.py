@@ -0,0 +1,116 @@
+"""Loads a receiver with many clients sending inquiries back to back, with
+the commands executed by the threads of the clients and by the single
+dispatcher thread enabled by the `single_writer` server option.
+
+Every client runs in a process of its own and sends an inquiry to an LNA
+board, waiting for its answer, for the given duration. For both runs the
+answered inquiries per second and the latency percentiles are reported;
+for the dispatcher run, its counters are reported as well: the maximum
+queue depth, the largest batch and the percentiles of the time the commands
+waited in the queue and of the time they took to be executed.
+
+Usage::
+
+    $ python -m benchmarks.dispatcher --duration 5 --clients 16
+"""
+import json
+import time
+import socket
+import multiprocessing as mp
+from argparse import ArgumentParser
+from socketserver import ThreadingTCPServer
+from simulators import receiver
+from simulators.receiver import DEFINITIONS as DEF
+from simulators.receiver.slaves import LNA
+from simulators.server import Server
+from benchmarks import (
+    free_address, latency_summary, start_server, stop_server, report
+)
+
+
+def _inquiry():
+    system = receiver.System(slave_type=LNA, feeds=7)
+    inquiry = DEF.CMD_SOH + '\x01\x01\x41\x00'
+    inquiry += system.checksum(inquiry) + DEF.CMD_ETX
+    return inquiry.encode('latin-1')
+
+
+def _client(address, deadline, results):
+    latencies = []
+    inquiry = _inquiry()
+    with socket.create_connection(address, timeout=2) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            sock.sendall(inquiry)
+            sock.recv(1024)
+            latencies.append(time.perf_counter() - t0)
+    results.put(latencies)
+
+
+def _dispatcher_counters(address):
+    with socket.create_connection(address, timeout=2) as sock:
+        sock.sendall(b'$dispatcher%%%%%')
+        response = b''
+        while not response.endswith(b'%%%%%'):
+            response += sock.recv(4096)
+    return json.loads(response[len(b'$dispatcher:'):-5])
+
+
+def run(clients, duration, single_writer):
+    """Loads a receiver with the given number of clients.
+
+    :param clients: the number of concurrent clients
+    :param duration: the duration of the run, in seconds
+    :param single_writer: whether the commands are executed by the
+        dispatcher thread
+    :return: the results of the run
+    :rtype: dict"""
+    address = free_address()
+    process = start_server(
+        Server(
+            receiver.System, ThreadingTCPServer,
+            {'slave_type': LNA, 'feeds': 7},
+            l_address=address,
+            options={'single_writer': single_writer}
+        )
+    )
+    try:
+        time.sleep(0.2)
+        context = mp.get_context('fork')
+        queue = context.Queue()
+        deadline = time.perf_counter() + duration
+        processes = [
+            context.Process(target=_client, args=(address, deadline, queue))
+            for _ in range(clients)
+        ]
+        for client in processes:
+            client.start()
+        latencies = [value for _ in processes for value in queue.get()]
+        for client in processes:
+            client.join()
+        counters = _dispatcher_counters(address)
+    finally:
+        stop_server(process)
+    results = latency_summary(latencies)
+    results['requests_per_second'] = round(len(latencies) / duration)
+    results['dispatcher'] = counters
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--clients', type=int, default=16)
+    args = parser.parse_args()
+    results = {
+        'clients': args.clients,
+        'duration_s': args.duration,
+        'client_threads': run(args.clients, args.duration, False),
+        'single_writer': run(args.clients, args.duration, True),
+    }
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
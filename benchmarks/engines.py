@@ -0,0 +1,126 @@
+"""Compares the threading engine of the framework with the asyncio one.
+
+Two workloads are run against a CalMux simulator for each engine:
+
+* `connections`: every client opens a new connection for each request, it
+  measures how many connections per second a server is able to accept;
+* `requests`: every client keeps its connection open and sends requests
+  back to back, it measures the request latency with many idle and busy
+  connections, along with the number of threads of the server process.
+
+Usage::
+
+    $ python -m benchmarks.engines --duration 5 --clients 8 --idle 200
+"""
+import socket
+import time
+import threading
+from argparse import ArgumentParser
+from socketserver import ThreadingTCPServer
+from simulators.server import Server, AsyncTCPServer
+from simulators.calmux import System
+from benchmarks import (
+    free_address, latency_summary, process_threads, start_server,
+    stop_server, report
+)
+
+
+REQUEST = b'?\n'
+
+
+def _connections_client(address, deadline, latencies):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        with socket.create_connection(address, timeout=5) as sock:
+            sock.sendall(REQUEST)
+            sock.recv(1024)
+        latencies.append(time.perf_counter() - t0)
+
+
+def _requests_client(address, deadline, latencies):
+    with socket.create_connection(address, timeout=5) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            sock.sendall(REQUEST)
+            sock.recv(1024)
+            latencies.append(time.perf_counter() - t0)
+
+
+def _run_clients(target, address, clients, duration):
+    deadline = time.perf_counter() + duration
+    latencies = [[] for _ in range(clients)]
+    threads = [
+        threading.Thread(target=target, args=(address, deadline, lat))
+        for lat in latencies
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return [value for lat in latencies for value in lat]
+
+
+def run(server_type, clients, duration, idle):
+    """Runs both workloads against a server of the given type.
+
+    :param server_type: the type of server to benchmark
+    :param clients: the number of concurrent clients
+    :param duration: the duration of each workload, in seconds
+    :param idle: the number of idle connections kept open during the
+        `requests` workload
+    :return: the results of the two workloads
+    :rtype: dict"""
+    address = free_address()
+    server = Server(System, server_type, {}, l_address=address)
+    process = start_server(server)
+    results = {}
+    try:
+        latencies = _run_clients(
+            _connections_client, address, clients, duration
+        )
+        results['connections'] = latency_summary(latencies)
+        results['connections']['per_second'] = round(
+            len(latencies) / duration
+        )
+
+        idle_sockets = [
+            socket.create_connection(address, timeout=5) for _ in range(idle)
+        ]
+        time.sleep(0.5)
+        latencies = _run_clients(
+            _requests_client, address, clients, duration
+        )
+        results['requests'] = latency_summary(latencies)
+        results['requests']['per_second'] = round(len(latencies) / duration)
+        results['requests']['server_threads'] = process_threads(process.pid)
+        for sock in idle_sockets:
+            sock.close()
+    finally:
+        stop_server(process)
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--idle', type=int, default=200)
+    args = parser.parse_args()
+    results = {
+        'clients': args.clients,
+        'idle_connections': args.idle,
+        'duration_s': args.duration,
+    }
+    for name, server_type in (
+        ('threading', ThreadingTCPServer),
+        ('asyncio', AsyncTCPServer),
+    ):
+        results[name] = run(
+            server_type, args.clients, args.duration, args.idle
+        )
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Microbenchmark of the framing stage of the custom commands, comparing the
+`CustomFraming` class with the previous framing, which looked at every
+received byte for the custom header and, once found one, accumulated every
+following byte until a tail came.
+
+Each workload is a stream of 1 KB chunks, as read from the socket of a
+client, fed to a new framing for each run:
+
+* `ascii`: the commands of a text protocol, with no custom command;
+* `binary`: ACU commands, whose floating point fields contain the custom
+  header, with no custom command;
+* `custom`: the commands of a text protocol, interleaved with custom
+  commands.
+
+The costs are reported in nanoseconds per received byte, as the best of a
+few repeated runs, along with the number of custom commands found, which
+must be the same for both framings but for the false positives of the
+previous one.
+
+Usage::
+
+    $ python -m benchmarks.framing --chunks 100
+"""
+from argparse import ArgumentParser
+from simulators.acu.acu_utils import Command, ParameterCommand
+from simulators.framing import CustomFraming
+from benchmarks import report
+from benchmarks.micro import best_time
+
+
+class BytewiseFraming:
+    """The previous framing of the custom commands, kept as a reference."""
+
+    def __init__(self, header='$', tail='%%%%%'):
+        self.header = header
+        self.tail = tail
+        self.custom_msg = ''
+
+    def feed(self, data):
+        """Scans a chunk of bytes one byte at a time.
+
+        :param data: the received chunk of bytes
+        :type data: bytes
+        :return: the bodies of the custom commands completed by the chunk
+        :rtype: list of strings"""
+        commands = []
+        msg = str(data, 'latin-1')
+        if not self.custom_msg and self.header not in msg:
+            return commands
+        for byte in msg:
+            if byte == self.header:
+                self.custom_msg = byte
+            elif self.custom_msg.startswith(self.header):
+                self.custom_msg += byte
+                if self.custom_msg.endswith(self.tail):
+                    commands.append(self.custom_msg[1:-len(self.tail)])
+                    self.custom_msg = ''
+        return commands
+
+
+def _chunks(frame, size=1024):
+    data = frame * (size // len(frame) + 1)
+    return data[:size]
+
+
+def workloads():
+    """Returns the received chunk of every workload.
+
+    :rtype: dict"""
+    # A time offset of 10.25 seconds carries a `$` byte
+    acu = Command(ParameterCommand(1, 11, 10.25, 10.25)).get()
+    return {
+        'ascii': _chunks(b'#command:a,b%%%%%'),
+        'binary': _chunks(acu.encode('latin-1')),
+        'custom': _chunks(b'#command:a,b%%%%%' * 4 + b'$stats%%%%%'),
+    }
+
+
+def _feed(framing_class, chunk, chunks):
+    framing = framing_class()
+    found = 0
+    for _ in range(chunks):
+        found += len(framing.feed(chunk))
+    return found
+
+
+def bench(chunk, chunks):
+    """Measures both framings on the given stream of chunks.
+
+    :param chunk: the chunk of bytes received over and over
+    :param chunks: the number of chunks of the stream
+    :type chunk: bytes
+    :type chunks: int
+    :return: the cost per byte and the custom commands found by each
+        framing
+    :rtype: dict"""
+    results = {}
+    for name, framing_class in (
+        ('bytewise', BytewiseFraming),
+        ('chunked', CustomFraming),
+    ):
+        seconds = best_time(_feed, (framing_class, chunk, chunks))
+        results[name] = {
+            'ns_per_byte': round(seconds * 1e9 / (len(chunk) * chunks), 2),
+            'commands': _feed(framing_class, chunk, chunks),
+        }
+    results['speedup'] = round(
+        results['bytewise']['ns_per_byte']
+        / results['chunked']['ns_per_byte'],
+        1
+    )
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--chunks', type=int, default=100)
+    args = parser.parse_args()
+    results = {'chunks': args.chunks}
+    for name, chunk in workloads().items():
+        results[name] = bench(chunk, args.chunks)
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
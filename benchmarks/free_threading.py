@@ -0,0 +1,108 @@
+"""Loads many receivers, all served by the threads of a single process, with
+clients sending inquiries back to back, in order to compare the builds of
+the interpreter with and without the global interpreter lock. The clients of
+a system take turns, since a system parses the bytes of a single client at a
+time, so the load is spread among the given number of systems: with the GIL
+the threads of the server process take turns as well, no matter how many
+systems they serve, while a free-threaded build lets them run in parallel.
+
+Every client runs in a process of its own and sends an inquiry to an LNA
+board of one of the systems, waiting for its answer, for the given duration.
+The run is repeated with a single system and with the given number of
+systems, reporting the answered inquiries per second and the latency
+percentiles of both, along with the version of the interpreter and whether
+its GIL is enabled.
+
+Usage::
+
+    $ python3.13 -m benchmarks.free_threading --duration 5 --clients 16
+    $ python3.13t -m benchmarks.free_threading --duration 5 --clients 16
+"""
+import sys
+import time
+import threading
+import multiprocessing as mp
+from argparse import ArgumentParser
+from socketserver import ThreadingTCPServer
+from simulators import receiver
+from simulators.receiver.slaves import LNA
+from simulators.server import Server
+from benchmarks import free_address, latency_summary, report
+from benchmarks.dispatcher import _client
+
+
+def _serve(addresses, started):
+    for address in addresses:
+        Server(
+            receiver.System, ThreadingTCPServer,
+            {'slave_type': LNA, 'feeds': 7},
+            l_address=address
+        ).start()
+    started.set()
+    threading.Event().wait()
+
+
+def run(clients, duration, systems):
+    """Loads the given number of systems, served by a single process.
+
+    :param clients: the number of concurrent clients, spread among the
+        systems
+    :param duration: the duration of the run, in seconds
+    :param systems: the number of systems
+    :return: the results of the run
+    :rtype: dict"""
+    addresses = [free_address() for _ in range(systems)]
+    context = mp.get_context('fork')
+    started = context.Event()
+    process = context.Process(
+        target=_serve,
+        args=(addresses, started),
+        daemon=True
+    )
+    process.start()
+    try:
+        started.wait()
+        queue = context.Queue()
+        deadline = time.perf_counter() + duration
+        processes = [
+            context.Process(
+                target=_client,
+                args=(addresses[index % systems], deadline, queue)
+            )
+            for index in range(clients)
+        ]
+        for client in processes:
+            client.start()
+        latencies = [value for _ in processes for value in queue.get()]
+        for client in processes:
+            client.join()
+    finally:
+        process.terminate()
+        process.join()
+    results = latency_summary(latencies)
+    results['requests_per_second'] = round(len(latencies) / duration)
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--systems', type=int, default=4)
+    args = parser.parse_args()
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)
+    results = {
+        'python': sys.version,
+        'gil_enabled': is_gil_enabled(),
+        'clients': args.clients,
+        'duration_s': args.duration,
+        'one_system': run(args.clients, args.duration, 1),
+        f'{args.systems}_systems': run(
+            args.clients, args.duration, args.systems
+        ),
+    }
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
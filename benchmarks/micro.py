@@ -0,0 +1,361 @@
+"""Microbenchmarks of the parsers of every simulator and of the conversion
+helpers of the `simulators.utils` module. Everything runs in the current
+process, with no socket involved, so the results only depend on the code
+and on the machine running it.
+
+Each system is fed a sequence of valid commands, recorded here as they are
+sent by the DISCOS components, both one byte at a time through
+`System.parse()` and as a whole chunk through `System.parse_bytes()`. The
+commands are checked once before being timed: a command raising an error
+aborts the benchmark, since it would not measure the intended code path.
+The costs are reported in nanoseconds per byte and per command (per call
+for the conversion helpers), as the best of a few repeated runs.
+
+The results are printed as JSON, optionally written to a file too, and they
+can be compared with the ones of a previous run, in order to spot a
+regression::
+
+    $ python -m benchmarks.micro --output baseline.json
+    $ python -m benchmarks.micro --compare baseline.json
+    $ python -m benchmarks.micro --filter 'acu|utils.real'
+"""
+import re
+import sys
+import json
+import time
+import platform
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from simulators import utils
+from benchmarks import report
+
+
+def _acu():
+    # pylint: disable=import-outside-toplevel
+    from simulators import acu
+    from simulators.acu.acu_utils import Command, ModeCommand, ParameterCommand
+    # `Command.get` waits 1ms after each command, so the counters differ
+    frames = [
+        Command(ModeCommand(1, 7)).get(),  # AZ stop
+        Command(ModeCommand(2, 7), ModeCommand(1, 7)).get(),
+        Command(ParameterCommand(1, 11, 0.5, 0.5)).get(),  # Time offset
+    ]
+    return acu.System(), frames
+
+
+def _active_surface():
+    # pylint: disable=import-outside-toplevel
+    from simulators import active_surface
+    from simulators.active_surface import command_library
+    system = active_surface.System(min_usd_index=1, max_usd_index=17)
+    frames = []
+    for driver in system.drivers.values():
+        driver.delay_multiplier = 0
+        frames.append(command_library.get_position(usd_index=driver.usd_index))
+        frames.append(command_library.get_status(usd_index=driver.usd_index))
+        frames.append(command_library.set_absolute_position(
+            1000, usd_index=driver.usd_index
+        ))
+    return system, frames
+
+
+def _receiver():
+    # pylint: disable=import-outside-toplevel
+    from simulators import receiver
+    from simulators.receiver import DEFINITIONS as DEF
+    from simulators.receiver.slaves import LNA
+    system = receiver.System(slave_type=LNA, feeds=7)
+    inquiry = DEF.CMD_SOH + '\x01\x01\x41\x00'
+    inquiry += system.checksum(inquiry) + DEF.CMD_ETX
+    get_port = DEF.CMD_SOH + '\x01\x01\x4C\x00\x03\x00\x00\x00'
+    get_port += system.checksum(get_port) + DEF.CMD_ETX
+    return system, [inquiry, get_port]
+
+
+def _system(module_name, *frames, **kwargs):
+    def workload():
+        # pylint: disable=import-outside-toplevel
+        import importlib
+        module = importlib.import_module(f'simulators.{module_name}')
+        return module.System(**kwargs), list(frames)
+    return workload
+
+
+#: The function building each workload, by name: it returns the `System`
+#: instance and the list of its commands.
+workloads = {
+    'acu': _acu,
+    'active_surface': _active_surface,
+    'backend.sardara': _system(
+        'backend.sardara',
+        '?status\r\n', '?get-configuration\r\n', '?get-integration\r\n',
+        '?time\r\n',
+    ),
+    'backend.mistral': _system(
+        'backend.mistral',
+        '?status\r\n', '?get-configuration\r\n', '?time\r\n',
+    ),
+    'calmux': _system('calmux', '?\n', 'C 1\n', 'C 0\n'),
+    'dbesm': _system(
+        'dbesm',
+        'DBE GETSTATUS BOARD 1\r\n', 'DBE GETCOMP BOARD 1\r\n',
+        'DBE GETFIRM BOARD 1\r\n',
+    ),
+    'gaia': _system('gaia', '#*IDN? 1\n', '#CONF? 2\n', '#SETD 1 0 3\n'),
+    'if_distributor.IFD': _system(
+        'if_distributor.IFD', '? 0\n', 'S 0 10 2300 1\n',
+    ),
+    'if_distributor.IFD_14_channels': _system(
+        'if_distributor.IFD_14_channels',
+        '#ATT 00?\n', '#SWT 00 001\n', '#SWT 00?\n',
+    ),
+    'lo.generic_LO': _system(
+        'lo.generic_LO', 'FREQ?\n', 'POWER?\n', 'OUTP:STAT?\n',
+    ),
+    'lo.w_LO': _system(
+        'lo.w_LO',
+        'get W_LO_status\r\n', 'set LO_att_PolH=9.22\r\n',
+        'get LO_att_PolH\r\n',
+    ),
+    'minor_servos': _system(
+        'minor_servos', 'STATUS\r\n', 'STATUS=SRP\r\n', 'STATUS=GFR\r\n',
+    ),
+    'mscu': _system(
+        'mscu',
+        '#getpos:0=1\r\n', '#getappstatus:1=2\r\n', '#getstatus:2=3\r\n',
+    ),
+    'receiver': _receiver,
+    'solar_attenuator': _system(
+        'solar_attenuator', 'set W_passthrough\r\n', 'get W_mode\r\n',
+    ),
+    'switch_matrix': _system(
+        'switch_matrix',
+        'get IF_switch_config\r\n', 'set IF_switch_config=2\r\n',
+    ),
+    'totalpower': _system('totalpower', '?\n', 'I B 0 1\n', 'T 0 0\n'),
+    'weather_station': _system('weather_station', 'r th01\n', 'r vh01\n'),
+}
+
+
+_date = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+
+#: The conversion helpers of the `simulators.utils` module, by name, along
+#: with their arguments and the number of bytes they convert.
+codecs = {
+    'checksum': (utils.checksum, ('\x01\x01\x41\x00' * 4,), 16),
+    'binary_complement': (
+        utils.binary_complement, ('11110000' * 4, '01010101' * 4), 4
+    ),
+    'twos_to_int': (utils.twos_to_int, ('11111011' * 4,), 4),
+    'int_to_twos': (utils.int_to_twos, (-5,), 4),
+    'binary_to_bytes': (utils.binary_to_bytes, ('10101010' * 4,), 4),
+    'binary_to_string': (utils.binary_to_string, ('10101010' * 4,), 4),
+    'bytes_to_int': (utils.bytes_to_int, (b'\xfb\xff\xff\xff',), 4),
+    'string_to_int': (utils.string_to_int, ('\xfb\xff\xff\xff',), 4),
+    'bytes_to_binary': (utils.bytes_to_binary, (b'\xfb\xff\xff\xff',), 4),
+    'string_to_binary': (utils.string_to_binary, ('\xfb\xff\xff\xff',), 4),
+    'bytes_to_uint': (utils.bytes_to_uint, (b'\xfb\xff\xff\xff',), 4),
+    'string_to_uint': (utils.string_to_uint, ('\xfb\xff\xff\xff',), 4),
+    'real_to_binary': (utils.real_to_binary, (180.5, 2), 8),
+    'real_to_bytes': (utils.real_to_bytes, (180.5, 2), 8),
+    'real_to_string': (utils.real_to_string, (180.5, 2), 8),
+    'bytes_to_real': (
+        utils.bytes_to_real, (utils.real_to_bytes(180.5, 2), 2), 8
+    ),
+    'string_to_real': (
+        utils.string_to_real, (utils.real_to_string(180.5, 2), 2), 8
+    ),
+    'int_to_bytes': (utils.int_to_bytes, (-5,), 4),
+    'int_to_string': (utils.int_to_string, (-5,), 4),
+    'uint_to_bytes': (utils.uint_to_bytes, (5,), 4),
+    'uint_to_string': (utils.uint_to_string, (5,), 4),
+    'sign': (utils.sign, (-5.0,), None),
+    'mjd': (utils.mjd, (_date,), None),
+    'mjd_to_date': (utils.mjd_to_date, (utils.mjd(_date),), None),
+    'day_microseconds': (utils.day_microseconds, (_date,), None),
+    'day_milliseconds': (utils.day_milliseconds, (_date,), None),
+    'day_percentage': (utils.day_percentage, (_date,), None),
+}
+
+
+def _bytewise(system, stream):
+    for byte in stream:
+        try:
+            system.parse(byte)
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+
+def _chunked(system, data):
+    system.parse_bytes(data)
+
+
+def best_time(function, args, min_time=0.2, repeat=5):
+    """Times the given function, in the same way of `timeit`: the number of
+    calls is doubled until they take at least `min_time` seconds, then the
+    calls are repeated `repeat` times and the fastest run is taken.
+
+    :param function: the function to be timed
+    :param args: the positional arguments of the function
+    :param min_time: the minimum duration of a run, in seconds
+    :param repeat: the number of runs
+    :type function: callable
+    :type args: tuple
+    :type min_time: float
+    :type repeat: int
+    :return: the seconds taken by a single call
+    :rtype: float"""
+    def _run(number):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            function(*args)
+        return time.perf_counter() - t0
+
+    number = 1
+    while True:
+        elapsed = _run(number)
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed
+    for _ in range(repeat - 1):
+        best = min(best, _run(number))
+    return best / number
+
+
+def check(system, frames):
+    """Parses each command once, in order to make sure it is valid.
+
+    :param system: the system parsing the commands
+    :param frames: the commands
+    :type system: simulators.common.ListeningSystem
+    :type frames: list
+    :raises ValueError: if a command causes an error"""
+    for frame in frames:
+        for outcome in system.parse_bytes(frame.encode('latin-1')):
+            if isinstance(outcome, Exception):
+                raise ValueError(
+                    f'{type(system).__module__}: invalid command '
+                    + f'{frame!r}: {outcome!r}'
+                )
+
+
+def bench_system(name, min_time=0.2, repeat=5):
+    """Measures the parsing cost of the commands of a workload.
+
+    :param name: the name of the workload, see `workloads`
+    :param min_time: the minimum duration of a run, see `best_time`
+    :param repeat: the number of runs, see `best_time`
+    :type name: str
+    :type min_time: float
+    :type repeat: int
+    :return: the number of commands and bytes of the workload and, both for
+        `parse` and `parse_bytes`, the nanoseconds per byte and per command
+    :rtype: dict"""
+    system, frames = workloads[name]()
+    try:
+        check(system, frames)
+        stream = ''.join(frames)
+        data = stream.encode('latin-1')
+        results = {'commands': len(frames), 'bytes': len(data)}
+        for method, function, argument in (
+            ('parse', _bytewise, stream),
+            ('parse_bytes', _chunked, data),
+        ):
+            seconds = best_time(function, (system, argument), min_time, repeat)
+            results[method] = {
+                'ns_per_byte': round(seconds / len(data) * 1e9, 1),
+                'ns_per_command': round(seconds / len(frames) * 1e9, 1),
+            }
+    finally:
+        system.system_stop()
+    return results
+
+
+def bench_codec(name, min_time=0.2, repeat=5):
+    """Measures the cost of a conversion helper.
+
+    :param name: the name of the helper, see `codecs`
+    :param min_time: the minimum duration of a run, see `best_time`
+    :param repeat: the number of runs, see `best_time`
+    :type name: str
+    :type min_time: float
+    :type repeat: int
+    :return: the nanoseconds per call and, for the helpers converting a
+        given number of bytes, per byte
+    :rtype: dict"""
+    function, args, size = codecs[name]
+    seconds = best_time(function, args, min_time, repeat)
+    results = {'ns_per_call': round(seconds * 1e9, 1)}
+    if size:
+        results['ns_per_byte'] = round(seconds / size * 1e9, 1)
+    return results
+
+
+def compare(results, baseline):
+    """Adds to each measurement the ratio with the same measurement of a
+    previous run, values greater than 1 meaning slower.
+
+    :param results: the results of the current run
+    :param baseline: the results of the previous run
+    :type results: dict
+    :type baseline: dict"""
+    for section in ('systems', 'codecs'):
+        for name, entry in results.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous:
+                continue
+            values = [(entry, previous)]
+            values += [
+                (entry[method], previous.get(method, {}))
+                for method in ('parse', 'parse_bytes') if method in entry
+            ]
+            for current, old in values:
+                for key in ('ns_per_command', 'ns_per_call'):
+                    if key in current and old.get(key):
+                        current['ratio'] = round(current[key] / old[key], 2)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--min-time', type=float, default=0.2)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument(
+        '--filter',
+        default='',
+        help='Regular expression selecting the workloads, i.e. '
+        + "'acu|utils.real'"
+    )
+    parser.add_argument('--output', help='Also write the results to a file')
+    parser.add_argument('--compare', help='Results of a previous run')
+    args = parser.parse_args()
+    selected = re.compile(args.filter)
+    results = {
+        'python': sys.version.split()[0],
+        'machine': platform.machine(),
+        'min_time_s': args.min_time,
+        'repeat': args.repeat,
+        'systems': {},
+        'codecs': {},
+    }
+    for name in workloads:
+        if selected.search(name):
+            results['systems'][name] = bench_system(
+                name, args.min_time, args.repeat
+            )
+    for name in codecs:
+        if selected.search(f'utils.{name}'):
+            results['codecs'][name] = bench_codec(
+                name, args.min_time, args.repeat
+            )
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
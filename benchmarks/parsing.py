@@ -0,0 +1,138 @@
+"""Measures the throughput of the parsers of the ACU, active surface and
+receiver systems, comparing the byte-wise path (every received byte passed
+on its own to `System.parse()`, as the `ListenHandler` used to do) with the
+chunked one (a whole `recv()` chunk passed to `System.parse_bytes()`).
+
+Each workload is a stream of valid messages, received in chunks of the given
+size.
+
+Usage::
+
+    $ python -m benchmarks.parsing --duration 2 --chunk 1024
+"""
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from simulators import utils, acu, active_surface, receiver
+from simulators.acu.acu_utils import Command, ProgramTrackCommand
+from simulators.active_surface import command_library
+from simulators.receiver import DEFINITIONS as DEF
+from simulators.receiver.slaves import LNA
+from benchmarks import report
+
+
+def _bytewise(system, data):
+    """The byte-wise parsing loop of the `ListenHandler`, before the
+    introduction of `System.parse_bytes()`, without sending the responses."""
+    responses = []
+    custom_msg = ''
+    for byte in data:
+        byte = chr(byte)
+        try:
+            response = system.parse(byte)
+        except ValueError:
+            response = None
+        if isinstance(response, bool):
+            pass
+        elif response and isinstance(response, str):
+            responses.append(response)
+        if byte == '$':
+            custom_msg = byte
+        elif custom_msg.startswith('$'):
+            custom_msg += byte
+    return responses
+
+
+def _chunked(system, data):
+    return system.parse_bytes(data)
+
+
+def _acu_workload():
+    """Program track commands with 50 entries, 1058 bytes each. Two
+    commands with different counters are alternated, in order not to be
+    discarded as duplicated."""
+    start_time = datetime.now(timezone.utc) + timedelta(days=1)
+    messages = b''
+    for _ in range(2):
+        pt_command = ProgramTrackCommand(
+            load_mode=1,
+            start_time=utils.mjd(start_time),
+            axis_rates=(0.5, 0.5)
+        )
+        for entry in range(50):
+            pt_command.add_entry(entry * 1000, 180, 89)
+        messages += Command(pt_command).get().encode('latin-1')
+        time.sleep(0.01)  # Next command counter
+    return acu.System(), messages
+
+
+def _active_surface_workload():
+    """Position requests and absolute positioning commands to all the USDs
+    of a line."""
+    system = active_surface.System(min_usd_index=1, max_usd_index=17)
+    messages = ''
+    for driver in system.drivers.values():
+        driver.delay_multiplier = 0
+        messages += command_library.get_position(usd_index=driver.usd_index)
+        messages += command_library.set_absolute_position(
+            1000, usd_index=driver.usd_index
+        )
+    return system, messages.encode('latin-1')
+
+
+def _receiver_workload():
+    """Extended inquiries and extended get port commands."""
+    system = receiver.System(slave_type=LNA, feeds=7)
+    inquiry = DEF.CMD_SOH + '\x01\x01\x41\x00'
+    inquiry += system.checksum(inquiry) + DEF.CMD_ETX
+    get_port = DEF.CMD_SOH + '\x01\x01\x4C\x00\x03\x00\x00\x00'
+    get_port += system.checksum(get_port) + DEF.CMD_ETX
+    return system, ((inquiry + get_port) * 8).encode('latin-1')
+
+
+def _measure(function, system, stream, chunk, duration):
+    chunks = [stream[i:i + chunk] for i in range(0, len(stream), chunk)]
+    received = 0
+    deadline = time.perf_counter() + duration
+    t0 = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for data in chunks:
+            function(system, memoryview(data))
+        received += len(stream)
+    elapsed = time.perf_counter() - t0
+    return {
+        'MB_per_s': round(received / elapsed / 1e6, 3),
+        'ns_per_byte': round(elapsed / received * 1e9, 1),
+    }
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--duration', type=float, default=2.0)
+    parser.add_argument('--chunk', type=int, default=1024)
+    args = parser.parse_args()
+    results = {'chunk_bytes': args.chunk, 'duration_s': args.duration}
+    for name, workload in (
+        ('acu', _acu_workload),
+        ('active_surface', _active_surface_workload),
+        ('receiver', _receiver_workload),
+    ):
+        results[name] = {}
+        for mode, function in (('bytewise', _bytewise), ('chunked', _chunked)):
+            system, messages = workload()
+            # Repeat the messages in order to fill at least a chunk
+            stream = messages * (args.chunk // len(messages) + 1)
+            results[name][mode] = _measure(
+                function, system, stream, args.chunk, args.duration
+            )
+            system.system_stop()
+        results[name]['speedup'] = round(
+            results[name]['chunked']['MB_per_s']
+            / results[name]['bytewise']['MB_per_s'],
+            2
+        )
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Measures the latency seen by a pipelining client, that sends a whole batch
+of requests with a single write and then waits for all the responses, with
+and without the `tcp_nodelay` and `coalesce_responses` server options.
+
+The workloads are the position requests to all the USDs of an active surface
+line and the extended inquiries to a receiver board. For each combination of
+options the latency of a whole batch is reported, along with the average
+number of `recv()` calls the client needed to collect its responses.
+
+Usage::
+
+    $ python -m benchmarks.pipelining --duration 2 --batch 17
+"""
+import socket
+import time
+from argparse import ArgumentParser
+from socketserver import ThreadingTCPServer
+from simulators import active_surface, receiver
+from simulators.active_surface import command_library
+from simulators.receiver import DEFINITIONS as DEF
+from simulators.receiver.slaves import LNA
+from simulators.server import Server
+from benchmarks import (
+    free_address, latency_summary, start_server, stop_server, report
+)
+
+
+def _active_surface_requests(batch):
+    setup = command_library.set_response_delay(0)  # Broadcast, no answer
+    requests = ''
+    for index in range(batch):
+        requests += command_library.get_position(usd_index=index % 17 + 1)
+    return setup.encode('latin-1'), requests.encode('latin-1')
+
+
+def _receiver_requests(batch):
+    inquiry = DEF.CMD_SOH + '\x01\x01\x41\x00'
+    inquiry += receiver.System.checksum(inquiry) + DEF.CMD_ETX
+    return b'', (inquiry * batch).encode('latin-1')
+
+
+workloads = {
+    'active_surface': (
+        active_surface.System,
+        {'min_usd_index': 1, 'max_usd_index': 17},
+        _active_surface_requests,
+    ),
+    'receiver': (
+        receiver.System,
+        {'slave_type': LNA, 'feeds': 7},
+        _receiver_requests,
+    ),
+}
+
+
+def _pipeline(address, setup, requests, duration):
+    """Sends the batch of requests over and over, returns the latencies of
+    the batches and the average number of reads for each batch."""
+    latencies = []
+    reads = 0
+    with socket.create_connection(address, timeout=5) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if setup:
+            sock.sendall(setup)
+            time.sleep(0.1)
+        # The first batch tells us how long the whole answer is
+        sock.sendall(requests)
+        time.sleep(0.5)
+        sock.settimeout(0.5)
+        expected = len(sock.recv(65536))
+        sock.settimeout(5)
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            sock.sendall(requests)
+            received = 0
+            while received < expected:
+                received += len(sock.recv(65536))
+                reads += 1
+            latencies.append(time.perf_counter() - t0)
+    return latencies, round(reads / max(len(latencies), 1), 2)
+
+
+def run(workload, options, batch, duration):
+    """Runs the pipelining client against a simulator started with the given
+    server options.
+
+    :param workload: the name of the workload, see `workloads`
+    :param options: the server options
+    :param batch: the number of requests of each batch
+    :param duration: the duration of the measurement, in seconds
+    :type workload: str
+    :type options: dict
+    :type batch: int
+    :type duration: float
+    :return: the latency summary of the batches
+    :rtype: dict"""
+    system_cls, kwargs, requests = workloads[workload]
+    setup, requests = requests(batch)
+    address = free_address()
+    server = Server(
+        system_cls,
+        ThreadingTCPServer,
+        kwargs,
+        l_address=address,
+        options=options
+    )
+    process = start_server(server)
+    try:
+        latencies, reads = _pipeline(address, setup, requests, duration)
+    finally:
+        stop_server(process)
+    results = latency_summary(latencies)
+    results['reads_per_batch'] = reads
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--duration', type=float, default=2.0)
+    parser.add_argument('--batch', type=int, default=17)
+    args = parser.parse_args()
+    results = {'batch': args.batch, 'duration_s': args.duration}
+    for workload in workloads:
+        results[workload] = {}
+        for tcp_nodelay in (False, True):
+            for coalesce_responses in (False, True):
+                options = {
+                    'tcp_nodelay': tcp_nodelay,
+                    'coalesce_responses': coalesce_responses,
+                }
+                name = (
+                    f'nodelay={int(tcp_nodelay)},'
+                    + f'coalesce={int(coalesce_responses)}'
+                )
+                results[workload][name] = run(
+                    workload, options, args.batch, args.duration
+                )
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Measures the footprint of a simulator when its servers are distributed
+to a given number of worker processes.
+
+For each simulator and number of workers, a fresh process starts the whole
+simulator and reports:
+
+* `startup_s`: the time elapsed until every server is accepting clients;
+* `processes`: the number of processes hosting the servers;
+* `threads`: the total number of threads of those processes;
+* `rss_mb`: the sum of their resident set sizes, pages shared between
+  forked processes are counted once per process;
+* `pss_mb`: the sum of their proportional set sizes, which splits shared
+  pages among the processes sharing them.
+
+Usage::
+
+    $ python -m benchmarks.sharding --systems active_surface receiver \\
+        --workers 1 4 96
+"""
+import io
+import os
+import time
+import contextlib
+import multiprocessing as mp
+from argparse import ArgumentParser
+from simulators.server import Simulator
+from benchmarks import process_threads, report
+
+
+def process_memory(pid):
+    """Returns the resident and the proportional set sizes of the given
+    process, in bytes.
+
+    :param pid: the process identifier
+    :type pid: int
+    :return: the RSS and the PSS of the process
+    :rtype: (int, int)"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup', encoding='utf-8') as f:
+        for line in f:
+            fields = line.split()
+            if fields[0] in ('Rss:', 'Pss:'):
+                values[fields[0]] = int(fields[1]) * 1024
+    return values['Rss:'], values['Pss:']
+
+
+def _measure(system, workers, results):
+    t0 = time.perf_counter()
+    simulator = Simulator(system, workers=workers)
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulator.start(daemon=True)
+    startup = time.perf_counter() - t0
+    # The first worker is a thread of this process
+    pids = [os.getpid()] + [
+        p.pid for p in simulator.processes
+        if isinstance(p, mp.process.BaseProcess)
+    ]
+    memory = [process_memory(pid) for pid in pids]
+    results.put({
+        'startup_s': round(startup, 3),
+        'processes': len(pids),
+        'threads': sum(process_threads(pid) for pid in pids),
+        'rss_mb': round(sum(rss for rss, _ in memory) / 2**20, 1),
+        'pss_mb': round(sum(pss for _, pss in memory) / 2**20, 1),
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulator.stop()
+
+
+def run(system, workers):
+    """Starts the given simulator with the given number of workers inside a
+    fresh process, and measures its footprint.
+
+    :param system: the name of the simulator
+    :param workers: the number of workers, None for a worker per server
+    :type system: str
+    :type workers: int
+    :return: the measured values
+    :rtype: dict"""
+    context = mp.get_context('fork')
+    results = context.Queue()
+    process = context.Process(
+        target=_measure,
+        args=(system, workers, results)
+    )
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument(
+        '--systems',
+        nargs='+',
+        default=['active_surface', 'receiver']
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        nargs='+',
+        default=[1, 4, 96]
+    )
+    args = parser.parse_args()
+    results = {}
+    for system in args.systems:
+        results[system] = {
+            str(workers): run(system, workers) for workers in args.workers
+        }
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
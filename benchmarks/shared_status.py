@@ -0,0 +1,77 @@
+"""Compares how long a co-located tool takes to get the latest status of an
+ACU through the shared memory segment created by the `shared_memory` server
+option, and through the sending server, by connecting to it and reading the
+first status message it receives, as a tool that only needs the latest
+status has to do otherwise.
+
+Usage::
+
+    $ python -m benchmarks.shared_status --reads 100000 --connections 50
+"""
+import time
+import socket
+from argparse import ArgumentParser
+from socketserver import ThreadingTCPServer
+from simulators.server import Server
+from simulators.acu import System
+from simulators.shared_status import SharedStatusReader
+from benchmarks import (
+    free_address, latency_summary, start_server, stop_server, report
+)
+
+
+STATUS_LENGTH = 813
+
+
+def _shared_memory(name, reads):
+    latencies = []
+    with SharedStatusReader(name) as reader:
+        while reader.read() is None:
+            time.sleep(0.01)
+        for _ in range(reads):
+            t0 = time.perf_counter()
+            reader.read()
+            latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def _connection(address, connections):
+    latencies = []
+    for _ in range(connections):
+        t0 = time.perf_counter()
+        with socket.create_connection(address, timeout=2) as sock:
+            received = 0
+            while received < STATUS_LENGTH:
+                received += len(sock.recv(STATUS_LENGTH - received))
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--reads', type=int, default=100000)
+    parser.add_argument('--connections', type=int, default=50)
+    args = parser.parse_args()
+    address = free_address()
+    process = start_server(
+        Server(
+            System, ThreadingTCPServer, {},
+            s_address=address, options={'shared_memory': True}
+        )
+    )
+    try:
+        results = {
+            'shared_memory': latency_summary(
+                _shared_memory(f'discos-acu-{address[1]}', args.reads)
+            ),
+            'tcp_connection': latency_summary(
+                _connection(address, args.connections)
+            ),
+        }
+    finally:
+        stop_server(process)
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
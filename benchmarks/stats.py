@@ -0,0 +1,103 @@
+"""Measures the overhead of the `stats` server option, by running a client
+that sends a request and waits for its answer over and over, against a
+simulator started with and without the option.
+
+The workloads are the frequency inquiry of a local oscillator, whose
+commands are parsed one byte at a time, and the extended inquiry of a
+receiver board, whose messages are consumed a whole chunk at once. For each
+workload the round trip latency and the throughput are reported.
+
+Usage::
+
+    $ python -m benchmarks.stats --duration 3
+"""
+import socket
+import time
+from argparse import ArgumentParser
+from socketserver import ThreadingTCPServer
+from simulators import receiver
+from simulators.lo import generic_LO
+from simulators.receiver import DEFINITIONS as DEF
+from simulators.receiver.slaves import LNA
+from simulators.server import Server
+from benchmarks import (
+    free_address, latency_summary, start_server, stop_server, report
+)
+
+
+def _receiver_request():
+    inquiry = DEF.CMD_SOH + '\x01\x01\x41\x00'
+    inquiry += receiver.System.checksum(inquiry) + DEF.CMD_ETX
+    return inquiry.encode('latin-1')
+
+
+workloads = {
+    'lo': (generic_LO.System, {}, lambda: b'FREQ?\n'),
+    'receiver': (
+        receiver.System,
+        {'slave_type': LNA, 'feeds': 7},
+        _receiver_request,
+    ),
+}
+
+
+def _round_trips(address, request, duration):
+    """Sends the request over and over, returns the round trip latencies."""
+    latencies = []
+    with socket.create_connection(address, timeout=5) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            sock.sendall(request)
+            sock.recv(65536)
+            latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def run(workload, options, duration):
+    """Runs the client against a simulator started with the given server
+    options.
+
+    :param workload: the name of the workload, see `workloads`
+    :param options: the server options
+    :param duration: the duration of the measurement, in seconds
+    :type workload: str
+    :type options: dict
+    :type duration: float
+    :return: the latency summary of the requests and the throughput
+    :rtype: dict"""
+    system_cls, kwargs, request = workloads[workload]
+    address = free_address()
+    server = Server(
+        system_cls,
+        ThreadingTCPServer,
+        kwargs,
+        l_address=address,
+        options=options
+    )
+    process = start_server(server)
+    try:
+        latencies = _round_trips(address, request(), duration)
+    finally:
+        stop_server(process)
+    results = latency_summary(latencies)
+    results['requests_per_s'] = round(len(latencies) / duration)
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--duration', type=float, default=3.0)
+    args = parser.parse_args()
+    results = {'duration_s': args.duration}
+    for workload in workloads:
+        results[workload] = {
+            'disabled': run(workload, {}, args.duration),
+            'enabled': run(workload, {'stats': True}, args.duration),
+        }
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
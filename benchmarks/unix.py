@@ -0,0 +1,163 @@
+"""Compares the latency experienced by a co-located client connected to a
+simulator through its TCP port and through the AF_UNIX socket exposed by the
+`unix_socket` server option.
+
+Two paths are measured, for both the threading and the event loop servers:
+
+* the ACU status stream: the time elapsed from the moment the status message
+  is built to the moment the client has read it completely. The ACU is run
+  with a short sampling time and its status carries the `perf_counter()`
+  time it has been built at, which is shared by all the processes;
+* the receiver request/response path: a client sends an inquiry to an LNA
+  board and waits for its answer, back to back.
+
+Usage::
+
+    $ python -m benchmarks.unix --duration 5
+"""
+import os
+import time
+import socket
+import struct
+import shutil
+import tempfile
+from argparse import ArgumentParser
+from socketserver import ThreadingTCPServer
+from simulators import acu, receiver
+from simulators.receiver import DEFINITIONS as DEF
+from simulators.receiver.slaves import LNA
+from simulators.server import Server, AsyncTCPServer
+from benchmarks import (
+    free_address, latency_summary, start_server, stop_server, report
+)
+
+
+STATUS_LENGTH = 813
+STAMP = struct.Struct('d')
+
+
+class StampedSystem(acu.System):
+    """An ACU whose status carries the time it has been built at, in place of
+    the first bytes of its general status."""
+
+    @staticmethod
+    def _update_status(status, statuses):
+        acu.System._update_status(  # pylint: disable=protected-access
+            status,
+            statuses
+        )
+        STAMP.pack_into(status, 12, time.perf_counter())
+
+
+def _inquiry():
+    system = receiver.System(slave_type=LNA, feeds=7)
+    inquiry = DEF.CMD_SOH + '\x01\x01\x41\x00'
+    inquiry += system.checksum(inquiry) + DEF.CMD_ETX
+    return inquiry.encode('latin-1')
+
+
+def _socket_path(directory, system, address):
+    name = system.__module__.rsplit('.', 1)[-1]
+    return os.path.join(directory, f'{name}-{address[1]}.sock')
+
+
+def _connect(transport, address, path):
+    if transport == 'unix':
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+    else:
+        sock = socket.create_connection(address)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.settimeout(2)
+    return sock
+
+
+def _status_latencies(sock, duration):
+    latencies = []
+    buffer = bytearray(STATUS_LENGTH)
+    view = memoryview(buffer)
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        received = 0
+        while received < STATUS_LENGTH:
+            received += sock.recv_into(view[received:])
+        stamp, = STAMP.unpack_from(buffer, 12)
+        latencies.append(time.perf_counter() - stamp)
+    return latencies
+
+
+def _request_latencies(sock, duration):
+    latencies = []
+    inquiry = _inquiry()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        sock.sendall(inquiry)
+        sock.recv(1024)
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def run(path, server_type, duration):
+    """Measures the given path of a simulator over TCP and over its AF_UNIX
+    socket.
+
+    :param path: `status` for the ACU status stream, `request` for the
+        receiver request/response path
+    :param server_type: the type of the server
+    :param duration: the duration of each measurement, in seconds
+    :return: the latencies over each transport
+    :rtype: dict"""
+    directory = tempfile.mkdtemp()
+    address = free_address()
+    options = {'unix_socket': directory}
+    if path == 'status':
+        system = StampedSystem
+        server = Server(
+            system, server_type, {'sampling_time': 0.01},
+            s_address=address, options=options
+        )
+        measure = _status_latencies
+    else:
+        system = receiver.System
+        server = Server(
+            system, server_type, {'slave_type': LNA, 'feeds': 7},
+            l_address=address, options=options
+        )
+        measure = _request_latencies
+    process = start_server(server)
+    results = {}
+    try:
+        for transport in ('tcp', 'unix'):
+            sock = _connect(
+                transport,
+                address,
+                _socket_path(directory, system, address)
+            )
+            with sock:
+                measure(sock, 0.5)  # Warm up
+                results[transport] = latency_summary(measure(sock, duration))
+    finally:
+        stop_server(process)
+        shutil.rmtree(directory)
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+    results = {'duration_s': args.duration}
+    for name, server_type in (
+        ('threading', ThreadingTCPServer),
+        ('asyncio', AsyncTCPServer),
+    ):
+        results[name] = {
+            'acu_status': run('status', server_type, args.duration),
+            'receiver_request': run('request', server_type, args.duration),
+        }
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
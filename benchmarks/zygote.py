@@ -0,0 +1,94 @@
+"""Compares the two ways the `discos-simulator` script starts all the
+simulators at once: a fresh interpreter for each simulator, or a single
+zygote process forking all of them (the ``--zygote`` flag).
+
+For each mode it reports the wall time the `start` command takes to report
+every simulator as up and running, along with the number of processes and
+the total proportional set size of the simulators, which splits the pages
+shared by forked processes among them. All the simulators must be stopped
+before running the benchmark.
+
+Usage::
+
+    $ python -m benchmarks.zygote
+"""
+import os
+import time
+from argparse import ArgumentParser
+from simulators.zygote import process_name_prefix
+from benchmarks import report
+from benchmarks.cli import cli
+from benchmarks.sharding import process_memory
+
+
+def simulator_pids():
+    """Returns the identifiers of the processes of the running simulators,
+    whether they were started by a zygote or not.
+
+    :rtype: list"""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            with open(f'/proc/{entry}/comm', encoding='utf-8') as f:
+                comm = f.read().strip()
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                cmdline = f.read()
+        except OSError:  # skip coverage
+            continue  # The process has just exited
+        if (
+            comm.startswith(process_name_prefix)
+            or b'discos-simulator' in cmdline
+        ):
+            pids.append(int(entry))
+    return pids
+
+
+def run(zygote, settle):
+    """Starts and stops all the simulators, measuring their startup time and
+    memory footprint.
+
+    :param zygote: whether to start the simulators from a zygote
+    :param settle: seconds to wait before measuring the memory
+    :type zygote: bool
+    :type settle: float
+    :return: the measured values
+    :rtype: dict"""
+    args = ['--zygote', 'start'] if zygote else ['start']
+    t0 = time.perf_counter()
+    cli(*args)
+    startup = time.perf_counter() - t0
+    time.sleep(settle)
+    pids = simulator_pids()
+    pss = 0
+    for pid in pids:
+        try:
+            pss += process_memory(pid)[1]
+        except OSError:  # skip coverage
+            pass
+    cli('stop')
+    while simulator_pids():
+        time.sleep(0.1)
+    return {
+        'startup_s': round(startup, 2),
+        'processes': len(pids),
+        'pss_mb': round(pss / 2**20, 1),
+    }
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--settle', type=float, default=2.0)
+    args = parser.parse_args()
+    if simulator_pids():
+        parser.error('Stop the running simulators first.')
+    report({
+        'settle_s': args.settle,
+        'popen': run(False, args.settle),
+        'zygote': run(True, args.settle),
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@ import time
 from threading import Thread, Event
 from socketserver import ThreadingTCPServer
 from simulators import utils
-from simulators.common import ListeningSystem
+from simulators.common import ListeningSystem, Outcomes
 from simulators.active_surface.usd import USD
 
 
@@ -66,6 +66,11 @@ class System(ListeningSystem):
     delay_step = 0.000512  # 512 microseconds
     slope_time = 10  # msec
 
+    session_state = {'msg': '', 'msg_to_all': False, 'expected_bytes': 0}
+
+    # The responses are delayed as the ones of the real drivers
+    blocking = True
+
     def __init__(self, min_usd_index=0, max_usd_index=31):
         self.initialized = False
         if min_usd_index < 0 or min_usd_index > 31:
@@ -83,6 +88,8 @@ class System(ListeningSystem):
         self._set_default()
         self.stop = Event()
         self.min_usd_index = min_usd_index
+        # The dictionary is never changed once filled, every driver guards
+        # its own state with a lock shared with the positioning thread
         self.drivers = {}
         for index in range(min_usd_index, max_usd_index + 1):
             self.drivers[index] = USD(index)
@@ -152,6 +159,30 @@ class System(ListeningSystem):
                 self.expected_bytes -= 1
                 return True
 
+    def parse_bytes(self, data):
+        """Parses a whole chunk of bytes. The first 3 bytes and the last byte
+        of each message go through the `parse()` method, the parameters in
+        between are appended to the message all at once.
+
+        :param data: the received chunk of bytes.
+        :type data: bytes-like object
+        :return: the responses to be sent back to the client and the
+            exceptions raised while parsing malformed messages.
+        :rtype: Outcomes"""
+        responses = Outcomes()
+        data = str(data, 'latin-1')
+        index = 0
+        while index < len(data):
+            if len(self.msg) >= 3 and self.expected_bytes > 0:
+                chunk = data[index:index + self.expected_bytes]
+                self.msg += chunk
+                self.expected_bytes -= len(chunk)
+                index += len(chunk)
+            else:
+                self._parse_byte(data[index], responses)
+                index += 1
+        return responses
+
     def _parse(self, msg):
         """While the `parse` method receives the incoming commands and checks
         for their correctness, this method performs the actual parsing and
@@ -1,8 +1,21 @@
 import time
+import functools
 from queue import Queue
+from threading import Lock
 from simulators.utils import sign
 
 
+def _synchronized(method):
+    """Makes the decorated method of a `USD` hold the lock of the driver, so
+    that the commands of the clients and the positioning thread of the line
+    never see each other's changes half done."""
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        with self.lock:
+            return method(self, *args)
+    return wrapper
+
+
 class USD:
     """USD actuator driver implementation.
 
@@ -46,6 +59,7 @@ class USD:
     }
 
     def __init__(self, usd_index):
+        self.lock = Lock()
         self._set_default()
         self.last_movement = None
         self.usd_index = usd_index
@@ -98,11 +112,13 @@ class USD:
         USD takes approximately 100ms to boot back up."""
         t0 = time.time()
 
-        self._set_default()
+        with self.lock:
+            self._set_default()
 
         elapsed_time = time.time() - t0
         time.sleep(max(self.driver_reset_delay - elapsed_time, 0))
 
+    @_synchronized
     def soft_trigger(self):
         """Implements the TRIGGER event for the delayed execution of USD
         movements. Whenever this command is received, if there is at least
@@ -125,6 +141,7 @@ class USD:
         :rtype: list"""
         return self.version
 
+    @_synchronized
     def soft_stop(self):
         """Immediate stop. The USD stops even if it did not completed its
         previous positioning movement."""
@@ -138,6 +155,7 @@ class USD:
         :rtype: int"""
         return self.current_position
 
+    @_synchronized
     def get_status(self):
         """Returns the USD current status.
 
@@ -233,6 +251,7 @@ class USD:
         :type position: int between -2147483648 and 2147483647"""
         self.reference_position = position
 
+    @_synchronized
     def set_io_pins(self, param):
         """Sets the direction of the I/O pins and their values whenever a pin
         is configured as outbound.
@@ -292,6 +311,7 @@ class USD:
         :type multiplier: int"""
         self.delay_multiplier = multiplier
 
+    @_synchronized
     def set_delayed_execution(self, param):
         """Enables or disables the delayed execution of positioning commands.
 
@@ -324,6 +344,7 @@ class USD:
         # Empty the position queue
         self.position_queue = Queue()
 
+    @_synchronized
     def set_absolute_position(self, position):
         """Receives an absolute position to which the USD will have to move.
         If the positioning strategy is set to immediate and the USD is not
@@ -352,6 +373,7 @@ class USD:
             self.cmd_position = cmd_position
         return True
 
+    @_synchronized
     def set_relative_position(self, position):
         """Receives a relative position to which the USD will have to move in
         respect to its current position. If the positioning strategy is set to
@@ -381,6 +403,7 @@ class USD:
             self.cmd_position = cmd_position
         return True
 
+    @_synchronized
     def rotate(self, rotation_sign):
         """Starts moving the USD indefinitely. The direction of the movement
         corresponds is given by the sign parameter. It accounts for
@@ -400,6 +423,7 @@ class USD:
             self.cmd_position = rotation_sign * self.out_of_scale_position
             return True
 
+    @_synchronized
     def set_velocity(self, velocity):
         """Starts moving the USD at a given frequency, bypassing the
         acceleration ramp. This is useful whenever the USD has to behave as a
@@ -518,6 +542,7 @@ class USD:
         self.baud_rate = self.baud_rates.get(int(binary_string[7], 2))
         #  params[1] is currently unused
 
+    @_synchronized
     def calc_position(self, now, elapsed):
         """Calculates the current position of the USD considering its current
         status and previously set parameters, along with the elapsed time since
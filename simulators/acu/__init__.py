@@ -1,10 +1,12 @@
+import json
 import time
 from datetime import datetime, timedelta, timezone
 from threading import Thread, Event
 from queue import Queue, Empty
 from socketserver import ThreadingTCPServer
 from simulators import utils
-from simulators.common import ListeningSystem, SendingSystem
+from simulators.broadcast import BroadcastHub
+from simulators.common import ListeningSystem, SendingSystem, Outcomes
 from simulators.acu.general_status import GeneralStatus
 from simulators.acu.axis_status import MasterAxisStatus, SlaveAxisStatus
 from simulators.acu.pointing_status import PointingStatus
@@ -44,6 +46,8 @@ class System(ListeningSystem, SendingSystem):
 
     default_sampling_time = 0.1
 
+    session_state = {'msg': '', 'msg_length': 0, 'cmds_number': 0}
+
     def __init__(self, sampling_time=default_sampling_time):
         self._set_default()
         self.stop = Event()
@@ -85,22 +89,18 @@ class System(ListeningSystem, SendingSystem):
         self._update_subsystems(subsystems)
 
         statuses = []
-        statuses.append(self.GS.status)
-        statuses.append(self.AZ.status)
-        statuses.append(self.EL.status)
-        statuses.append(self.CW.status)
-        for motor in self.AZ.motor_status:
-            statuses.append(motor.status)
-        for motor in self.EL.motor_status:
-            statuses.append(motor.status)
-        for motor in self.CW.motor_status:
-            statuses.append(motor.status)
-        statuses.append(self.PS.status)
-        statuses.append(self.FS.status)
+        statuses.append(self.GS)
+        statuses.append(self.AZ)
+        statuses.append(self.EL)
+        statuses.append(self.CW)
+        statuses.extend(self.AZ.motor_status)
+        statuses.extend(self.EL.motor_status)
+        statuses.extend(self.CW.motor_status)
+        statuses.append(self.PS)
+        statuses.append(self.FS)
         self._update_status(self.status, statuses)
 
-        self.subscribe_q = Queue()
-        self.unsubscribe_q = Queue()
+        self.hub = BroadcastHub()
 
         args = (
             self.stop,
@@ -111,8 +111,7 @@ class System(ListeningSystem, SendingSystem):
             self.command_threads,
             self._update_subsystems,
             self._update_status,
-            self.subscribe_q,
-            self.unsubscribe_q
+            self.hub.publish
         )
 
         self.update_thread = Thread(
@@ -178,6 +177,48 @@ class System(ListeningSystem, SendingSystem):
 
         return True
 
+    @classmethod
+    def command_name(cls, data):
+        """Returns the name the given chunk of bytes is accounted under by
+        the server statistics: the first command of the message the chunk
+        starts with, i.e. `mode_command`, or `binary` for a chunk that does
+        not start a message, see `ListeningSystem.command_name()`.
+
+        :param data: the received chunk of bytes.
+        :type data: bytes-like object
+        :return: the name of the command the chunk starts with.
+        :rtype: string"""
+        header = bytes(data[:18])
+        if len(header) == 18 and header[:4] == start_flag.encode('latin-1'):
+            command = cls.commands.get(utils.bytes_to_uint(header[16:18]))
+            if command:
+                return command.lstrip('_')
+        return super().command_name(data)
+
+    def parse_bytes(self, data):
+        """Parses a whole chunk of bytes. The 16 bytes header and the last
+        byte of each message go through the `parse()` method, while the
+        commands in between are appended to the message all at once, since
+        they are only checked when the message is complete.
+
+        :param data: the received chunk of bytes.
+        :type data: bytes-like object
+        :return: the exceptions raised while parsing malformed messages.
+        :rtype: Outcomes"""
+        responses = Outcomes()
+        data = str(data, 'latin-1')
+        index = 0
+        while index < len(data):
+            missing = self.msg_length - len(self.msg) - 1
+            if len(self.msg) >= 16 and missing > 0:
+                chunk = data[index:index + missing]
+                self.msg += chunk
+                index += len(chunk)
+            else:
+                self._parse_byte(data[index], responses)
+                index += 1
+        return responses
+
     @staticmethod
     def _update_subsystems(update_functions):
         for update_function in update_functions:
@@ -185,31 +226,21 @@ class System(ListeningSystem, SendingSystem):
 
     @staticmethod
     def _update_status(status, statuses):
-        payload = b''
-        for subsystem_status in statuses:
-            payload += bytes(subsystem_status)
+        # The status buffer is only ever written by the update thread, the
+        # other threads read the snapshot published to the hub. The status
+        # of each subsystem is copied under its own lock, while the command
+        # threads might be changing it, see `LockedStatus`
+        payload = b''.join(subsystem.snapshot() for subsystem in statuses)
         status[8:12] = utils.uint_to_bytes(utils.day_milliseconds())
         status[12:-4] = payload
 
     @staticmethod
     def _update_loop(stop, sampling_time, status, subsystems, statuses,
-                     cmd_queue, update_subsystems, update_status,
-                     subscribe_q, unsubscribe_q):
+                     cmd_queue, update_subsystems, update_status, publish):
         command_threads = []
         nxt = None
         counter = 0
-        subscribers = []
         while not stop.is_set():
-            try:
-                sub = subscribe_q.get_nowait()
-                subscribers.append(sub)
-            except Empty:
-                pass
-            try:
-                sub = unsubscribe_q.get_nowait()
-                subscribers.remove(sub)
-            except Empty:
-                pass
             try:
                 command_threads.append(cmd_queue.get_nowait())
             except Empty:
@@ -224,13 +255,7 @@ class System(ListeningSystem, SendingSystem):
 
             if counter % 20 == 0:
                 update_status(status, statuses)
-                for q in subscribers:
-                    while True:
-                        try:
-                            q.get_nowait()
-                        except Empty:
-                            break
-                    q.put(bytes(status))
+                publish(status)
                 now = utils.bytes_to_real(status[721:729], precision=2)
                 now = utils.mjd_to_date(now)
                 counter = 0
@@ -253,10 +278,20 @@ class System(ListeningSystem, SendingSystem):
             cmd_queue.put(command_thread)
 
     def subscribe(self, q):
-        self.subscribe_q.put(q)
+        self.hub.subscribe(q)
 
     def unsubscribe(self, q):
-        self.unsubscribe_q.put(q)
+        self.hub.unsubscribe(q)
+
+    def subscribers(self):
+        """Custom command that reports the counters of the status
+        subscribers, so that a stalled client can be spotted: how many
+        messages each of them has been sent, how many were sent late or had
+        to be dropped.
+
+        :return: the counters, as a JSON object wrapped in the custom
+            command header and tail"""
+        return f'$subscribers:{json.dumps(self.hub.counters())}%%%%%'
 
     def _parse_commands(self, msg):
         cmds_number = utils.string_to_int(msg[12:16])
@@ -1,9 +1,10 @@
 import time
 from simulators import utils
+from simulators.acu.locked_status import LockedStatus
 from simulators.acu.motor_status import MotorStatus
 
 
-class SimpleAxisStatus:
+class SimpleAxisStatus(LockedStatus):
     """
     :param n_motors: The number of motors that move the axis.
     """
@@ -1455,49 +1456,53 @@ class MasterAxisStatus(SimpleAxisStatus):
                 desired_pos,
                 desired_rate
             )
-            if counter == self.curr_mode_counter:
-                if self.axis_state == 3 and not self.stowed:
-                    self.v_Ist = desired_rate
-                    self.p_Ist = current_pos
+            # The position and the rate are changed at once
+            with self.status_lock:
+                if counter == self.curr_mode_counter:
+                    if self.axis_state == 3 and not self.stowed:
+                        self.v_Ist = desired_rate
+                        self.p_Ist = current_pos
+                    else:
+                        self.v_Ist = 0
+
+                    if self.p_Ist == desired_pos:
+                        self.v_Ist = 0
+                        return True
                 else:
                     self.v_Ist = 0
-
-                if self.p_Ist == desired_pos:
-                    self.v_Ist = 0
-                    return True
-            else:
-                self.v_Ist = 0
-                return False
+                    return False
             time.sleep(0.01)
         return True
 
     def update_status(self):
         """This method is called to update some of the values before comparison
         or sending."""
-        if self.stow_pos:
-            self.stowPosOk = float(self.p_Ist) / 1000000 in self.stow_pos
-        if self.p_Ist == int(round(self.min_pos * 1000000)):
-            self.Pre_Limit_Dn = True
-            self.Fin_Limit_Dn = False
-        elif self.p_Ist < int(round(self.min_pos * 1000000)):
-            self.Pre_Limit_Dn = True
-            self.Fin_Limit_Dn = True
-        else:
-            self.Pre_Limit_Dn = False
-            self.Fin_Limit_Dn = False
-        if self.p_Ist == int(round(self.max_pos * 1000000)):
-            self.Pre_Limit_Up = True
-            self.Fin_Limit_Up = False
-        elif self.p_Ist > int(round(self.max_pos * 1000000)):
-            self.Pre_Limit_Up = True
-            self.Fin_Limit_Up = True
-        else:
-            self.Pre_Limit_Up = False
-            self.Fin_Limit_Up = False
-        if abs(self.v_Ist) > int(round(self.max_velocity * 1000000)):
-            self.Rate_Limit = True
-        else:
-            self.Rate_Limit = False
+        # The limits are changed all at once, see `LockedStatus`
+        with self.status_lock:
+            if self.stow_pos:
+                self.stowPosOk = float(self.p_Ist) / 1000000 in self.stow_pos
+            if self.p_Ist == int(round(self.min_pos * 1000000)):
+                self.Pre_Limit_Dn = True
+                self.Fin_Limit_Dn = False
+            elif self.p_Ist < int(round(self.min_pos * 1000000)):
+                self.Pre_Limit_Dn = True
+                self.Fin_Limit_Dn = True
+            else:
+                self.Pre_Limit_Dn = False
+                self.Fin_Limit_Dn = False
+            if self.p_Ist == int(round(self.max_pos * 1000000)):
+                self.Pre_Limit_Up = True
+                self.Fin_Limit_Up = False
+            elif self.p_Ist > int(round(self.max_pos * 1000000)):
+                self.Pre_Limit_Up = True
+                self.Fin_Limit_Up = True
+            else:
+                self.Pre_Limit_Up = False
+                self.Fin_Limit_Up = False
+            if abs(self.v_Ist) > int(round(self.max_velocity * 1000000)):
+                self.Rate_Limit = True
+            else:
+                self.Rate_Limit = False
 
     # -------------------- Mode Command --------------------
 
@@ -1,7 +1,8 @@
 from simulators import utils
+from simulators.acu.locked_status import LockedStatus
 
 
-class FacilityStatus:
+class FacilityStatus(LockedStatus):
 
     def __init__(self):
         self.status = bytearray(16)
@@ -1,7 +1,8 @@
 from simulators import utils
+from simulators.acu.locked_status import LockedStatus
 
 
-class GeneralStatus:
+class GeneralStatus(LockedStatus):
     """General status of the ACU. This status holds generic informations
     about the ACU, like its firmware version, the interlock statuses and
     human-machine interfaces status."""
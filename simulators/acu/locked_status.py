@@ -0,0 +1,32 @@
+from threading import RLock
+
+
+class LockedStatus:
+    """Base class of the statuses of the ACU subsystems, whose fields are
+    encoded into their `status` buffer by the property setters. Many setters
+    read a whole word of the buffer and write it back in order to change a
+    single bit, while the command threads, the update thread and the
+    serialization of the status message all access the same buffer. Every
+    attribute of a subsystem is therefore set while holding its own
+    `status_lock`, which is held as well while the buffer gets copied, see
+    `snapshot()`. The lock is reentrant, so a method that changes several
+    fields at once can hold it for all of them, in order for the status
+    message to never carry only some of them."""
+
+    def __new__(cls, *_, **__):
+        self = super().__new__(cls)
+        object.__setattr__(self, 'status_lock', RLock())
+        return self
+
+    def __setattr__(self, name, value):
+        with self.status_lock:
+            super().__setattr__(name, value)
+
+    def snapshot(self):
+        """Returns a copy of the status buffer, taken while no field of the
+        subsystem is being written.
+
+        :return: the encoded status of the subsystem.
+        :rtype: bytes"""
+        with self.status_lock:
+            return bytes(self.status)
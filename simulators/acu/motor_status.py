@@ -1,7 +1,8 @@
 from simulators import utils
+from simulators.acu.locked_status import LockedStatus
 
 
-class MotorStatus:
+class MotorStatus(LockedStatus):
     """This class holds the status of a generic axis motor."""
 
     def __init__(self):
@@ -13,9 +13,10 @@ except ImportError as ex:
     raise ImportError('The `scipy` package, required for the simulator'
         + ' to run, is missing!') from ex
 from simulators import utils
+from simulators.acu.locked_status import LockedStatus
 
 
-class PointingStatus:
+class PointingStatus(LockedStatus):
     """This class handles the trajectory generation for the antenna axes.
 
     :param azimuth: a reference to the azimuth status object
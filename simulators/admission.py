@@ -0,0 +1,198 @@
+"""This module bounds the connections a threading TCP server handles at once,
+enabled by the `max_connections` server option. Instead of spawning a new
+thread for every accepted connection, the server hands it to its
+`Admission`, whose pool of at most `max_connections` worker threads handles
+the connections one per worker. A connection that finds every worker busy
+is handled according to the `admission` server option:
+
+* `reject`: the connection is closed right away;
+* `queue`: the connection waits for a free worker, as long as less than
+  `accept_queue` other connections are waiting, otherwise it is closed;
+* `evict-oldest`: the connection that has been handled for the longest time
+  is shut down, and the new one takes its worker.
+
+This way a client that keeps reconnecting can not push a simulator into
+thousands of threads, starving the threads that update the system. The
+counters of the admission control are returned by the
+``$connections%%%%%`` custom command, as a JSON object wrapped in the custom
+command header and tail."""
+import json
+import socket
+import logging
+import threading
+from collections import deque, OrderedDict
+
+
+policies = ('reject', 'queue', 'evict-oldest')
+
+
+class Admission:
+    """Admits the connections accepted by a server into a bounded pool of
+    worker threads. The workers are started as soon as they are needed and
+    are kept waiting for the next connection afterwards.
+
+    :param server: the server that accepts the connections
+    :param max_connections: the maximum number of connections handled at
+        once, which is also the maximum number of workers
+    :param policy: what to do with a connection that finds every worker
+        busy, one of `policies`
+    :param queue_size: the maximum number of connections waiting for a free
+        worker, only used by the `queue` policy
+    :type server: socketserver.ThreadingTCPServer
+    :type max_connections: int
+    :type policy: str
+    :type queue_size: int"""
+
+    def __init__(self, server, max_connections, policy=policies[0],
+                 queue_size=5):
+        if policy not in policies:
+            raise ValueError(
+                f"Unknown admission policy '{policy}', "
+                + f'choose among {policies}.'
+            )
+        self.server = server
+        self.max_connections = max_connections
+        self.policy = policy
+        self.queue_size = queue_size
+        self.condition = threading.Condition()
+        self.waiting = deque()
+        self.active = OrderedDict()
+        self.workers = []
+        self.idle = 0
+        self.closed = False
+        self.accepted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.evicted = 0
+        self.peak = 0
+
+    def admit(self, request, client_address):
+        """Hands a new connection to a worker, or queues it, or rejects it,
+        according to the policy. It is called by the thread of the server,
+        in place of `process_request`, so it never blocks.
+
+        :param request: the socket of the connection
+        :param client_address: the address of the client
+        :type request: socket.socket"""
+        with self.condition:
+            busy = len(self.active) + len(self.waiting)
+            if self.closed:
+                admitted = False
+            elif busy < self.max_connections:
+                admitted = True
+            elif self.policy == 'queue':
+                admitted = len(self.waiting) < self.queue_size
+                if admitted:
+                    self.queued += 1
+            elif self.policy == 'evict-oldest' and self.active:
+                admitted = True
+                self._evict(next(iter(self.active)))
+            else:
+                admitted = False
+            if admitted:
+                self.accepted += 1
+                self.waiting.append((request, client_address))
+                if self.idle:
+                    self.condition.notify()
+                elif len(self.workers) < self.max_connections:
+                    self._start_worker()
+            else:
+                self.rejected += 1
+        if not admitted:
+            logging.info('Rejected connection from %s', client_address)
+            self.server.shutdown_request(request)
+
+    def _evict(self, request):
+        """Shuts down the given connection, its handler will stop waiting for
+        data and its worker will take the next connection."""
+        self.evicted += 1
+        del self.active[request]
+        try:
+            request.shutdown(socket.SHUT_RDWR)
+        except OSError:  # skip coverage
+            pass
+
+    def _start_worker(self):
+        worker = threading.Thread(target=self._work, daemon=True)
+        self.workers.append(worker)
+        worker.start()
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while not self.waiting and not self.closed:
+                    self.idle += 1
+                    self.condition.wait()
+                    self.idle -= 1
+                if self.closed:
+                    return
+                request, client_address = self.waiting.popleft()
+                self.active[request] = client_address
+                self.peak = max(self.peak, len(self.active))
+            try:
+                self.server.finish_request(request, client_address)
+            except Exception:  # skip coverage
+                self.server.handle_error(request, client_address)
+            finally:
+                with self.condition:
+                    self.active.pop(request, None)
+                self.server.shutdown_request(request)
+
+    def close(self):
+        """Stops the idle workers and closes the waiting connections. The
+        connections that are being handled are not interrupted, as it
+        happens with the `socketserver` classes."""
+        with self.condition:
+            self.closed = True
+            waiting = list(self.waiting)
+            self.waiting.clear()
+            self.condition.notify_all()
+        for request, _ in waiting:
+            self.server.shutdown_request(request)
+
+    def counters(self):
+        """Returns the counters of the admission control.
+
+        :rtype: dict"""
+        with self.condition:
+            return {
+                'max_connections': self.max_connections,
+                'policy': self.policy,
+                'active': len(self.active),
+                'waiting': len(self.waiting),
+                'workers': len(self.workers),
+                'peak': self.peak,
+                'accepted': self.accepted,
+                'queued': self.queued,
+                'rejected': self.rejected,
+                'evicted': self.evicted,
+            }
+
+    def to_json(self):
+        """Returns the counters as a compact JSON object.
+
+        :rtype: str"""
+        return json.dumps(self.counters(), separators=(',', ':'))
+
+
+class AdmissionMixIn:
+    """Mix-in class of the threading TCP servers, which makes them hand every
+    accepted connection to an `Admission` instead of spawning a thread for
+    it. The admission control is configured by the server options, found
+    on the handler class."""
+
+    def __init__(self, server_address, request_handler_class):
+        self.admission = Admission(
+            self,
+            request_handler_class.max_connections,
+            request_handler_class.admission,
+            request_handler_class.accept_queue
+        )
+        super().__init__(server_address, request_handler_class)
+
+    def process_request(self, request, client_address):
+        self.admission.admit(request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.admission.close()
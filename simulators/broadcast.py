@@ -0,0 +1,668 @@
+"""This module holds the classes used to distribute the status messages of a
+`SendingSystem` to all of its subscribers. A system publishes each message
+once to its `BroadcastHub`, which converts it to an immutable `bytes` object
+and hands the very same object to every subscriber. Subscribers deliver the
+message without ever blocking the publisher: a message that cannot be
+delivered right away is buffered or dropped, according to the backpressure
+policy of the subscriber, and accounted for in the subscriber counters.
+
+A `DatagramSubscriber` publishes the messages to a UDP multicast group (or to
+a broadcast address) instead, sending each message once no matter how many
+clients receive it. Clients open their socket by means of `listen_datagrams`
+and detect the lost messages by looking at the sequence number every
+datagram starts with."""
+import os
+import socket
+import struct
+import select
+import selectors
+import ipaddress
+import threading
+import time
+from collections import deque
+from queue import Empty, Full
+
+
+# The backpressure policies of a `StreamSubscriber`, the first is the default
+policies = ('drop-oldest', 'drop-newest', 'coalesce-to-latest', 'disconnect')
+
+
+class Subscriber:
+    """Base class of the subscribers of a `BroadcastHub`. It counts the
+    messages it sent and the ones it had to drop. Since systems receive their
+    subscribers from the `SendingSystem.subscribe()` method, a subscriber can
+    also be handled as a `Queue(1)`: putting a message into it delivers it,
+    while trying to get a message out of it always raises `Empty`, so that
+    systems that drain a queue before putting a new message into it keep
+    working unchanged.
+
+    :param address: the address of the client this subscriber sends its
+        messages to, used to identify it in the counters
+    :type address: (ip, port)"""
+
+    def __init__(self, address=None):
+        self.address = address
+        self.sent = 0
+        self.dropped = 0
+
+    def deliver(self, message):
+        """Delivers a message to the client, without blocking. Subclasses
+        must implement this method and update the `sent` and `dropped`
+        counters accordingly.
+
+        :param message: the message to be delivered
+        :type message: bytes"""
+        raise NotImplementedError
+
+    def put(self, message, block=True, timeout=None):
+        # pylint: disable=unused-argument
+        """`Queue.put` equivalent, it delivers the given message."""
+        self.deliver(message)
+
+    def put_nowait(self, message):
+        """`Queue.put_nowait` equivalent, it delivers the given message."""
+        self.deliver(message)
+
+    @staticmethod
+    def get_nowait():
+        """`Queue.get_nowait` equivalent, no message is ever waiting to be
+        retrieved from a subscriber.
+
+        :raise Empty: always"""
+        raise Empty
+
+    def counters(self):
+        """Returns the counters of this subscriber.
+
+        :return: the client address, the number of sent and dropped messages
+        :rtype: dict"""
+        return {
+            'address': self.address,
+            'sent': self.sent,
+            'dropped': self.dropped,
+        }
+
+
+class QueueSubscriber(Subscriber):
+    """Wraps a regular queue in order for it to be subscribed to a
+    `BroadcastHub`. If the queue is full when a new message is published, the
+    oldest message is removed from the queue and counted as dropped.
+
+    :param queue: the queue to be wrapped
+    :type queue: Queue"""
+
+    def __init__(self, queue, address=None):
+        super().__init__(address)
+        self.queue = queue
+
+    def deliver(self, message):
+        while True:
+            try:
+                self.queue.put_nowait(message)
+                self.sent += 1
+                return
+            except Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except Empty:  # skip coverage
+                    pass
+
+
+class StreamSubscriber(Subscriber):
+    """Base class of the subscribers that write the published messages into
+    a stream connected to a client, without ever blocking. A message that
+    cannot be written right away, because the client is not reading fast
+    enough, is stored in a bounded buffer and written as soon as the client
+    catches up, and counted as late. The given policy decides what happens
+    when the client lags behind:
+
+    * `drop-oldest`: when the buffer is full, the oldest buffered message is
+      dropped to make room for the new one;
+    * `drop-newest`: when the buffer is full, the new message is dropped;
+    * `coalesce-to-latest`: any buffered message is dropped in favor of the
+      new one, the client only receives the latest message once it catches
+      up;
+    * `disconnect`: when the buffer is full the new message is dropped, and
+      the client gets disconnected after `max_misses` consecutive messages
+      that could not be written right away.
+
+    A message that only partially fits into the stream is always completed
+    before the next one is written, so the client never receives a
+    truncated message. The data that could not be written right away is
+    written by `resume()` as soon as the stream becomes writable again,
+    without waiting for the next message to be published. Subclasses must
+    implement the `_write` and `_disconnect` methods, and can implement the
+    `_watch` one in order to get `resume()` called.
+
+    :param address: the address of the client
+    :param policy: the backpressure policy, one of `policies`
+    :param buffer_size: the maximum number of buffered messages
+    :param max_misses: the number of consecutive messages that could not be
+        written right away after which the client is disconnected, only used
+        by the `disconnect` policy
+    :type address: (ip, port)
+    :type policy: str
+    :type buffer_size: int
+    :type max_misses: int"""
+
+    def __init__(
+        self,
+        address=None,
+        policy=policies[0],
+        buffer_size=1,
+        max_misses=10
+    ):
+        if policy not in policies:
+            raise ValueError(
+                f"Unknown backpressure policy '{policy}', "
+                + f'choose among {policies}.'
+            )
+        super().__init__(address)
+        self.policy = policy
+        self.buffer = deque()
+        self.replies = deque()
+        self.buffer_size = max(1, int(buffer_size))
+        self.max_misses = max(1, int(max_misses))
+        self.pending = b''
+        self.late = 0
+        self.misses = 0
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def _write(self, data):
+        """Writes as much of the given data as possible without blocking.
+
+        :param data: the data to be written
+        :type data: bytes-like object
+        :return: the number of written bytes
+        :rtype: int
+        :raise OSError: if the client is not connected anymore"""
+        raise NotImplementedError
+
+    def _disconnect(self):
+        """Disconnects the client."""
+        raise NotImplementedError
+
+    def _watch(self):
+        """Called when some data could not be written right away, in order
+        for `resume()` to be called as soon as the stream becomes writable.
+        By default nothing is done, the data is written along with the next
+        published message."""
+
+    def waiting(self):
+        """Tells whether some data is still waiting to be written to a
+        client that is still connected.
+
+        :rtype: bool"""
+        if self.closed:
+            return False
+        return bool(self.pending or self.replies or self.buffer)
+
+    def resume(self):
+        """Writes the data that could not be written right away, as long as
+        the stream accepts it without blocking.
+
+        :return: True if nothing is left to be written, False otherwise
+        :rtype: bool"""
+        with self.lock:
+            if self.closed:
+                return True
+            try:
+                if not self._flush():
+                    return False
+                self.misses = 0
+            except OSError:
+                self._close()
+        return True
+
+    def _flush(self):
+        """Writes the partially written message, the replies and the
+        buffered messages, as long as the stream accepts them without
+        blocking.
+
+        :return: True if everything has been written, False otherwise
+        :rtype: bool"""
+        while True:
+            if self.pending:
+                self.pending = self.pending[self._write(self.pending):]
+                if self.pending:
+                    return False
+            if self.replies:
+                self.pending = memoryview(self.replies.popleft())
+                continue
+            if not self.buffer:
+                return True
+            self.pending = memoryview(self.buffer.popleft())
+            self.sent += 1
+            self.late += 1
+
+    def _enqueue(self, message):
+        if self.policy == 'coalesce-to-latest':
+            self.dropped += len(self.buffer)
+            self.buffer.clear()
+        elif len(self.buffer) >= self.buffer_size:
+            if self.policy != 'drop-oldest':
+                self.dropped += 1
+                return
+            self.buffer.popleft()
+            self.dropped += 1
+        self.buffer.append(message)
+
+    def _close(self):
+        self.closed = True
+        self.dropped += len(self.buffer)
+        self.buffer.clear()
+        self.replies.clear()
+        self.pending = b''
+        self._disconnect()
+
+    def deliver(self, message):
+        with self.lock:
+            if self.closed:
+                self.dropped += 1
+                return
+            try:
+                if self._flush():
+                    self.misses = 0
+                    written = self._write(message)
+                    self.sent += 1
+                    self.pending = memoryview(message)[written:]
+                else:
+                    self.misses += 1
+                    self._enqueue(message)
+                    if (
+                        self.policy == 'disconnect'
+                        and self.misses >= self.max_misses
+                    ):
+                        self._close()
+            except OSError:
+                # The client disconnected, its handler will unsubscribe it
+                self.dropped += 1
+                self._close()
+            waiting = self.waiting()
+        if waiting:
+            self._watch()
+
+    def counters(self):
+        counters = super().counters()
+        counters.update({
+            'policy': self.policy,
+            'late': self.late,
+            'buffered': len(self.buffer),
+            'closed': self.closed,
+        })
+        return counters
+
+
+class SocketSubscriber(StreamSubscriber):
+    """Writes the published messages directly into a connected TCP socket,
+    from the publisher thread, using non-blocking sends. The socket itself
+    is left in blocking mode, so the thread that handles the client can keep
+    waiting for incoming data. A disconnected client is shut down, so that
+    its handler stops waiting and unsubscribes it. The data that does not
+    fit into the socket right away is written by the `Flusher` thread, as
+    soon as the client reads.
+
+    :param sock: the socket connected to the client
+    :type sock: socket.socket"""
+
+    def __init__(self, sock, address=None, **kwargs):
+        super().__init__(address, **kwargs)
+        self.socket = sock
+
+    def _write(self, data):
+        try:
+            return self.socket.send(data, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return 0
+
+    def _disconnect(self):
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:  # skip coverage
+            pass
+
+    def _watch(self):
+        Flusher.get().watch(self)
+
+    def send(self, data):
+        """Sends some data that does not come from the publisher (i.e. the
+        response to a custom command), without blocking. The data is never
+        dropped, it is written after any partially written message and
+        before the buffered ones.
+
+        :param data: the data to be sent to the client
+        :type data: bytes"""
+        with self.lock:
+            if self.closed:
+                return
+            self.replies.append(data)
+            try:
+                self._flush()
+            except OSError:
+                self._close()
+            waiting = self.waiting()
+        if waiting:
+            self._watch()
+
+    def drain(self, timeout=1.0):
+        """Waits for the data that could not be written right away to be
+        written, i.e. before the socket is closed, without ever waiting
+        while holding the lock of the subscriber.
+
+        :param timeout: the maximum time to wait, in seconds
+        :type timeout: float
+        :return: True if everything has been written, False otherwise
+        :rtype: bool"""
+        deadline = time.monotonic() + timeout
+        while not self.resume():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                select.select([], [self.socket], [], remaining)
+            except (OSError, ValueError):  # skip coverage
+                return False
+        return True
+
+    def detach(self):
+        """Stops writing into the socket, which is about to be closed."""
+        with self.lock:
+            self.closed = True
+        Flusher.get().unwatch(self)
+
+
+class Flusher:
+    """A daemon thread writing the data that the `SocketSubscriber` objects
+    could not write right away, as soon as their sockets become writable, so
+    that a client that lags behind receives the rest of a message without
+    waiting for the next one to be published, and the publisher never waits
+    for a client. It is shared by all the servers of the current process,
+    use `Flusher.get()` to retrieve it."""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.watched = set()
+        self.changes = []
+        self.selector = selectors.DefaultSelector()
+        self._wakeup, self._waker = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._waker.setblocking(False)
+        self.selector.register(self._wakeup, selectors.EVENT_READ)
+        self.thread = threading.Thread(
+            target=self._run,
+            name='flusher',
+            daemon=True
+        )
+        self.thread.start()
+
+    @classmethod
+    def get(cls):
+        """Returns the flusher of the current process, starting it the first
+        time it is requested.
+
+        :rtype: Flusher"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @classmethod
+    def _after_fork(cls):
+        # The flusher thread does not survive a fork, the child process
+        # will start its own flusher
+        cls._instance = None
+        cls._lock = threading.Lock()
+
+    def watch(self, subscriber):
+        """Writes the data of the given subscriber as soon as its socket
+        becomes writable, until nothing is left.
+
+        :param subscriber: the subscriber to be watched
+        :type subscriber: SocketSubscriber"""
+        with self.lock:
+            if subscriber in self.watched:
+                return
+            self.watched.add(subscriber)
+            self.changes.append((True, subscriber))
+        self._wake()
+
+    def unwatch(self, subscriber):
+        """Stops watching the given subscriber.
+
+        :param subscriber: the subscriber not to be watched anymore
+        :type subscriber: SocketSubscriber"""
+        with self.lock:
+            if subscriber not in self.watched:
+                return
+            self.watched.discard(subscriber)
+            self.changes.append((False, subscriber))
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._waker.send(b'\0')
+        except BlockingIOError:  # skip coverage
+            pass  # The flusher is going to wake up anyway
+
+    def _apply(self):
+        """Registers and unregisters the watched sockets, in the same order
+        they were requested."""
+        try:
+            while self._wakeup.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self.lock:
+            changes, self.changes = self.changes, []
+        for watch, subscriber in changes:
+            try:
+                if watch:
+                    self.selector.register(
+                        subscriber.socket,
+                        selectors.EVENT_WRITE,
+                        subscriber
+                    )
+                else:
+                    self.selector.unregister(subscriber.socket)
+            except (KeyError, ValueError, OSError):
+                # The socket has already been closed
+                with self.lock:
+                    self.watched.discard(subscriber)
+
+    def _run(self):
+        while True:
+            for key, _ in self.selector.select():
+                subscriber = key.data
+                if subscriber is None:
+                    self._apply()
+                elif subscriber.resume():
+                    self.unwatch(subscriber)
+                    # Some new data might have come meanwhile
+                    if subscriber.waiting():
+                        self.watch(subscriber)
+
+
+os.register_at_fork(
+    after_in_child=Flusher._after_fork  # pylint: disable=protected-access
+)
+
+
+class DatagramSubscriber(Subscriber):
+    """Sends the published messages as UDP datagrams to a multicast group,
+    or to a broadcast address, so that any number of clients on the local
+    network can receive them while the system sends each message only once.
+    Every datagram starts with the `header`, holding the sequence number of
+    the message. The sequence number grows by one for each published
+    message, including the ones that could not be sent, so a client detects
+    the lost messages by looking for gaps in the sequence. The datagrams are
+    sent without blocking, a message that does not fit into the socket
+    buffer is dropped.
+
+    :param address: the multicast group (or the broadcast address) and the
+        port the datagrams are sent to
+    :param interface: the address of the local interface the multicast
+        datagrams are sent from, by default the one chosen by the kernel
+    :param ttl: the time to live of the multicast datagrams, by default they
+        do not leave the local network
+    :type address: (ip, port)
+    :type interface: str
+    :type ttl: int"""
+
+    header = struct.Struct('!Q')
+    default_group = '239.255.0.1'
+
+    def __init__(self, address, interface='', ttl=1):
+        super().__init__(address)
+        self.sequence = 0
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if ipaddress.IPv4Address(address[0]).is_multicast:
+            self.socket.setsockopt(
+                socket.IPPROTO_IP,
+                socket.IP_MULTICAST_TTL,
+                ttl
+            )
+            self.socket.setsockopt(
+                socket.IPPROTO_IP,
+                socket.IP_MULTICAST_LOOP,
+                1
+            )
+            if interface:
+                self.socket.setsockopt(
+                    socket.IPPROTO_IP,
+                    socket.IP_MULTICAST_IF,
+                    socket.inet_aton(interface)
+                )
+        else:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.socket.setblocking(False)
+
+    @classmethod
+    def unpack(cls, datagram):
+        """Splits a received datagram into its sequence number and the
+        published message.
+
+        :param datagram: the received datagram
+        :type datagram: bytes
+        :return: the sequence number and the message
+        :rtype: (int, bytes)"""
+        sequence, = cls.header.unpack_from(datagram)
+        return sequence, datagram[cls.header.size:]
+
+    def deliver(self, message):
+        header = self.header.pack(self.sequence)
+        self.sequence += 1
+        try:
+            # Scatter/gather, the message itself is not copied
+            self.socket.sendmsg([header, message], [], 0, self.address)
+            self.sent += 1
+        except OSError:
+            self.dropped += 1
+
+    def close(self):
+        """Closes the socket, the messages delivered afterwards are dropped.
+        """
+        self.socket.close()
+
+    def counters(self):
+        counters = super().counters()
+        counters['sequence'] = self.sequence
+        return counters
+
+
+def listen_datagrams(address, interface=''):
+    """Returns a UDP socket receiving the datagrams sent by a
+    `DatagramSubscriber` to the given address, joining the multicast group
+    if the address is a multicast one. Many sockets, even of different
+    processes, can receive the datagrams of the same group at once.
+
+    :param address: the multicast group (or the broadcast address) and the
+        port the datagrams are sent to
+    :param interface: the address of the local interface the multicast group
+        is joined on, by default the one chosen by the kernel
+    :type address: (ip, port)
+    :type interface: str
+    :rtype: socket.socket"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        group, port = address
+        sock.bind(('', port))
+        if ipaddress.IPv4Address(group).is_multicast:
+            membership = socket.inet_aton(group)
+            membership += socket.inet_aton(interface or '0.0.0.0')
+            sock.setsockopt(
+                socket.IPPROTO_IP,
+                socket.IP_ADD_MEMBERSHIP,
+                membership
+            )
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class BroadcastHub:
+    """Keeps track of the subscribers of a system and delivers them every
+    published message. Any object exposing the `Queue` interface can be
+    subscribed, objects that are not `Subscriber` instances are wrapped into
+    a `QueueSubscriber`. The last published message is kept in the `latest`
+    attribute, an immutable snapshot that any thread can read without taking
+    a lock, while the publisher keeps updating its own buffer."""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.published = 0
+        self.latest = b''
+        self.lock = threading.Lock()
+
+    def subscribe(self, subscriber):
+        """Adds a subscriber to the hub.
+
+        :param subscriber: the subscriber or the queue to be added
+        :type subscriber: Subscriber or Queue"""
+        wrapped = subscriber
+        if not isinstance(subscriber, Subscriber):
+            wrapped = QueueSubscriber(subscriber)
+        with self.lock:
+            self.subscribers[id(subscriber)] = wrapped
+
+    def unsubscribe(self, subscriber):
+        """Removes a subscriber from the hub.
+
+        :param subscriber: the subscriber or the queue to be removed
+        :type subscriber: Subscriber or Queue"""
+        with self.lock:
+            self.subscribers.pop(id(subscriber), None)
+
+    def publish(self, message):
+        """Delivers a message to every subscriber. The message is converted
+        to `bytes` once, all the subscribers share the same object.
+
+        :param message: the message to be published
+        :type message: bytes-like object"""
+        message = bytes(message)
+        with self.lock:
+            self.latest = message
+            self.published += 1
+            subscribers = list(self.subscribers.values())
+        for subscriber in subscribers:
+            subscriber.deliver(message)
+
+    def counters(self):
+        """Returns the counters of the hub and of every subscriber.
+
+        :return: the number of published messages and the list of the
+            counters of the subscribers
+        :rtype: dict"""
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+        return {
+            'published': self.published,
+            'subscribers': [s.counters() for s in subscribers],
+        }
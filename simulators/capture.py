@@ -0,0 +1,279 @@
+"""This module records the traffic of the listening servers and replays it.
+When the `capture` server option is given, each listening server writes
+every chunk of bytes it receives from its TCP clients, and every chunk it
+sends back, to a log file of its own, along with the time it was received or
+sent. The log can later be replayed against a running simulator, with the
+same chunks sent at the same pace (or faster), and the answers of the
+simulator compared with the recorded ones.
+
+A log starts with the `magic` bytes, followed by the length of a JSON
+header describing the server and by the header itself. Then come the
+records, each one made of a fixed size part (the record kind, the
+connection it belongs to, its time in seconds since the log was opened and
+the length of its data) followed by its data. The kinds are `OPEN`, whose
+data is the address of the client, `INPUT`, `OUTPUT` and `CLOSE`."""
+import json
+import time
+import socket
+import struct
+import threading
+from collections import namedtuple
+from simulators.metrics import Histogram
+
+
+magic = b'DSCAP1\n'
+OPEN, INPUT, OUTPUT, CLOSE = range(4)
+
+_header = struct.Struct('<I')
+_record = struct.Struct('<BIdI')
+
+Record = namedtuple('Record', 'kind connection time data')
+
+
+class CaptureLog:
+    """Writes the traffic of a server to a log file. It can be written by
+    many handler threads at once.
+
+    :param path: the path of the log file, overwritten if it exists
+    :param header: the description of the server, stored as JSON at the
+        beginning of the log
+    :type path: str
+    :type header: dict
+    """
+
+    def __init__(self, path, header=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.started = time.perf_counter()
+        header = dict(header or {}, started=time.time())
+        encoded = json.dumps(header).encode('utf-8')
+        # pylint: disable=consider-using-with
+        self.file = open(path, 'wb')
+        self.file.write(magic + _header.pack(len(encoded)) + encoded)
+        self.file.flush()
+
+    def open(self, address):
+        """Records a new connection.
+
+        :param address: the address of the client, the path of its socket
+            for a client connected via an AF_UNIX socket (often empty)
+        :type address: (ip, port) or str
+        :return: the identifier of the connection
+        :rtype: int"""
+        with self.lock:
+            self.connections += 1
+            connection = self.connections
+        if not isinstance(address, str):
+            address = f'{address[0]}:{address[1]}'
+        self.write(OPEN, connection, address.encode())
+        return connection
+
+    def write(self, kind, connection, data=b''):
+        """Appends a record to the log.
+
+        :param kind: the kind of the record, `INPUT` or `OUTPUT` for the
+            received and sent bytes
+        :param connection: the identifier of the connection
+        :param data: the bytes of the record
+        :type kind: int
+        :type connection: int
+        :type data: bytes-like object"""
+        with self.lock:
+            if self.file.closed:
+                return
+            elapsed = time.perf_counter() - self.started
+            self.file.write(_record.pack(kind, connection, elapsed, len(data)))
+            self.file.write(data)
+
+    def close_connection(self, connection):
+        """Records the end of a connection, flushing the log, so that the
+        file holds all the complete connections.
+
+        :param connection: the identifier of the connection
+        :type connection: int"""
+        self.write(CLOSE, connection)
+        with self.lock:
+            if not self.file.closed:
+                self.file.flush()
+
+    def close(self):
+        """Closes the log file."""
+        with self.lock:
+            self.file.close()
+
+
+def read(path):
+    """Reads a log file.
+
+    :param path: the path of the log file
+    :type path: str
+    :return: the header of the log and the list of its records
+    :rtype: (dict, list of Record)
+    :raises ValueError: if the file is not a log file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(magic):
+        raise ValueError(f"'{path}' is not a capture log.")
+    offset = len(magic)
+    (length,) = _header.unpack_from(data, offset)
+    offset += _header.size
+    header = json.loads(data[offset:offset + length])
+    offset += length
+    records = []
+    # A record truncated by a killed simulator is discarded
+    while offset + _record.size <= len(data):
+        kind, connection, elapsed, length = _record.unpack_from(data, offset)
+        offset += _record.size
+        if offset + length > len(data):
+            break
+        records.append(Record(
+            kind, connection, elapsed, data[offset:offset + length]
+        ))
+        offset += length
+    return header, records
+
+
+def _exchanges(records):
+    """Groups the records of each connection into its exchanges: the time of
+    the received chunk, the chunk itself and the bytes sent back before the
+    next chunk was received. The bytes sent as soon as the client connected
+    are returned on their own."""
+    connections = {}
+    for record in records:
+        if record.kind == OPEN:
+            connections[record.connection] = [record.time, b'', []]
+            continue
+        connection = connections.get(record.connection)
+        if connection is None:
+            continue
+        exchanges = connection[2]
+        if record.kind == INPUT:
+            exchanges.append([record.time, bytes(record.data), b''])
+        elif record.kind == OUTPUT:
+            if exchanges:
+                exchanges[-1][2] += record.data
+            else:
+                connection[1] += record.data
+    return connections
+
+
+def _receive(sock, length):
+    data = b''
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            raise ConnectionError('Connection closed by the simulator.')
+        data += chunk
+    return data
+
+
+class _Replay:
+    """The state of a replay, shared by the threads replaying each
+    connection."""
+
+    def __init__(self, address, speed, timeout):
+        self.address = address
+        self.speed = speed
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.latency = Histogram()
+        self.counters = dict.fromkeys(
+            ('requests', 'bytes_sent', 'bytes_received', 'mismatches',
+             'timeouts', 'errors'),
+            0
+        )
+        self.start = None
+        self.offset = 0.0
+
+    def count(self, **counters):
+        with self.lock:
+            for name, value in counters.items():
+                self.counters[name] += value
+
+    def wait(self, recorded):
+        if self.speed:
+            recorded -= self.offset
+            delay = self.start + recorded / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def connection(self, opened, greeting, exchanges):
+        self.wait(opened)
+        try:
+            with socket.create_connection(self.address, self.timeout) as sock:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if greeting:
+                    self.check(greeting, _receive(sock, len(greeting)))
+                for recorded, request, expected in exchanges:
+                    self.wait(recorded)
+                    t0 = time.perf_counter()
+                    sock.sendall(request)
+                    self.count(requests=1, bytes_sent=len(request))
+                    try:
+                        answer = _receive(sock, len(expected))
+                    except socket.timeout:
+                        self.count(timeouts=1)
+                        return
+                    with self.lock:
+                        self.latency.record(time.perf_counter() - t0)
+                    self.check(expected, answer)
+        except OSError:
+            self.count(errors=1)
+
+    def check(self, expected, answer):
+        self.count(
+            bytes_received=len(answer),
+            mismatches=int(answer != expected)
+        )
+
+
+def replay(path, address=None, speed=1.0, timeout=5.0):
+    """Replays a log file against a running simulator. Each recorded
+    connection is replayed by a thread of its own: the recorded chunks are
+    sent with the same timing, scaled by `speed`, and after each chunk the
+    thread waits for as many bytes as the server sent back when the log was
+    recorded, comparing them with the recorded ones.
+
+    :param path: the path of the log file
+    :param address: the address of the simulator server, by default the
+        local address with the port of the recorded server
+    :param speed: how faster than the recording the chunks are sent, 0
+        meaning as fast as the simulator answers
+    :param timeout: the seconds to wait for an answer
+    :type path: str
+    :type address: (ip, port)
+    :type speed: float
+    :type timeout: float
+    :return: the number of connections, of sent chunks (`requests`), of sent
+        and received bytes, of answers different from the recorded ones
+        (`mismatches`), of answers not received in time (`timeouts`) and of
+        connection errors, the recorded and elapsed time and the latency
+        percentiles of the answers
+    :rtype: dict"""
+    header, records = read(path)
+    if address is None:
+        address = ('127.0.0.1', header['address'][1])
+    state = _Replay(tuple(address), speed, timeout)
+    # The log is opened along with the server, long before the first client
+    state.offset = records[0].time if records else 0.0
+    threads = [
+        threading.Thread(target=state.connection, args=connection)
+        for connection in _exchanges(records).values()
+    ]
+    state.start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results = {
+        'system': header.get('system'),
+        'connections': len(threads),
+        'speed': speed,
+        'recorded_s': round(records[-1].time - state.offset, 3)
+        if records else 0.0,
+        'elapsed_s': round(time.perf_counter() - state.start, 3),
+    }
+    results.update(state.counters)
+    results['latency'] = state.latency.summary()
+    return results
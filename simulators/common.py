@@ -1,4 +1,47 @@
+import os
+import re
 import abc
+import copy
+import json
+import math
+import tempfile
+import threading
+from simulators import memory, profiling
+
+
+# The leading word of a textual command, after an optional header character
+_command_pattern = re.compile(rb'[^\w\s]?([A-Za-z][\w:?*.]*)')
+
+
+def _positive(value, default):
+    """Parses the numeric argument of a custom command.
+
+    :param value: the argument, as received from the client
+    :param default: the value to be used if the argument is missing
+    :type value: str
+    :type default: float
+    :return: the parsed argument
+    :rtype: float
+    :raise ValueError: if the argument is not a finite positive number"""
+    value = float(value) if value else default
+    if not 0 < value < math.inf:
+        raise ValueError(f'{value} is not a finite positive number.')
+    return value
+
+
+def _output_path(name):
+    """Returns the path of a file written by a custom command. Since the
+    commands are received from the network, the file can only be given as a
+    plain name, and it is always placed in the temporary directory.
+
+    :param name: the name of the file
+    :type name: str
+    :return: the path of the file
+    :rtype: str
+    :raise ValueError: if the name holds a path separator or `..`"""
+    if any(invalid in name for invalid in ('/', '\\', '..', '\0')):
+        raise ValueError(f"Invalid file name '{name}'.")
+    return os.path.join(tempfile.gettempdir(), name)
 
 
 class BaseSystem:
@@ -8,6 +51,13 @@ class BaseSystem:
 
     __metaclass__ = abc.ABCMeta
 
+    #: Whether the system may block for a while while parsing a chunk of
+    #: bytes or executing a command, i.e. to reproduce the response time of
+    #: the device. The event loop servers call these systems from a thread
+    #: of their executor, so that the other endpoints of the loop keep being
+    #: served meanwhile.
+    blocking = False
+
     def system_stop(self):
         """Sends back to the server the message `$server_shutdown%%%%%`
         ordering it to stop accepting requests, to close its socket and to shut
@@ -24,11 +74,158 @@ class BaseSystem:
         :return: the greeting message to sent to connected clients."""
         return None
 
+    @staticmethod
+    def profile_start(interval=None):
+        """Custom command that starts sampling the stacks of all the threads
+        of the process running the system, see the `profiling` module.
+
+        :param interval: the milliseconds between two consecutive samples,
+            5 by default.
+        :return: the `$profile_start%%%%%` acknowledgement, a message telling
+            that a profiling session is already running, or
+            `$profile_start:error%%%%%` if the interval is not a positive
+            number."""
+        try:
+            interval = _positive(interval, profiling.default_interval * 1e3)
+        except ValueError:
+            return '$profile_start:error%%%%%'
+        if not profiling.start(interval / 1e3):
+            return '$profile_start:already running%%%%%'
+        return '$profile_start%%%%%'
+
+    @staticmethod
+    def profile_stop(name=None):
+        """Custom command that stops the running profiling session and writes
+        the sampled stacks to a file in the temporary directory, in the
+        collapsed format read by the flame graph tools, or as a summary of
+        the busiest functions if the file name ends with `.txt`.
+
+        :param name: the name of the file, which can not hold any path
+            separator, by default a name made of the process identifier and
+            of the current time.
+        :return: the path of the written file and the number of samples, a
+            message telling that no profiling session is running, or
+            `$profile_stop:error%%%%%` if the file name is not valid or the
+            file can not be written. The session keeps running if the name
+            is not valid."""
+        try:
+            path = _output_path(name) if name else None
+        except ValueError:
+            return '$profile_stop:error%%%%%'
+        try:
+            path, samples = profiling.stop(path)
+        except RuntimeError:
+            return '$profile_stop:not running%%%%%'
+        except OSError:
+            return '$profile_stop:error%%%%%'
+        return f'$profile_stop:{path},{samples}%%%%%'
+
+    @staticmethod
+    def memory_start(frames=None):
+        """Custom command that starts tracing the memory allocations of the
+        process running the system and takes a first snapshot, see the
+        `memory` module.
+
+        :param frames: how many frames of each allocation traceback are kept,
+            1 by default.
+        :return: the `$memory_start%%%%%` acknowledgement."""
+        memory.start_tracing(int(frames) if frames else 1)
+        return '$memory_start%%%%%'
+
+    @staticmethod
+    def memory_snapshot(limit=None):
+        """Custom command that takes a new snapshot of the memory
+        allocations and compares it with the previous one.
+
+        :param limit: the maximum number of allocation sites to be reported,
+            10 by default.
+        :return: the allocation sites that changed the most since the
+            previous snapshot, as a JSON object wrapped in the custom command
+            header and tail, or a message telling that the memory allocations
+            are not being traced."""
+        try:
+            sites = memory.diff(int(limit) if limit else 10)
+        except RuntimeError:
+            return '$memory_snapshot:not tracing%%%%%'
+        return f'$memory_snapshot:{json.dumps(sites)}%%%%%'
+
+    @staticmethod
+    def memory_stop():
+        """Custom command that stops tracing the memory allocations.
+
+        :return: the `$memory_stop%%%%%` acknowledgement."""
+        memory.stop_tracing()
+        return '$memory_stop%%%%%'
+
+    @staticmethod
+    def memory_sampler_start(name=None, interval=None):
+        """Custom command that starts appending the resident set size of the
+        process running the system, along with the number of its objects, to
+        a file in the temporary directory.
+
+        :param name: the name of the file, which can not hold any path
+            separator, by default a name made of the process identifier.
+        :param interval: the seconds between two consecutive samples, 60 by
+            default.
+        :return: the path of the file, a message telling that a sampler is
+            already running, or `$memory_sampler_start:error%%%%%` if the
+            file name or the interval are not valid, or the file can not be
+            written."""
+        try:
+            path = _output_path(
+                name or f'simulator-{os.getpid()}-memory.jsonl'
+            )
+            started = memory.start_sampler(path, _positive(interval, 60.0))
+        except (ValueError, OSError):
+            return '$memory_sampler_start:error%%%%%'
+        if not started:
+            return '$memory_sampler_start:already running%%%%%'
+        return f'$memory_sampler_start:{path}%%%%%'
+
+    @staticmethod
+    def memory_sampler_stop():
+        """Custom command that stops the running memory sampler.
+
+        :return: the path of the file and the number of written samples, or
+            a message telling that no sampler is running."""
+        try:
+            path, samples = memory.stop_sampler()
+        except RuntimeError:
+            return '$memory_sampler_stop:not running%%%%%'
+        return f'$memory_sampler_stop:{path},{samples}%%%%%'
+
 
 class ListeningSystem(BaseSystem):
     """Implements a server that waits for its client(s) to send a command, it
     can then answer back when required."""
 
+    #: The address of the client whose datagram is being parsed. It is set
+    #: by the UDP servers that handle all their clients in a single thread
+    #: (`BatchedUDPServer` and `AsyncUDPServer`), so that a system can keep
+    #: the parsing state of each client apart.
+    peer = None
+
+    #: The attributes holding the partial message being parsed, along with
+    #: their initial values. Every `Session` keeps its own copy of them, so
+    #: that the clients connected at the same time do not mix up the bytes
+    #: of their messages. Systems that keep more parsing state than the
+    #: `msg` attribute have to list it here.
+    session_state = {'msg': ''}
+
+    def new_session(self, shared=False):
+        """Returns a new parsing session, the servers open one for each
+        connected client and feed it the bytes received from that client
+        only.
+
+        :param shared: whether the session parses the bytes with the state
+            of the system itself instead of a copy of its own, as it happens
+            for the datagrams received by a UDP server. The session still
+            takes turns with the other ones.
+        :type shared: bool
+        :return: the parsing session of a new client.
+        :rtype: Session"""
+        return Session(self, shared)
+
     @abc.abstractmethod
     def parse(self, byte):
         """Receives and parses the command to be sent to the System. Additional
@@ -46,6 +243,162 @@ class ListeningSystem(BaseSystem):
             maximum expected length, when the sent message carries a wrong
             checksum or when the client asks to execute an unknown command."""
 
+    def parse_bytes(self, data):
+        """Receives and parses a whole chunk of bytes, as read from the
+        socket. The default implementation passes the given bytes to the
+        `parse()` method one at a time, systems can override it in order to
+        consume long messages without a method call for each byte.
+
+        :param data: the received chunk of bytes.
+        :type data: bytes-like object
+        :return: the outcomes of the parsing, in order: the responses to be
+            sent back to the client and the exceptions raised while parsing
+            malformed messages. Every other value returned by `parse()`,
+            except booleans, is reported as well.
+        :rtype: Outcomes"""
+        responses = Outcomes()
+        for byte in str(data, 'latin-1'):
+            self._parse_byte(byte, responses)
+        return responses
+
+    @staticmethod
+    def command_name(data):
+        """Returns the name the given chunk of bytes is accounted under by
+        the server statistics, see the `stats` server option. The default
+        implementation returns the leading word of a textual command (i.e.
+        `SOUR:FREQ` for `SOUR:FREQ 100`), or `binary` if the chunk does not
+        start with a word. Systems with binary protocols can override it in
+        order to tell their commands apart.
+
+        :param data: the received chunk of bytes.
+        :type data: bytes-like object
+        :return: the name of the command the chunk starts with.
+        :rtype: string"""
+        match = _command_pattern.match(bytes(data[:32]))
+        if match:
+            return match.group(1).decode('ascii')
+        return 'binary'
+
+    def _parse_byte(self, byte, responses):
+        """Passes a single byte to the `parse()` method, appending its outcome
+        to the given list, unless it is a boolean. A byte accepted by the
+        `parse()` method that empties the partial message held by the `msg`
+        attribute completes a message that gets no response.
+
+        :param byte: the byte to be parsed.
+        :type byte: string
+        :param responses: the outcomes of the current chunk.
+        :type responses: Outcomes"""
+        msg = self.msg
+        try:
+            response = self.parse(byte)
+        except Exception as ex:
+            response = ex
+        if not isinstance(response, bool):
+            responses.append(response)
+            responses.complete(msg, byte, response)
+        elif response and msg and not self.msg:
+            responses.complete(msg, byte)
+
+
+class Outcomes(list):
+    """The outcomes of the parsing of a chunk of bytes, as returned by
+    `ListeningSystem.parse_bytes()`: the responses to be sent back to the
+    client and the exceptions raised while parsing malformed messages, in
+    order. It also keeps track of every message completed by the chunk,
+    whether it gets a response or not, so that the server statistics can
+    account them one by one."""
+
+    def __init__(self):
+        super().__init__()
+        #: The completed messages, in order, each one along with its
+        #: outcome, True for a message that gets no response. A message is
+        #: None when the system does not keep it as a string.
+        self.messages = []
+
+    def complete(self, msg, byte='', outcome=True):
+        """Records a completed message, its outcome has to be appended to
+        the list on its own, if any.
+
+        :param msg: the message, or the partial message preceding the given
+            byte.
+        :param byte: the byte that completes the message.
+        :param outcome: the outcome of the message, True if it gets no
+            response.
+        :type msg: string
+        :type byte: string"""
+        if isinstance(msg, str):
+            msg += byte
+        else:
+            msg = None
+        self.messages.append((msg, outcome))
+
+
+class Session:
+    """The parsing state of a single client of a `ListeningSystem`. The
+    system parses the bytes received from every client with the very same
+    methods, reading and writing its `session_state` attributes, so each
+    session lends its own copy of them to the system while its bytes are
+    parsed, and takes them back afterwards.
+
+    The execution stays serialized: the sessions of a system take turns by
+    means of a single lock, so the bytes of different clients are never
+    parsed, and their commands never executed, at the same time, while the
+    model of the device stays shared among them. The `session_state`
+    attributes of the system only hold the state of the system itself while
+    the lock is free, so any other code reading or writing them has to hold
+    the lock as well, as the custom commands do, see `Session.call()`.
+    The threads a system starts on its own must not touch them.
+
+    :param system: the system that parses the bytes of the client.
+    :param shared: whether the session uses the parsing state of the system
+        instead of a copy of its own.
+    :type system: ListeningSystem
+    :type shared: bool"""
+
+    def __init__(self, system, shared=False):
+        self.system = system
+        self.state = {} if shared else {
+            name: copy.copy(value)
+            for name, value in system.session_state.items()
+        }
+        self.lock = vars(system).setdefault('_session_lock', threading.Lock())
+
+    def parse_bytes(self, data):
+        """Parses a chunk of bytes received from the client, see
+        `ListeningSystem.parse_bytes()`.
+
+        :param data: the received chunk of bytes.
+        :type data: bytes-like object
+        :return: the outcomes of the parsing, in order.
+        :rtype: list"""
+        attributes = vars(self.system)
+        state = self.state
+        with self.lock:
+            # The attributes the system does not have are removed again,
+            # instead of being left behind as `None`
+            shared = {
+                name: attributes[name] for name in state if name in attributes
+            }
+            attributes.update(state)
+            try:
+                return self.system.parse_bytes(data)
+            finally:
+                for name in state:
+                    state[name] = attributes.pop(name, None)
+                attributes.update(shared)
+
+    def call(self, function, *args):
+        """Calls a function of the system in turn with the sessions, so that
+        it finds the `session_state` attributes of the system itself, i.e.
+        a custom command that resets the system.
+
+        :param function: the function to be called.
+        :param args: the arguments of the function.
+        :return: the value returned by the function."""
+        with self.lock:
+            return function(*args)
+
 
 class SendingSystem(BaseSystem):
     """Implements a server that periodically sends some information data
@@ -0,0 +1,257 @@
+"""This module implements the control plane of the running simulators. Every
+simulator, once started, registers itself in a runtime directory by writing
+a pidfile and by listening for administrative commands on a local UNIX
+socket, both named after the simulator module. This way the command line
+interface finds the running simulators by listing a directory and stops a
+simulator with a single round trip, no matter how many servers it hosts.
+
+The control socket accepts a single command for each connection, terminated
+by a newline character, and answers with a line holding a JSON object:
+
+* `status`: the name, the process identifier, the engine, the number of
+  workers and servers and the uptime of the simulator.
+* `health`: how many workers of the simulator are still alive.
+* `stop`: stops all the servers of the simulator, answering when they are
+  all shut down.
+"""
+import os
+import json
+import time
+import socket
+import tempfile
+import threading
+from socketserver import ThreadingUnixStreamServer, StreamRequestHandler
+
+
+commands = ('status', 'health', 'stop')
+
+
+def runtime_dir():
+    """Returns the directory holding the pidfiles and the control sockets of
+    the running simulators of the current user.
+
+    :rtype: str"""
+    runtime = os.getenv('XDG_RUNTIME_DIR')
+    if runtime:
+        return os.path.join(runtime, 'discos-simulators')
+    return os.path.join(
+        tempfile.gettempdir(),
+        f'discos-simulators-{os.getuid()}'
+    )
+
+
+def pid_path(name, directory=None):
+    """Returns the path of the pidfile of the given simulator.
+
+    :param name: the name of the simulator module
+    :param directory: the runtime directory, see `runtime_dir` for the
+        default one
+    :type name: str
+    :type directory: str
+    :rtype: str"""
+    return os.path.join(directory or runtime_dir(), f'{name}.pid')
+
+
+def socket_path(name, directory=None):
+    """Returns the path of the control socket of the given simulator.
+
+    :param name: the name of the simulator module
+    :param directory: the runtime directory, see `runtime_dir` for the
+        default one
+    :type name: str
+    :type directory: str
+    :rtype: str"""
+    return os.path.join(directory or runtime_dir(), f'{name}.sock')
+
+
+def _unlink(*paths):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+class ControlHandler(StreamRequestHandler):
+    """This class handles a single command received on the control socket.
+    Clients that do not send their command in time get disconnected."""
+
+    timeout = 1.0
+
+    def handle(self):
+        try:
+            line = self.rfile.readline(64)
+        except OSError:
+            return
+        command = line.decode('ascii', 'replace').strip()
+        if command in commands:
+            reply = getattr(self.server, command)()
+        else:
+            reply = {'error': f"unknown command '{command}'"}
+        if command == 'stop':
+            # The simulator is no longer registered once the client knows
+            self.server.close()
+        try:
+            self.wfile.write(json.dumps(reply).encode('ascii') + b'\n')
+        except OSError:  # skip coverage
+            pass
+
+
+class ControlServer(ThreadingUnixStreamServer):
+    """This class registers a running simulator in the runtime directory and
+    serves its control socket from a daemon thread. The handler threads are
+    not daemons, so that the answer to the `stop` command is sent before the
+    process exits.
+
+    :param name: the name of the simulator module
+    :param simulator: the started simulator
+    :param directory: the runtime directory, see `runtime_dir` for the
+        default one
+    :type name: str
+    :type simulator: Simulator
+    :type directory: str
+    """
+
+    block_on_close = False
+
+    def __init__(self, name, simulator, directory=None):
+        self.name = name
+        self.simulator = simulator
+        self.pidfile = pid_path(name, directory)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._closed = False
+        path = socket_path(name, directory)
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        _unlink(path)  # Left behind by a simulator that did not exit cleanly
+        super().__init__(path, ControlHandler)
+        temporary = f'{self.pidfile}.{os.getpid()}'
+        with open(temporary, 'w', encoding='ascii') as f:
+            f.write(f'{os.getpid()}\n')
+        os.replace(temporary, self.pidfile)
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def status(self):
+        """Describes the simulator. Along with the process identifier of the
+        simulator, `pids` lists the one of every process running its servers.
+
+        :rtype: dict"""
+        pids = [os.getpid()]
+        pids += [p.pid for p in self.simulator.processes if hasattr(p, 'pid')]
+        return {
+            'name': self.name,
+            'system': self.simulator.simulator_name,
+            'pid': os.getpid(),
+            'pids': pids,
+            'engine': self.simulator.engine,
+            'workers': len(self.simulator.processes),
+            'servers': len(self.simulator.servers),
+            'uptime': round(time.time() - self.started, 3),
+        }
+
+    def health(self):
+        """Tells how many workers of the simulator are still running.
+
+        :rtype: dict"""
+        alive = sum(p.is_alive() for p in self.simulator.processes)
+        return {
+            'name': self.name,
+            'healthy': alive == len(self.simulator.processes),
+            'alive': alive,
+            'workers': len(self.simulator.processes),
+        }
+
+    def stop(self):
+        """Stops the simulator, waiting for all of its workers to exit.
+
+        :rtype: dict"""
+        self.simulator.halt()
+        return {'name': self.name, 'stopped': True}
+
+    def close(self):
+        """Stops serving the control socket and removes the simulator from
+        the runtime directory. It can be called more than once."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.shutdown()
+        self.server_close()
+        _unlink(self.server_address, self.pidfile)
+
+
+def query(name, command, timeout=10.0, directory=None):
+    """Sends a command to the control socket of the given simulator.
+
+    :param name: the name of the simulator module
+    :param command: the command to be sent, one of `commands`
+    :param timeout: how many seconds to wait for the answer
+    :param directory: the runtime directory, see `runtime_dir` for the
+        default one
+    :type name: str
+    :type command: str
+    :type timeout: float
+    :type directory: str
+    :return: the answer of the simulator
+    :rtype: dict
+    :raises OSError: if the simulator cannot be reached
+    :raises ValueError: if the answer is malformed"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path(name, directory))
+        sock.sendall(f'{command}\n'.encode('ascii'))
+        with sock.makefile('rb') as f:
+            return json.loads(f.readline())
+
+
+def running(directory=None):
+    """Returns the names of the running simulators, by reading their
+    pidfiles. The files left behind by simulators that no longer exist get
+    removed.
+
+    :param directory: the runtime directory, see `runtime_dir` for the
+        default one
+    :type directory: str
+    :rtype: list"""
+    directory = directory or runtime_dir()
+    try:
+        entries = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    names = []
+    for entry in entries:
+        name, extension = os.path.splitext(entry)
+        if extension != '.pid':
+            continue
+        try:
+            with open(os.path.join(directory, entry), encoding='ascii') as f:
+                pid = int(f.read())
+            os.kill(pid, 0)
+        except (ValueError, ProcessLookupError):
+            _unlink(pid_path(name, directory), socket_path(name, directory))
+            continue
+        except PermissionError:  # skip coverage
+            pass  # The process exists but belongs to another user
+        except FileNotFoundError:  # skip coverage
+            continue  # The simulator has just stopped
+        names.append(name)
+    return sorted(names)
+
+
+def stop(name, timeout=10.0, directory=None):
+    """Stops the given simulator through its control socket.
+
+    :param name: the name of the simulator module
+    :param timeout: how many seconds to wait for the simulator to stop
+    :param directory: the runtime directory, see `runtime_dir` for the
+        default one
+    :type name: str
+    :type timeout: float
+    :type directory: str
+    :return: whether the simulator acknowledged the command
+    :rtype: bool"""
+    try:
+        return query(name, 'stop', timeout, directory).get('stopped', False)
+    except (OSError, ValueError):
+        return False
@@ -0,0 +1,171 @@
+"""This module implements the single writer execution model of the servers,
+enabled by the `single_writer` server option. Every `Server` creates its own
+`Dispatcher`, shared by its listening and sending servers, whose thread is
+the only one that parses the received bytes and executes the commands,
+custom commands included, so the state of the system is never changed by two
+clients of the server at the same time. The handlers of the clients only
+receive the bytes, hand them to the dispatcher and send back the responses:
+the threading handlers wait for the result of each call, while the event
+loop protocols await its future, so that the loop keeps serving the other
+clients meanwhile. The `$system_stop%%%%%` command stops the dispatcher
+along with the server, the calls submitted afterwards, i.e. by the clients
+of the other servers, are executed right away by the submitting thread.
+
+The dispatcher executes the queued calls in the order they were submitted,
+taking as many of them as it finds in its queue, up to `batch_size`, every
+time it wakes up. Its counters, along with the percentiles of the time the
+calls waited in the queue and of the time they took to be executed, are
+returned by the ``$dispatcher%%%%%`` custom command, as a JSON object
+wrapped in the custom command header and tail."""
+import json
+import threading
+from queue import SimpleQueue, Empty
+from time import perf_counter
+from concurrent.futures import Future
+from simulators.metrics import Histogram
+
+
+class Dispatcher:
+    """Executes the submitted calls one after the other, in a thread of its
+    own.
+
+    :param name: the name of the thread
+    :param batch_size: the maximum number of calls executed every time the
+        thread wakes up
+    :type name: str
+    :type batch_size: int"""
+
+    def __init__(self, name='dispatcher', batch_size=64):
+        self.batch_size = batch_size
+        self.queue = SimpleQueue()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.reset()
+        self.thread = threading.Thread(target=self._run, name=name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def reset(self):
+        """Clears the counters and the percentiles."""
+        with self.lock:
+            self.calls = 0
+            self.errors = 0
+            self.batches = 0
+            self.max_batch = 0
+            self.max_depth = 0
+            self.waiting = Histogram()
+            self.service = Histogram()
+
+    def submit(self, function, *args):
+        """Queues a call to the given function. A call submitted after the
+        dispatcher was stopped is executed right away, by the calling
+        thread, since the dispatcher would never execute it.
+
+        :param function: the function to be called by the dispatcher
+        :param args: the arguments of the function
+        :return: the future result of the call
+        :rtype: concurrent.futures.Future"""
+        future = Future()
+        with self.lock:
+            # The calls are queued before the stop request or not at all
+            if not self.closed:
+                self.queue.put((function, args, future, perf_counter()))
+                return future
+        try:
+            future.set_result(function(*args))
+        except Exception as ex:
+            future.set_exception(ex)
+        return future
+
+    def call(self, function, *args):
+        """Calls the given function in the thread of the dispatcher and waits
+        for its result. A call made by the dispatcher itself, i.e. by a
+        command that calls another one, or made after the dispatcher was
+        stopped, is executed right away.
+
+        :param function: the function to be called by the dispatcher
+        :param args: the arguments of the function
+        :return: the value returned by the function
+        :raise Exception: the exception raised by the function, if any"""
+        if threading.current_thread() is self.thread:
+            return function(*args)
+        return self.submit(function, *args).result()
+
+    def stop(self):
+        """Stops the thread of the dispatcher, after executing the calls that
+        were already queued, while the calls submitted afterwards are
+        executed right away. When called by the dispatcher itself, it does
+        not wait for them."""
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.queue.put(None)
+        if threading.current_thread() is not self.thread:
+            self.thread.join()
+
+    def _run(self):
+        queue = self.queue
+        stopping = False
+        while not stopping:
+            batch = [queue.get()]
+            depth = queue.qsize() + 1
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                except Empty:
+                    break
+            timings = []
+            for item in batch:
+                if item is None:
+                    stopping = True
+                    continue
+                function, args, future, queued = item
+                started = perf_counter()
+                failed = False
+                try:
+                    future.set_result(function(*args))
+                except Exception as ex:
+                    future.set_exception(ex)
+                    failed = True
+                timings.append(
+                    (started - queued, perf_counter() - started, failed)
+                )
+            self._account(len(batch), depth, timings)
+
+    def _account(self, size, depth, timings):
+        with self.lock:
+            self.batches += 1
+            self.max_batch = max(self.max_batch, size)
+            self.max_depth = max(self.max_depth, depth)
+            for waited, elapsed, failed in timings:
+                self.calls += 1
+                self.errors += int(failed)
+                self.waiting.record(waited)
+                self.service.record(elapsed)
+
+    def counters(self):
+        """Returns the counters of the dispatcher.
+
+        :return: the number of executed calls and of the ones that raised
+            an exception, the number of calls still queued, the maximum
+            number of queued calls, the number of batches and the size of
+            the largest one, and the percentiles of the waiting and service
+            times
+        :rtype: dict"""
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'depth': self.queue.qsize(),
+                'max_depth': self.max_depth,
+                'batches': self.batches,
+                'max_batch': self.max_batch,
+                'waiting': self.waiting.summary(),
+                'service': self.service.summary(),
+            }
+
+    def to_json(self):
+        """Returns the counters as a compact JSON object.
+
+        :rtype: str"""
+        return json.dumps(self.counters(), separators=(',', ':'))
@@ -0,0 +1,106 @@
+"""This module implements the framing stage of the custom commands, the ones
+made of a header, a body and a tail (i.e. ``$system_stop%%%%%``) that every
+listening server accepts along with the commands of its system. Each chunk
+of bytes received from a client is scanned as a whole, by means of
+`bytes.find`, so the chunks that do not contain the header cost a single
+search, no matter how long they are.
+
+The header might as well appear in the messages of the binary protocols
+(i.e. inside a floating point field of an ACU command), so a custom command
+is only accepted when its body is made of printable ASCII characters and is
+not longer than `CustomFraming.max_length`: a header found in a binary frame
+is discarded as soon as a byte that can not belong to a custom command
+follows it, instead of making the following bytes pile up while waiting for
+a tail that might never come."""
+
+
+# The bytes a custom command can be made of, anything else ends it
+_printable = bytes(range(0x20, 0x7F))
+
+
+class CustomFraming:
+    """Finds the custom commands in the chunks of bytes received from a
+    client. A custom command can be split among consecutive chunks, its
+    beginning is kept until the rest of it is received. As for the original
+    per-byte framing, a header found before the tail restarts the command.
+
+    :param header: the header of the custom commands
+    :param tail: the tail of the custom commands
+    :type header: str
+    :type tail: str"""
+
+    #: The maximum length of a custom command, header and tail included
+    max_length = 256
+
+    def __init__(self, header='$', tail='%%%%%'):
+        self.header = header.encode('latin-1')
+        self.tail = tail.encode('latin-1')
+        self.pending = b''
+
+    def reset(self):
+        """Discards the beginning of a custom command received so far, i.e.
+        at the end of a datagram."""
+        self.pending = b''
+
+    def feed(self, data):
+        """Scans a chunk of bytes received from the client.
+
+        :param data: the received chunk of bytes
+        :type data: bytes-like object
+        :return: the bodies of the custom commands completed by the chunk,
+            without their header and tail, in order
+        :rtype: list of strings"""
+        return [body for _, body in self.split(data)]
+
+    def split(self, data):
+        """Scans a chunk of bytes received from the client, telling where
+        each custom command ends, so that the bytes preceding it can be
+        parsed by the system before the command gets executed.
+
+        :param data: the received chunk of bytes
+        :type data: bytes-like object
+        :return: for each custom command completed by the chunk, the offset
+            of the chunk right after its tail and its body, without the
+            header and tail, in order
+        :rtype: list of (int, string) tuples"""
+        header, tail = self.header, self.tail
+        offset = len(self.pending)
+        if self.pending:
+            data = self.pending + data
+            self.pending = b''
+        else:
+            data = bytes(data)
+            if header not in data:
+                return []
+        commands = []
+        start = data.find(header)
+        while start != -1:
+            end = data.find(tail, start + 1)
+            if end == -1:
+                # The command, if any, is completed by the next chunks
+                start = data.rfind(header, start)
+                if self._acceptable(data[start:], 0):
+                    self.pending = data[start:]
+                break
+            # The last header before the tail is the one that counts
+            start = data.rfind(header, start, end)
+            if self._acceptable(data[start:end], len(tail)):
+                commands.append((
+                    end + len(tail) - offset,
+                    data[start + 1:end].decode('latin-1')
+                ))
+            start = data.find(header, end + len(tail))
+        return commands
+
+    def _acceptable(self, command, missing):
+        """Tells whether the given bytes can be (the beginning of) a custom
+        command.
+
+        :param command: the bytes starting with the header
+        :param missing: the number of bytes still missing from the command
+        :type command: bytes
+        :type missing: int
+        :rtype: bool"""
+        if len(command) + missing > self.max_length:
+            return False
+        return not command.translate(None, _printable)
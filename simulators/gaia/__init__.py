@@ -1,7 +1,7 @@
 import codecs
 from random import randint
-from socketserver import ThreadingUDPServer
 from simulators.common import ListeningSystem
+from simulators.server import BatchedUDPServer
 
 
 # Each system module (like active_surface.py, acu.py, etc.) has to
@@ -11,7 +11,7 @@ from simulators.common import ListeningSystem
 # is the tuple that defines the optional sending node that exposes the
 # subscribe and unsubscribe methods, while kwargs is a dict of optional
 # extra arguments.
-servers = [(('0.0.0.0', 12400), (), ThreadingUDPServer, {})]
+servers = [(('0.0.0.0', 12400), (), BatchedUDPServer, {})]
 
 
 class System(ListeningSystem):
@@ -0,0 +1,322 @@
+"""This module emulates an impaired network between the simulators and their
+clients, enabled by the `impairment` server option. Every chunk of bytes a
+server sends to a client goes through a `Link`, which delays it by a fixed
+latency plus a random jitter, limits the bandwidth of the connection, drops
+it, or resets the whole connection, according to the settings of the
+`Impairment` of the server. The delayed chunks are written by a timer, so
+the thread (or the event loop) that handles the client is never blocked.
+The timer never blocks either, the servers give every link a write function
+that does not wait for the client, so a client that does not read its data
+does not delay the other ones.
+
+The settings of a running server can be changed by sending it the
+``$impair:<name>=<value>,...%%%%%`` custom command, ``$impair:off%%%%%``
+clears all of them and ``$impair%%%%%`` just returns them, as a JSON object
+wrapped in the custom command header and tail."""
+import os
+import json
+import time
+import heapq
+import random
+import logging
+import itertools
+import threading
+from collections import deque
+from simulators.broadcast import Subscriber
+
+
+class Impairment:
+    """The settings of the emulated network, shared by all the clients of a
+    server. They are:
+
+    * `latency`: the delay of each chunk of sent bytes, in milliseconds;
+    * `jitter`: the maximum random deviation from the latency, in
+      milliseconds. Chunks are never reordered on a connection;
+    * `bandwidth`: the maximum bytes per second sent to each client, 0
+      meaning no limit;
+    * `drop`: the probability for each chunk of sent bytes to be lost. A
+      TCP segment that is lost gets retransmitted, so the chunk is delayed
+      by `rto` milliseconds instead, while a UDP datagram is discarded;
+    * `reset`: the probability, for each chunk of sent bytes, that the TCP
+      connection gets reset instead;
+    * `rto`: the retransmission timeout of the lost TCP segments, in
+      milliseconds, 200 by default.
+
+    :param settings: the settings, by name"""
+
+    settings = ('latency', 'jitter', 'bandwidth', 'drop', 'reset', 'rto')
+    defaults = {'rto': 200.0}
+
+    def __init__(self, **settings):
+        self.latency = 0.0
+        self.jitter = 0.0
+        self.bandwidth = 0.0
+        self.drop = 0.0
+        self.reset = 0.0
+        self.rto = self.defaults['rto']
+        self.active = False
+        self.update(settings)
+
+    @classmethod
+    def parse(cls, value):
+        """Builds the settings out of the value of the `impairment` server
+        option.
+
+        :param value: a comma separated list of `name=value` settings, i.e.
+            `latency=50,jitter=10`, or True for a network with no impairment
+            to be configured later on
+        :type value: str or bool
+        :rtype: Impairment
+        :raise ValueError: if any setting is unknown or out of range"""
+        impairment = cls()
+        if isinstance(value, str):
+            impairment.configure(*value.split(','))
+        return impairment
+
+    def configure(self, *params):
+        """Changes the settings, as the `$impair` custom command does. No
+        setting is changed if any of them is wrong.
+
+        :param params: the `name=value` settings, or `off` to clear them
+        :type params: str
+        :raise ValueError: if any setting is unknown or out of range"""
+        settings = {}
+        for param in params:
+            param = param.strip()
+            if not param:
+                continue
+            if param == 'off':
+                settings.update(
+                    (name, self.defaults.get(name, 0.0))
+                    for name in self.settings
+                )
+                continue
+            name, _, value = param.partition('=')
+            settings[name] = float(value)
+        self.update(settings)
+
+    def update(self, settings):
+        """Changes the given settings.
+
+        :param settings: the settings, by name
+        :type settings: dict
+        :raise ValueError: if any setting is unknown or out of range"""
+        for name, value in settings.items():
+            if name not in self.settings:
+                raise ValueError(
+                    f"Unknown impairment '{name}', "
+                    + f'choose among {self.settings}.'
+                )
+            if value < 0 or (name in ('drop', 'reset') and value > 1):
+                raise ValueError(f"Impairment '{name}' out of range: {value}.")
+        for name, value in settings.items():
+            setattr(self, name, float(value))
+        self.active = any(
+            getattr(self, name) for name in self.settings if name != 'rto'
+        )
+
+    def to_dict(self):
+        """Returns the settings.
+
+        :rtype: dict"""
+        return {name: getattr(self, name) for name in self.settings}
+
+    def to_json(self):
+        """Returns the settings as a compact JSON object.
+
+        :rtype: str"""
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    def link(self, write, abort=None, schedule=None):
+        """Returns a new link, delivering the data of a single client (or of
+        all the clients of a UDP server) through the emulated network.
+
+        :param write: the function writing a chunk of bytes to the client
+        :param abort: the function resetting the connection, None for
+            connectionless clients, whose chunks are discarded when dropped
+        :param schedule: the function calling another function at a given
+            `time.perf_counter()` time, by default the one of the process
+            `Scheduler`
+        :type write: callable
+        :type abort: callable
+        :type schedule: callable
+        :rtype: Link"""
+        return Link(self, write, abort, schedule)
+
+
+class Link:
+    """Delivers the chunks of bytes sent to a client through the emulated
+    network. Chunks are queued and written in order by the scheduler, as
+    soon as they are due, one timer at a time.
+
+    :param impairment: the settings of the emulated network
+    :param write: the function writing a chunk of bytes to the client, it
+        gets called with the same arguments passed to `send`
+    :param abort: the function resetting the connection, if any
+    :param schedule: the function calling another function at a given time
+    :type impairment: Impairment
+    :type write: callable
+    :type abort: callable
+    :type schedule: callable"""
+
+    def __init__(self, impairment, write, abort=None, schedule=None):
+        self.impairment = impairment
+        self.write = write
+        self.abort = abort
+        self.schedule = schedule or Scheduler.get().call_at
+        self.lock = threading.Lock()
+        self.queue = deque()
+        self.scheduled = False
+        self.closed = False
+        self.free = 0.0  # when the last chunk is completely transmitted
+        self.due = 0.0  # when the last chunk is written
+        self.dropped = 0
+
+    def send(self, data, *args):
+        """Sends a chunk of bytes, or drops it, or resets the connection.
+        It never blocks, the chunk is written by the scheduler when it is
+        due, unless the network is not impaired and no other chunk is
+        waiting to be written.
+
+        :param data: the chunk of bytes to be sent
+        :param args: any other argument of the `write` function
+        :type data: bytes"""
+        impairment = self.impairment
+        with self.lock:
+            if self.closed:
+                return
+            if not impairment.active and not self.scheduled:
+                self.write(data, *args)
+                return
+            if self.abort and random.random() < impairment.reset:
+                self.closed = True
+                self.queue.clear()
+                self.abort()
+                return
+            now = time.perf_counter()
+            self.free = max(now, self.free)
+            if impairment.bandwidth:
+                self.free += len(data) / impairment.bandwidth
+            delay = impairment.latency + random.uniform(
+                -impairment.jitter,
+                impairment.jitter
+            )
+            due = self.free + max(delay, 0.0) / 1000
+            if random.random() < impairment.drop:
+                if not self.abort:
+                    self.dropped += 1
+                    return
+                due += impairment.rto / 1000
+            self.due = max(due, self.due)
+            self.queue.append((self.due, data, args))
+            if self.scheduled:
+                return
+            self.scheduled = True
+        self.schedule(self.due, self._deliver)
+
+    def _deliver(self):
+        with self.lock:
+            _, data, args = self.queue.popleft()
+        try:
+            self.write(data, *args)
+        except OSError:
+            # The client disconnected while its data was on the way
+            pass
+        with self.lock:
+            if not self.queue:
+                self.scheduled = False
+                return
+            due = self.queue[0][0]
+        self.schedule(due, self._deliver)
+
+
+class ImpairedSubscriber(Subscriber):
+    """Delivers the messages published by a system to another subscriber
+    through a `Link`, so that the status messages of a sending server travel
+    through the emulated network as well.
+
+    :param subscriber: the subscriber the messages are delivered to
+    :param link: the link the messages go through, whose `write` function
+        is the `deliver` method of the subscriber
+    :type subscriber: Subscriber
+    :type link: Link"""
+
+    def __init__(self, subscriber, link):
+        super().__init__(subscriber.address)
+        self.subscriber = subscriber
+        self.link = link
+
+    def deliver(self, message):
+        self.link.send(message)
+
+    def counters(self):
+        return self.subscriber.counters()
+
+
+class Scheduler:
+    """A daemon thread calling the given functions at the given times, shared
+    by all the threading servers of the current process. Use
+    `Scheduler.get()` to retrieve the scheduler of the current process."""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.timers = []
+        self.counter = itertools.count()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def get(cls):
+        """Returns the scheduler of the current process, starting it the
+        first time it is requested.
+
+        :rtype: Scheduler"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @classmethod
+    def _after_fork(cls):
+        # As the `EventLoop` thread, the scheduler thread does not survive a
+        # fork, the child process will start its own scheduler
+        cls._instance = None
+        cls._lock = threading.Lock()
+
+    def call_at(self, when, function, *args):
+        """Calls a function at the given time.
+
+        :param when: the `time.perf_counter()` time of the call
+        :param function: the function to be called
+        :param args: the function arguments
+        :type when: float
+        :type function: callable"""
+        with self.condition:
+            heapq.heappush(
+                self.timers,
+                (when, next(self.counter), function, args)
+            )
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while True:
+                    now = time.perf_counter()
+                    if self.timers and self.timers[0][0] <= now:
+                        break
+                    timeout = self.timers[0][0] - now if self.timers else None
+                    self.condition.wait(timeout)
+                _, _, function, args = heapq.heappop(self.timers)
+            try:
+                function(*args)
+            except Exception as ex:  # skip coverage
+                logging.debug('unexpected exception %s', ex)
+
+
+os.register_at_fork(
+    after_in_child=Scheduler._after_fork  # pylint: disable=protected-access
+)
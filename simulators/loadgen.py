@@ -0,0 +1,410 @@
+"""This module implements a load generator for the running simulators. Many
+concurrent clients, all of them served by a single `asyncio` event loop,
+open a connection each to the listening servers of a simulator and keep
+sending it well formed commands, built by means of the same helpers the
+tests use (`acu_utils`, the `command_library` of the active surface, the
+`grammar` of the backends and so on), either as fast as the simulator
+answers or at a given aggregate rate.
+
+The outcome of a run is summarized by the `run` function: throughput,
+latency percentiles, errors and the CPU time spent by the processes of the
+simulator, found by means of the control plane, see the `control` module.
+The same results are printed as JSON by the ``discos-simulator bench``
+command, so that different runs can be compared."""
+import os
+import time
+import asyncio
+import itertools
+from simulators import control
+from simulators.metrics import Histogram
+
+
+class Workload:
+    """Describes the traffic a simulator is loaded with.
+
+    :param request: a function returning the request to be sent, given its
+        sequence number, unique among all the clients of a run
+    :param reply: the terminator of the answers (bytes), their length (int),
+        or None if the simulator does not answer
+    :param failed: a function telling whether an answer reports an error
+    :param greeting: whether the simulator greets each client with a
+        message, terminated as the answers, as soon as it connects
+    :param setup: bytes sent once on each connection, before the load, that
+        get no answer
+    :param rate: the default aggregate rate of the requests, per second,
+        0 meaning as fast as the simulator answers
+    :param system_types: the configurations the workload applies to, all
+        of them if None
+    :type request: callable
+    :type reply: bytes, int
+    :type failed: callable
+    :type greeting: bool
+    :type setup: bytes
+    :type rate: float
+    :type system_types: tuple
+    """
+
+    def __init__(self, request, reply=None, failed=None, greeting=False,
+                 setup=b'', rate=0, system_types=None):
+        self.request = request
+        self.reply = reply
+        self.failed = failed
+        self.greeting = greeting
+        self.setup = setup
+        self.rate = rate
+        self.system_types = system_types
+
+    async def read(self, reader):
+        """Reads an answer from the given stream.
+
+        :param reader: the stream of the connection
+        :type reader: asyncio.StreamReader
+        :return: the answer
+        :rtype: bytes"""
+        if isinstance(self.reply, int):
+            return await reader.readexactly(self.reply)
+        return await reader.readuntil(self.reply)
+
+
+def _cycle(*requests):
+    return lambda index: requests[index % len(requests)]
+
+
+def _acu():
+    # pylint: disable=import-outside-toplevel
+    from simulators import utils
+    from simulators.acu import acu_utils
+
+    # `Command.get` waits 1ms for each command, in order to get unique
+    # counters, here the counters come from the sequence number instead
+    first = utils.day_milliseconds()
+
+    def request(index):
+        counter = first + 2 * index
+        command = acu_utils.ModeCommand(1, 7).get(counter + 1)  # AZ stop
+        return (
+            acu_utils.start_flag
+            + utils.uint_to_string(20 + len(command))
+            + utils.uint_to_string(counter)
+            + utils.uint_to_string(1)
+            + command
+            + acu_utils.end_flag
+        ).encode('latin-1')
+
+    # No answer, the ACU starts a thread for each command: keep it slow
+    return Workload(request, rate=50)
+
+
+def _active_surface():
+    # pylint: disable=import-outside-toplevel
+    from simulators.active_surface import command_library
+
+    requests = [
+        command_library.get_position(usd_index=index).encode('latin-1')
+        for index in range(1, 18)
+    ]
+    return Workload(
+        _cycle(*requests),
+        reply=8,
+        failed=lambda answer: answer[0] != 0x06,  # ACK
+        # A broadcast command, so that the USDs answer with no delay
+        setup=command_library.set_response_delay(0).encode('latin-1'),
+    )
+
+
+def _backend():
+    # pylint: disable=import-outside-toplevel
+    from simulators.backend import grammar
+
+    def failed(answer):
+        try:
+            message = grammar.parse_message(answer.decode('latin-1'))
+        except grammar.GrammarException:
+            return True
+        return message.code != grammar.OK
+
+    request = grammar.Message(message_type=grammar.REQUEST, name='status')
+    return Workload(
+        _cycle(str(request).encode('latin-1')),
+        reply=grammar.TAIL.encode('latin-1'),
+        failed=failed,
+        greeting=True,
+    )
+
+
+def _receiver():
+    # pylint: disable=import-outside-toplevel
+    from simulators.receiver import System
+    from simulators.receiver import DEFINITIONS as DEF
+
+    # Every server has a single board, whatever its address, which answers
+    # a broadcast inquiry with an acknowledgement and its last command
+    inquiry = (
+        DEF.CMD_SOH
+        + DEF.SLAVE_ADDR_BROADCAST_WITH_ANSWER
+        + DEF.MASTER_ADDRESSES[0]
+        + DEF.CMD_EXT_INQUIRY
+        + '\x00'
+    )
+    inquiry += System.checksum(inquiry) + DEF.CMD_ETX
+    return Workload(
+        _cycle(inquiry.encode('latin-1')),
+        reply=20,
+        failed=lambda answer: answer[5] != ord(DEF.CMD_ACK),
+    )
+
+
+def _text(requests, terminator, accepted=None, system_types=None):
+    def factory():
+        def failed(answer):
+            return not answer.startswith(accepted)
+        return Workload(
+            _cycle(*requests),
+            reply=terminator,
+            failed=failed if accepted else None,
+            system_types=system_types,
+        )
+    return factory
+
+
+#: The function building the `Workload` of each simulator, by name.
+workloads = {
+    'acu': _acu,
+    'active_surface': _active_surface,
+    'backend': _backend,
+    'calmux': _text([b'?\n'], b'\n'),
+    'dbesm': _text([b'DBE GETSTATUS BOARD 1\r\n'], b'\r\n', b'ACK'),
+    'lo': _text([b'FREQ?\n', b'POWER?\n'], b'\n', None, ('generic_LO',)),
+    'minor_servos': _text([b'STATUS\r\n'], b'\r\n', b'OUTPUT:GOOD'),
+    'receiver': _receiver,
+    'solar_attenuator': _text([b'get W_mode\r\n'], b'\r\n'),
+    'switch_matrix': _text([b'get IF_switch_config\r\n'], b'\r\n'),
+    'totalpower': _text([b'?\n'], b'\r\n'),
+}
+
+
+def addresses(description, system_types=None):
+    """Returns the local addresses of the TCP servers of a simulator.
+
+    :param description: the description of the simulator, as found in the
+        registry, see the `registry` module
+    :param system_types: the configurations to be considered, all of them
+        if None
+    :type description: dict
+    :type system_types: tuple
+    :rtype: list"""
+    result = []
+    for server in description['servers']:
+        if server['server_type'] != 'ThreadingTCPServer':
+            continue
+        if not server['l_address']:  # skip coverage
+            continue
+        system_type = server['kwargs'].get('system_type')
+        if system_types and system_type not in system_types:
+            continue
+        host, port = server['l_address']
+        host = '127.0.0.1' if host in ('0.0.0.0', '') else host
+        result.append((host, port))
+    return result
+
+
+def cpu_time(pids):
+    """Returns the CPU time spent so far by the given processes.
+
+    :param pids: the process identifiers
+    :type pids: list
+    :return: the user plus system time, in seconds, of the processes that
+        are still running
+    :rtype: float"""
+    ticks = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat', encoding='ascii') as f:
+                # The process name might contain spaces, skip it
+                fields = f.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        ticks += int(fields[11]) + int(fields[12])  # utime, stime
+    return ticks / os.sysconf('SC_CLK_TCK')
+
+
+class _Run:
+    """The state of a run, shared by all of its clients."""
+
+    connect_timeout = 10.0
+
+    def __init__(self, workload, rate, clients, duration, timeout, pids):
+        self.workload = workload
+        self.pids = pids
+        self.cpu = None
+        self.interval = clients / rate if rate else 0
+        self.clients = clients
+        self.duration = duration
+        self.timeout = timeout
+        self.sequence = itertools.count()
+        self.latency = Histogram()
+        self.sent = 0
+        self.answered = 0
+        self.errors = {'protocol': 0, 'timeout': 0, 'connection': 0}
+        self.start = None
+        self.deadline = None
+
+    async def connect(self, address):
+        """Opens a connection, waiting for the greeting of the simulator, if
+        any, and sending the setup bytes of the workload."""
+        async def _connect():
+            reader, writer = await asyncio.open_connection(*address)
+            if self.workload.greeting:
+                await self.workload.read(reader)
+            if self.workload.setup:
+                writer.write(self.workload.setup)
+                await writer.drain()
+            return reader, writer
+        # The listen backlog of the servers is short, with many clients
+        # connecting at once some SYN get retransmitted after 1s, 3s...
+        return await asyncio.wait_for(_connect(), self.connect_timeout)
+
+    async def client(self, index, address, connection):
+        """Keeps loading the simulator until the end of the run, reconnecting
+        after each timeout or connection error."""
+        # Clients are evenly spread over the interval between two requests
+        scheduled = self.start + self.interval * (index / self.clients - 1)
+        while time.perf_counter() < self.deadline:
+            writer = None
+            try:
+                if isinstance(connection, BaseException):
+                    raise connection
+                reader, writer = connection or await self.connect(address)
+                connection = None
+                while True:
+                    if self.interval:
+                        scheduled = max(
+                            scheduled + self.interval,
+                            time.perf_counter() - 1.0  # no bursts
+                        )
+                        delay = scheduled - time.perf_counter()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                    now = time.perf_counter()
+                    if now >= self.deadline:
+                        break
+                    # With a given rate, latencies are measured from the
+                    # scheduled time, in order to account for the requests
+                    # that could not be sent in time
+                    sent = min(scheduled, now) if self.interval else now
+                    writer.write(self.workload.request(next(self.sequence)))
+                    self.sent += 1
+                    await writer.drain()
+                    if self.workload.reply is not None:
+                        answer = await asyncio.wait_for(
+                            self.workload.read(reader),
+                            self.timeout
+                        )
+                        self.answered += 1
+                        failed = self.workload.failed
+                        if failed and failed(answer):
+                            self.errors['protocol'] += 1
+                    self.latency.record(time.perf_counter() - sent)
+            except asyncio.TimeoutError:
+                self.errors['timeout' if writer else 'connection'] += 1
+            except (OSError, asyncio.IncompleteReadError):
+                self.errors['connection'] += 1
+                await asyncio.sleep(0.1)
+            finally:
+                connection = None
+                if writer is not None:
+                    writer.close()
+
+    async def load(self, targets):
+        """Connects all the clients, then starts the run."""
+        assigned = [
+            targets[index % len(targets)] for index in range(self.clients)
+        ]
+        connections = await asyncio.gather(
+            *[self.connect(address) for address in assigned],
+            return_exceptions=True
+        )
+        self.cpu = cpu_time(self.pids)
+        self.start = time.perf_counter()
+        self.deadline = self.start + self.duration
+        await asyncio.gather(*[
+            self.client(index, address, connection)
+            for index, (address, connection)
+            in enumerate(zip(assigned, connections))
+        ])
+
+    def results(self):
+        elapsed = time.perf_counter() - self.start
+        errors = sum(self.errors.values())
+        latency = self.latency.summary()
+        latency.pop('count')
+        server_cpu = None
+        if self.pids:
+            cpu = cpu_time(self.pids) - self.cpu
+            server_cpu = {
+                'seconds': round(cpu, 3),
+                'percent': round(cpu / elapsed * 100, 1),
+            }
+        return {
+            'requests': self.sent,
+            'answers': self.answered if self.workload.reply else None,
+            'throughput_rps': round(self.sent / self.duration, 1),
+            'errors': dict(self.errors),
+            'error_rate': round(errors / self.sent, 6) if self.sent else None,
+            'latency': latency,
+            'server_cpu': server_cpu,
+        }
+
+
+def run(name, description, clients=8, rate=None, duration=10.0,
+        timeout=1.0):
+    """Loads a running simulator and summarizes its behavior.
+
+    :param name: the name of the simulator, see `workloads`
+    :param description: the description of the simulator, as found in the
+        registry, see the `registry` module
+    :param clients: the number of concurrent clients, each one with its own
+        connection, spread over the servers of the simulator
+    :param rate: the aggregate rate of the requests, per second, 0 meaning
+        as fast as the simulator answers, by default the one of the workload
+    :param duration: the duration of the run, in seconds
+    :param timeout: the seconds a client waits for an answer
+    :type name: str
+    :type description: dict
+    :type clients: int
+    :type rate: float
+    :type duration: float
+    :type timeout: float
+    :return: the parameters of the run, the number of requests, answers and
+        errors, the throughput, the latency percentiles (when the simulator
+        does not answer, the time it took to send each request) and the
+        CPU time spent by the simulator processes, if it is registered to the
+        control plane
+    :rtype: dict
+    :raises ValueError: if no workload is defined for the simulator, or the
+        simulator has no TCP server"""
+    if name not in workloads:
+        raise ValueError(
+            f"No workload for simulator '{name}', choose among '"
+            + "', '".join(sorted(workloads)) + "'."
+        )
+    workload = workloads[name]()
+    rate = workload.rate if rate is None else rate
+    targets = addresses(description, workload.system_types)
+    if not targets:
+        raise ValueError(f"Simulator '{name}' has no TCP server to load.")
+    try:
+        pids = control.query(name, 'status')['pids']
+    except (OSError, ValueError, KeyError):
+        pids = []
+    run_state = _Run(workload, rate, clients, duration, timeout, pids)
+    asyncio.run(run_state.load(targets))
+    results = {
+        'system': name,
+        'clients': clients,
+        'rate': rate,
+        'duration_s': duration,
+        'servers': len(targets),
+    }
+    results.update(run_state.results())
+    return results
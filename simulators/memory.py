@@ -0,0 +1,199 @@
+"""This module helps finding the memory leaks of the running simulators. It
+can trace the memory allocations of the process by means of `tracemalloc`,
+comparing consecutive snapshots in order to find the allocation sites that
+keep growing, and it can periodically write the resident set size of the
+process, along with the number of objects tracked by the garbage collector,
+to a local file.
+
+Both tools are driven by the ``$memory_*%%%%%`` custom commands, see the
+`BaseSystem` class."""
+import gc
+import os
+import json
+import time
+import threading
+import tracemalloc
+
+
+_filters = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def rss():
+    """Returns the resident set size of the current process.
+
+    :return: the resident set size in bytes, None if unknown
+    :rtype: int"""
+    try:
+        with open('/proc/self/statm', encoding='ascii') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):  # skip coverage
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def sample():
+    """Measures the memory usage of the current process.
+
+    :return: the timestamp, the resident set size, the number of objects
+        tracked by the garbage collector, the number of threads and, if
+        `tracemalloc` is tracing, the current and peak size of the traced
+        memory blocks
+    :rtype: dict"""
+    measure = {
+        'time': round(time.time(), 3),
+        'rss': rss(),
+        'objects': len(gc.get_objects()),
+        'threads': threading.active_count(),
+    }
+    if tracemalloc.is_tracing():
+        measure['traced'], measure['traced_peak'] = (
+            tracemalloc.get_traced_memory()
+        )
+    return measure
+
+
+class MemorySampler:
+    """Periodically appends the memory usage of the current process to a
+    file, a JSON object for each line, see the `sample` function.
+
+    :param path: the path of the file
+    :param interval: the seconds between two consecutive samples
+    :type path: str
+    :type interval: float
+    """
+
+    def __init__(self, path, interval=60.0):
+        if interval <= 0:
+            raise ValueError('The sampling interval must be positive.')
+        self.path = path
+        self.interval = interval
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Takes a first sample, then keeps sampling in a daemon thread."""
+        self.sample()
+        self._thread = threading.Thread(
+            target=self._run,
+            name='memory-sampler',
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stops sampling, waiting for the sampling thread to exit."""
+        self._stop.set()
+        self._thread.join()
+
+    def sample(self):
+        """Appends a single sample to the file."""
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(sample()) + '\n')
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+
+_lock = threading.Lock()
+_snapshot = None
+_sampler = None
+
+
+def start_tracing(frames=1):
+    """Starts tracing the memory allocations and takes the first snapshot,
+    the one the next `diff` is computed against.
+
+    :param frames: how many frames of each allocation traceback are kept,
+        allocations with different tracebacks are told apart
+    :type frames: int"""
+    global _snapshot  # pylint: disable=global-statement
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _snapshot = tracemalloc.take_snapshot().filter_traces(_filters)
+
+
+def diff(limit=10):
+    """Takes a new snapshot and compares it with the previous one, which it
+    replaces, so that each call reports what changed since the last call.
+
+    :param limit: the maximum number of allocation sites to be reported
+    :type limit: int
+    :return: the total traced size and the allocation sites whose size
+        changed the most, each one with its size and number of blocks along
+        with their difference from the previous snapshot
+    :rtype: dict
+    :raises RuntimeError: if the memory allocations are not being traced"""
+    global _snapshot  # pylint: disable=global-statement
+    with _lock:
+        if not tracemalloc.is_tracing() or _snapshot is None:
+            raise RuntimeError('The memory allocations are not traced.')
+        snapshot = tracemalloc.take_snapshot().filter_traces(_filters)
+        previous, _snapshot = _snapshot, snapshot
+    statistics = snapshot.compare_to(previous, 'traceback')
+    sites = []
+    for statistic in statistics[:limit]:
+        frame = statistic.traceback[0]
+        sites.append({
+            'site': f'{frame.filename}:{frame.lineno}',
+            'size': statistic.size,
+            'size_diff': statistic.size_diff,
+            'count': statistic.count,
+            'count_diff': statistic.count_diff,
+        })
+    return {
+        'traced': sum(statistic.size for statistic in statistics),
+        'sites': sites,
+    }
+
+
+def stop_tracing():
+    """Stops tracing the memory allocations, discarding the last snapshot.
+    """
+    global _snapshot  # pylint: disable=global-statement
+    with _lock:
+        _snapshot = None
+        tracemalloc.stop()
+
+
+def start_sampler(path, interval=60.0):
+    """Starts writing the memory usage of the current process to the given
+    file, unless a sampler is already running.
+
+    :param path: the path of the file
+    :param interval: the seconds between two consecutive samples
+    :type path: str
+    :type interval: float
+    :return: whether a new sampler was started
+    :rtype: bool"""
+    global _sampler  # pylint: disable=global-statement
+    with _lock:
+        if _sampler is not None:
+            return False
+        sampler = MemorySampler(path, interval)
+        sampler.start()
+        _sampler = sampler
+        return True
+
+
+def stop_sampler():
+    """Stops the running sampler.
+
+    :return: the path of the file and the number of written samples
+    :rtype: (str, int)
+    :raises RuntimeError: if no sampler is running"""
+    global _sampler  # pylint: disable=global-statement
+    with _lock:
+        sampler, _sampler = _sampler, None
+    if sampler is None:
+        raise RuntimeError('No memory sampler is running.')
+    sampler.stop()
+    return sampler.path, sampler.samples
@@ -0,0 +1,182 @@
+"""This module implements the instrumentation of the servers, enabled by the
+`stats` server option. For each command it records how many times it was
+received, how many errors it caused and how long the server took to parse
+and answer it, along with the bytes received from and sent to the clients.
+The collected metrics are returned by the ``$stats%%%%%`` custom command and
+cleared by the ``$stats_reset%%%%%`` one."""
+import json
+import math
+import time
+import threading
+
+
+class Histogram:
+    """A latency histogram with logarithmic buckets, each power of two being
+    split into `sub_buckets` buckets, so that recording a value takes a
+    constant time and memory no matter how many values are recorded. The
+    percentiles are reported as the upper bound of their bucket, with a
+    relative error smaller than 10%.
+
+    >>> histogram = Histogram()
+    >>> for latency in (0.001, 0.002, 0.003, 0.004):
+    ...     histogram.record(latency)
+    >>> histogram.count
+    4
+    >>> 0.002 <= histogram.percentile(50) < 0.0022
+    True
+    """
+
+    sub_buckets = 8
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        """Records a value.
+
+        :param value: the value to be recorded, in seconds
+        :type value: float"""
+        nanoseconds = max(value * 1e9, 1.0)
+        index = math.ceil(math.log2(nanoseconds) * self.sub_buckets)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """Returns the given percentile of the recorded values.
+
+        :param percent: the desired percentile, between 0 and 100
+        :type percent: float
+        :return: the percentile, in seconds, or None if no value was
+            recorded
+        :rtype: float"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                break
+        # pylint: disable=undefined-loop-variable
+        upper = 2 ** (index / self.sub_buckets) / 1e9
+        return min(upper, self.max)
+
+    def summary(self):
+        """Summarizes the recorded values.
+
+        :return: the count of values, their mean, p50, p95, p99 and max
+            values, in microseconds
+        :rtype: dict"""
+        def _us(value):
+            return round(value * 1e6, 1) if value is not None else None
+        return {
+            'count': self.count,
+            'mean_us': _us(self.total / self.count if self.count else None),
+            'p50_us': _us(self.percentile(50)),
+            'p95_us': _us(self.percentile(95)),
+            'p99_us': _us(self.percentile(99)),
+            'max_us': _us(self.max if self.count else None),
+        }
+
+
+class Metrics:
+    """Collects the metrics of the servers sharing the same `System`
+    instance. It can be updated by many handler threads at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clears all the collected metrics."""
+        with self.lock:
+            self.started = time.time()
+            self.commands = {}
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def record(self, name, elapsed, errors=0, received=0, sent=0):
+        """Records the execution of a command.
+
+        :param name: the name of the command
+        :param elapsed: the seconds the server took to handle the command
+        :param errors: the number of errors caused by the command
+        :param received: the number of bytes received from the client
+        :param sent: the number of bytes sent back to the client
+        :type name: str
+        :type elapsed: float
+        :type errors: int
+        :type received: int
+        :type sent: int"""
+        with self.lock:
+            command = self.commands.get(name)
+            if command is None:
+                command = self.commands[name] = [0, Histogram()]
+            command[0] += errors
+            command[1].record(elapsed)
+            self.bytes_in += received
+            self.bytes_out += sent
+
+    def transfer(self, received=0, sent=0):
+        """Records the bytes received from and sent to a client, whether
+        they carry any complete command or not.
+
+        :param received: the number of bytes received from the client
+        :param sent: the number of bytes sent back to the client
+        :type received: int
+        :type sent: int"""
+        with self.lock:
+            self.bytes_in += received
+            self.bytes_out += sent
+
+    def to_dict(self):
+        """Returns the collected metrics.
+
+        :return: the seconds elapsed since the last reset, the received and
+            sent bytes and, for each command, the number of calls and errors
+            and the latency percentiles
+        :rtype: dict"""
+        with self.lock:
+            commands = {}
+            for name, (errors, histogram) in sorted(self.commands.items()):
+                command = histogram.summary()
+                command['calls'] = command.pop('count')
+                command['errors'] = errors
+                commands[name] = command
+            return {
+                'elapsed_s': round(time.time() - self.started, 3),
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'commands': commands,
+            }
+
+    def to_json(self):
+        """Returns the collected metrics as a compact JSON object, see
+        `to_dict`.
+
+        :rtype: str"""
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    def to_text(self):
+        """Returns the collected metrics as a compact text, a line for the
+        totals followed by a line for each command.
+
+        :rtype: str"""
+        metrics = self.to_dict()
+        lines = [
+            f"elapsed={metrics['elapsed_s']}s in={metrics['bytes_in']}B "
+            + f"out={metrics['bytes_out']}B"
+        ]
+        for name, command in metrics['commands'].items():
+            lines.append(
+                f"{name} calls={command['calls']} "
+                + f"errors={command['errors']} "
+                + f"p50={command['p50_us']}us p95={command['p95_us']}us "
+                + f"p99={command['p99_us']}us max={command['max_us']}us"
+            )
+        return '\n'.join(lines)
@@ -164,24 +164,27 @@ class Servo:
 
 
 class History:
-    lock = Lock()
+    """The positions commanded to a servo, along with their timestamps. Every
+    servo has its own history, guarded by its own lock, so the servos do not
+    wait for each other."""
 
     def __init__(self, n_axes):
         self.n_axes = n_axes
+        self.lock = Lock()
         self.history = []
         self.insert(n_axes * [0])
 
     def insert(self, position, timestamp=None):
         target_time = timestamp if timestamp else Servo.ctime()
         data = [target_time] + list(position)
-        with History.lock:
+        with self.lock:
             self.history.append(data)
             self.history.sort(key=operator.itemgetter(0))
             self.history = self.history[-2 ** 15:]  # Last 2**15 positions
 
     def clean(self, since=0):
         target_time = since if since else Servo.ctime()
-        with History.lock:
+        with self.lock:
             idx = len(self.history)
             self.history.sort(key=operator.itemgetter(0))
             for idx, item in enumerate(self.history):
@@ -195,9 +198,9 @@ class History:
         as [timestamp, axisA, ..., axisN]"""
         if target_time is None:
             target_time = Servo.ctime()
-        size = len(self.history)
         idx = -1
-        with History.lock:
+        with self.lock:
+            size = len(self.history)
             while idx >= -size:
                 current = self.history[idx]
                 if target_time >= current[0]:
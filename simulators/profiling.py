@@ -0,0 +1,178 @@
+"""This module implements a sampling profiler for the running simulators.
+Once started, a daemon thread periodically takes the stacks of all the other
+threads of the process (the server handlers, the update loops of the systems
+and so on) and counts how many times each stack was seen. Sampling does not
+require to trace every function call, so its overhead is low enough to be
+used on a simulator that is falling behind, and it covers the threads that
+were already running when the profiler was started.
+
+The profiler is driven by the ``$profile_start%%%%%`` and
+``$profile_stop%%%%%`` custom commands, see the `BaseSystem` class."""
+import os
+import re
+import sys
+import time
+import tempfile
+import threading
+from collections import Counter
+
+
+default_interval = 0.005  # 5ms
+
+
+def _frame_label(code):
+    filename = os.path.basename(code.co_filename)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def _thread_label(name):
+    # Threads running the same target get the same label
+    return re.sub(r'-\d+', '', name)
+
+
+class Sampler:
+    """Samples the stacks of all the threads of the current process.
+
+    :param interval: the seconds between two consecutive samples
+    :type interval: float
+    """
+
+    def __init__(self, interval=default_interval):
+        if interval <= 0:
+            raise ValueError('The sampling interval must be positive.')
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts sampling in a daemon thread."""
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run,
+            name='profiler',
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stops sampling, waiting for the sampling thread to exit."""
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def sample(self):
+        """Takes a single sample of the stacks of all the threads, except the
+        calling one."""
+        names = {t.ident: t.name for t in threading.enumerate()}
+        current = threading.get_ident()
+        frames = sys._current_frames()  # pylint: disable=protected-access
+        for ident, frame in frames.items():
+            if ident == current:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(_thread_label(names.get(ident, str(ident))))
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def collapsed(self):
+        """Returns the sampled stacks in the collapsed format read by the
+        flame graph tools: a line for each distinct stack, starting with the
+        thread name and ending with the innermost function, followed by the
+        number of times the stack was seen.
+
+        :rtype: str"""
+        stacks = sorted(self.stacks.items())
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+
+    def summary(self, limit=50):
+        """Returns a table of the functions seen in most samples, in the same
+        spirit of the `pstats` output: how many samples found each function
+        running (`self`) or anywhere in the stack (`total`).
+
+        :param limit: the maximum number of functions to be listed
+        :type limit: int
+        :rtype: str"""
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')[1:]
+            if not frames:  # skip coverage
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        lines = [
+            f'{self.samples} samples in {self.elapsed:.3f}s, '
+            + f'one every {self.interval * 1e3:g}ms',
+            f"{'self':>8} {'total':>8}  function",
+        ]
+        for frame, count in total.most_common(limit):
+            lines.append(f'{own[frame]:8d} {count:8d}  {frame}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Writes the profile to the given file, as a summary if the file
+        name ends with `.txt`, as collapsed stacks otherwise.
+
+        :param path: the path of the file
+        :type path: str"""
+        output = self.summary() if path.endswith('.txt') else self.collapsed()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(output)
+
+
+_lock = threading.Lock()
+_sampler = None
+
+
+def start(interval=default_interval):
+    """Starts profiling the current process, unless a profiling session is
+    already running.
+
+    :param interval: the seconds between two consecutive samples
+    :type interval: float
+    :return: whether a new session was started
+    :rtype: bool"""
+    global _sampler  # pylint: disable=global-statement
+    with _lock:
+        if _sampler is not None:
+            return False
+        _sampler = Sampler(interval)
+        _sampler.start()
+        return True
+
+
+def stop(path=None):
+    """Stops the running profiling session and writes its profile to a
+    file, see `Sampler.write`.
+
+    :param path: the path of the file, by default a `.folded` file named
+        after the process identifier in the temporary directory
+    :type path: str
+    :return: the path of the written file and the number of samples
+    :rtype: (str, int)
+    :raises RuntimeError: if no profiling session is running"""
+    global _sampler  # pylint: disable=global-statement
+    with _lock:
+        sampler, _sampler = _sampler, None
+    if sampler is None:
+        raise RuntimeError('No profiling session is running.')
+    sampler.stop()
+    if not path:
+        path = os.path.join(
+            tempfile.gettempdir(),
+            f'simulator-{os.getpid()}-{int(time.time())}.folded'
+        )
+    sampler.write(path)
+    return path, sampler.samples
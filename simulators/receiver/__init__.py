@@ -1,5 +1,5 @@
 from socketserver import ThreadingTCPServer as Tcp
-from simulators.common import ListeningSystem
+from simulators.common import ListeningSystem, Outcomes
 from simulators.receiver import DEFINITIONS as DEF
 from simulators.receiver.slaves import Slave, Dewar, LNA, Switch
 
@@ -92,6 +92,66 @@ class System(ListeningSystem):
                 return self._parse(msg)
         return True
 
+    def parse_bytes(self, data):
+        """Parses a whole chunk of bytes. Instead of passing each byte to the
+        `parse()` method, it looks for the start of a message and appends to
+        it as many bytes as needed to decide whether the message is complete
+        or, once its parameters length is known, to complete it.
+
+        :param data: the received chunk of bytes.
+        :type data: bytes-like object
+        :return: the responses to be sent back to the client and the
+            exceptions raised while parsing the received messages.
+        :rtype: Outcomes"""
+        responses = Outcomes()
+        data = str(data, 'latin-1')
+        index = 0
+        while index < len(data):
+            if not self.msg:
+                index = data.find(DEF.CMD_SOH, index)
+                if index == -1:
+                    break
+            chunk = data[index:index + self._missing_bytes()]
+            self.msg += chunk
+            index += len(chunk)
+            if self._missing_bytes() == 0:
+                msg = self.msg
+                self._set_default()
+                try:
+                    response = self._parse(msg)
+                except Exception as ex:
+                    response = ex
+                if not isinstance(response, bool):
+                    responses.append(response)
+                responses.complete(msg, outcome=response)
+        return responses
+
+    def _missing_bytes(self):
+        """Returns the number of bytes still needed either to complete the
+        message currently being received or to know its total length.
+
+        :return: the number of missing bytes, 0 if the message is complete.
+        :rtype: int"""
+        if len(self.msg) < 5:
+            return 5 - len(self.msg)
+        command = self.msg[DEF.CMD_IDX]
+        if (command in DEF.CMD_ABBR_NO_PARAMS or
+                command not in DEF.ACCEPTED_COMMANDS):
+            length = 5
+        elif command in DEF.CMD_EXT_NO_PARAMS:
+            length = 7
+        elif len(self.msg) == 5:
+            length = 6
+        else:
+            params_length = ord(self.msg[DEF.PAR_LEN_IDX])
+            if command in DEF.CMD_ABBR_WITH_PARAMS and params_length:
+                length = 6 + params_length
+            else:
+                # An abbreviated command declaring no parameters is only
+                # considered complete after 8 bytes, as in `parse()`
+                length = 8 + params_length
+        return length - len(self.msg)
+
     def _parse(self, msg):
         master_address = msg[DEF.MASTER_IDX]
         slave_address = msg[DEF.SLAVE_IDX]
@@ -0,0 +1,134 @@
+"""This module keeps a registry describing every available simulator: its
+configurations, in case of a `MultiTypeSystem`, and the addresses of its
+servers. Building the registry requires importing every simulator module,
+along with their dependencies, so the registry is cached on disk and rebuilt
+only when a source file of the package changes. This way the command line
+interface can list the simulators without importing any of them."""
+import os
+import json
+import hashlib
+
+
+package_path = os.path.dirname(os.path.abspath(__file__))
+registry_version = 1
+
+
+def cache_path(path=package_path):
+    """Returns the path of the file caching the registry of the simulators
+    package found in the given directory. The file is stored in the user
+    cache directory, since the package directory might not be writable.
+
+    :param path: the directory of the simulators package
+    :type path: str
+    :rtype: str"""
+    cache_home = os.getenv('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'
+    )
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(
+        cache_home,
+        'discos-simulators',
+        f'registry-{digest}.json'
+    )
+
+
+def package_mtime(path=package_path):
+    """Returns the most recent modification time of the source files and
+    directories of the package, so that adding, removing or editing any
+    module invalidates the cached registry.
+
+    :param path: the directory of the simulators package
+    :type path: str
+    :return: the modification time, in nanoseconds
+    :rtype: int"""
+    mtime = 0
+    for directory, directories, files in os.walk(path):
+        # Compiled files get written when importing, they must be ignored
+        directories[:] = [d for d in directories if d != '__pycache__']
+        mtime = max(mtime, os.stat(directory).st_mtime_ns)
+        for name in files:
+            if name.endswith('.py'):
+                f = os.path.join(directory, name)
+                mtime = max(mtime, os.stat(f).st_mtime_ns)
+    return mtime
+
+
+def _describe(obj):
+    """Describes the values that cannot be stored as JSON, i.e. the classes
+    passed as arguments to some `System` classes."""
+    if isinstance(obj, type):
+        return f'{obj.__module__}.{obj.__qualname__}'
+    return repr(obj)
+
+
+def build(path=package_path):
+    """Builds the registry by importing every simulator of the package.
+
+    :param path: the directory of the simulators package
+    :type path: str
+    :return: the description of each simulator, by name. Every description
+        holds the sorted list of the available configurations (`systems`,
+        empty unless the simulator is a `MultiTypeSystem`) and the list of
+        its `servers`, each one described by its listening and sending
+        addresses (`None` if missing), its server type name and the keyword
+        arguments passed to the `System` class (classes are described by
+        their qualified name).
+    :rtype: dict"""
+    # pylint: disable=import-outside-toplevel
+    import importlib
+    from simulators.utils import list_simulators
+    registry = {}
+    for name in list_simulators(path):
+        module = importlib.import_module(f'simulators.{name}')
+        servers = []
+        for l_address, s_address, server_type, kwargs in module.servers:
+            servers.append({
+                'l_address': list(l_address) if l_address else None,
+                's_address': list(s_address) if s_address else None,
+                'server_type': server_type.__name__,
+                'kwargs': kwargs,
+            })
+        registry[name] = {
+            'systems': sorted(getattr(module, 'systems', {})),
+            'servers': servers,
+        }
+    return registry
+
+
+def load(path=package_path, cache=None):
+    """Returns the registry of the simulators, reading it from its cache
+    file if it is still valid, building and caching it otherwise. Failing to
+    write the cache file is not an error, the registry will simply be built
+    again the next time.
+
+    :param path: the directory of the simulators package
+    :param cache: the path of the cache file, see `cache_path` for the
+        default one
+    :type path: str
+    :type cache: str
+    :return: the description of each simulator, by name, see `build`
+    :rtype: dict"""
+    cache = cache or cache_path(path)
+    key = {
+        'version': registry_version,
+        'path': path,
+        'mtime': package_mtime(path),
+    }
+    try:
+        with open(cache, encoding='utf-8') as f:
+            content = json.load(f)
+        if content.get('key') == key:
+            return content['simulators']
+    except (OSError, ValueError):
+        pass
+    # The same content, whether it is built or read from the cache
+    simulators = json.loads(json.dumps(build(path), default=_describe))
+    temporary = f'{cache}.{os.getpid()}'
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'simulators': simulators}, f)
+        os.replace(temporary, cache)
+    except OSError:  # skip coverage
+        pass
+    return simulators
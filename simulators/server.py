@@ -1,14 +1,34 @@
 import os
 import types
+import signal
 import socket
+import struct
+import selectors
+import asyncio
+import ipaddress
 import logging
 import importlib
 import time
 import threading
 import multiprocessing as mp
+from multiprocessing import shared_memory
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from queue import Queue, Empty
 from socketserver import (
-    ThreadingTCPServer, ThreadingUDPServer, BaseRequestHandler
+    ThreadingTCPServer, ThreadingUDPServer, ThreadingUnixStreamServer,
+    ThreadingUnixDatagramServer, ThreadingMixIn, BaseRequestHandler
+)
+from simulators import capture, control
+from simulators.admission import AdmissionMixIn
+from simulators.admission import policies as admission_policies
+from simulators.metrics import Metrics
+from simulators.dispatcher import Dispatcher
+from simulators.framing import CustomFraming
+from simulators.impairment import Impairment, ImpairedSubscriber
+from simulators.shared_status import SharedStatusWriter
+from simulators.broadcast import (
+    StreamSubscriber, SocketSubscriber, DatagramSubscriber, policies
 )
 
 
@@ -18,6 +38,13 @@ logging.basicConfig(
     level=logging.DEBUG)
 
 
+# Closing a socket with this linger option resets the connection
+_linger = struct.pack('ii', 1, 0)
+
+# Serializes the creation of the links shared by the clients of a UDP server
+_link_lock = threading.Lock()
+
+
 class BaseHandler(BaseRequestHandler):
     """This is the base handler class from which `ListenHandler` and
     `SendHandler` classes are inherited. It only defines the custom header
@@ -31,6 +58,42 @@ class BaseHandler(BaseRequestHandler):
 
     custom_header, custom_tail = ('$', '%%%%%')
 
+    # Server options, they can be overridden for a single server by passing
+    # the `options` argument to the `Server` class
+    tcp_nodelay = True
+    coalesce_responses = True
+    backpressure = policies[0]
+    backpressure_buffer = 1
+    backpressure_misses = 10
+    stats = False
+    capture = None
+    impairment = None
+    reuse_port = 1
+    unix_socket = None
+    multicast = None
+    multicast_interface = ''
+    shared_memory = None
+    max_connections = 0
+    admission = admission_policies[0]
+    accept_queue = 5
+    single_writer = False
+    admin_port = None
+
+    # The metrics of the server, collected when the `stats` option is enabled
+    metrics = None
+
+    # The thread that executes the commands of the system, when the
+    # `single_writer` option is enabled
+    dispatcher = None
+
+    # The emulated network of the server, when the `impairment` option is
+    # given
+    network = None
+
+    # The parsing session of a connected client, the datagrams of a UDP
+    # server share the parsing state of the system itself
+    session = None
+
     def _execute_custom_command(self, msg_body):
         """This method accepts a custom command (without the custom header and
         tail) formatted as `command_name:par1,par2,...,parN`. It then parses
@@ -40,166 +103,1463 @@ class BaseHandler(BaseRequestHandler):
         :param msg_body: the custom command message without the custom header
             and tail (`$` and `%%%%%` respectively)
         :type msg_body: string"""
-        if ':' in msg_body:
-            name, params_str = msg_body.split(':')
-        else:
-            name, params_str = msg_body, ''
+        name, params = self._split_custom_command(msg_body)
+        if self._builtin_command(name, params):
+            return
+        t0 = time.perf_counter()
+        try:
+            response = self._call(self._system_command, name, params)
+        except Exception as ex:
+            response = ex
+        self._custom_response(name, response, t0)
+
+    @staticmethod
+    def _split_custom_command(msg_body):
+        """Splits a custom command into its name and its parameters.
+
+        :param msg_body: the custom command message without the custom header
+            and tail
+        :type msg_body: string
+        :return: the name of the command and its parameters
+        :rtype: (string, tuple)"""
+        name, _, params_str = msg_body.partition(':')
         if params_str:
-            params = params_str.split(',')
+            params = tuple(params_str.split(','))
         else:
             params = ()
+        return name, params
+
+    def _builtin_command(self, name, params):
+        """Answers the custom commands that are handled by the server itself
+        instead of by the system. A command that fails, i.e. because of its
+        parameters, is answered with its name followed by `error`, so that
+        the client is not left waiting.
+
+        :param name: the name of the custom command
+        :param params: the parameters of the custom command
+        :type name: string
+        :type params: tuple
+        :return: whether the command is handled by the server
+        :rtype: bool"""
+        if name not in (
+            'stats', 'stats_reset', 'impair', 'connections', 'dispatcher'
+        ):
+            return False
         try:
-            response = getattr(self.system, name)(*params)
+            response = getattr(self, f'_{name}')(*params)
+        except Exception as ex:
+            logging.debug('unexpected exception %s', ex)
+            response = f'${name}:error%%%%%'
+        self._send(response.encode('latin-1'))
+        return True
+
+    def _system_command(self, name, params):
+        """Executes a custom command of the system. A client with a parsing
+        session executes it in turn with the other sessions, since the
+        command might reset the parsing state of the system.
+
+        :param name: the name of the custom command
+        :param params: the parameters of the custom command
+        :type name: string
+        :type params: tuple
+        :return: the value returned by the system"""
+        function = getattr(self.system, name)
+        if self.session is not None:
+            return self.session.call(function, *params)
+        return function(*params)
+
+    def _custom_response(self, name, response, t0):
+        """Sends back to the client the response of a custom command of the
+        system, if any.
+
+        :param name: the name of the custom command
+        :param response: the value returned by the system, or the exception
+            it raised
+        :param t0: the time the execution of the command started at
+        :type name: string
+        :type t0: float"""
+        errors = 0
+        try:
+            if isinstance(response, Exception):
+                raise response
             if isinstance(response, str):
-                self.socket.sendto(
-                    response.encode('latin-1'),
-                    self.client_address
-                )
+                self._send(response.encode('latin-1'))
                 if response == '$server_shutdown%%%%%':
-                    time.sleep(0.01)
-                    self.server.shutdown()
-                    self.server.server_close()
+                    self._shutdown_server()
         except AttributeError:
             logging.debug('command %s not supported', name)
+            errors = 1
         except Exception as ex:
             logging.debug('unexpected exception %s', ex)
+            errors = 1
+        if self.metrics is not None:
+            self.metrics.record(f'${name}', time.perf_counter() - t0, errors)
+
+    def _stats(self, output_format='json'):
+        """Answers the `$stats%%%%%` custom command with the metrics
+        collected by the server, see the `stats` server option.
+
+        :param output_format: `json` for a compact JSON object, `text` for a
+            line of text for each command
+        :type output_format: string
+        :return: the metrics, wrapped in the custom command header and tail
+        :rtype: string"""
+        if self.metrics is None:
+            payload = '{"enabled":false}'
+        elif output_format == 'text':
+            payload = self.metrics.to_text()
+        else:
+            payload = self.metrics.to_json()
+        return f'$stats:{payload}%%%%%'
+
+    def _stats_reset(self):
+        """Answers the `$stats_reset%%%%%` custom command by clearing the
+        metrics collected by the server.
+
+        :return: the command itself, as an acknowledgement
+        :rtype: string"""
+        if self.metrics is not None:
+            self.metrics.reset()
+        return '$stats_reset%%%%%'
+
+    def _impair(self, *params):
+        """Answers the `$impair%%%%%` custom command by changing the settings
+        of the emulated network, if any is given, see the `impairment` server
+        option.
+
+        :param params: the `name=value` settings, or `off` to clear them
+        :type params: strings
+        :return: the current settings, wrapped in the custom command header
+            and tail
+        :rtype: string"""
+        if self.network is None:
+            return '$impair:{"enabled":false}%%%%%'
+        try:
+            self.network.configure(*params)
+        except ValueError as ex:
+            logging.debug(ex)
+        return f'$impair:{self.network.to_json()}%%%%%'
+
+    def _connections(self):
+        """Answers the `$connections%%%%%` custom command with the counters
+        of the admission control of the server, see the `max_connections`
+        server option.
+
+        :return: the counters, wrapped in the custom command header and tail
+        :rtype: string"""
+        pool = getattr(self._admitting_server(), 'admission', None)
+        if pool is None:
+            payload = '{"enabled":false}'
+        else:
+            payload = pool.to_json()
+        return f'$connections:{payload}%%%%%'
+
+    def _dispatcher(self):
+        """Answers the `$dispatcher%%%%%` custom command with the counters of
+        the dispatcher of the system, see the `single_writer` server option.
+
+        :return: the counters, wrapped in the custom command header and tail
+        :rtype: string"""
+        if self.dispatcher is None:
+            payload = '{"enabled":false}'
+        else:
+            payload = self.dispatcher.to_json()
+        return f'$dispatcher:{payload}%%%%%'
+
+    def _admitting_server(self):
+        """Returns the server whose admission control is reported by the
+        `$connections%%%%%` custom command, the one of the client.
+
+        :rtype: socketserver.BaseServer"""
+        return self.server
+
+    def _call(self, function, *args):
+        """Calls the given function of the system, by means of the
+        dispatcher when the `single_writer` server option is enabled.
+
+        :param function: the function to be called
+        :param args: the arguments of the function
+        :return: the value returned by the function"""
+        if self.dispatcher is None:
+            return function(*args)
+        return self.dispatcher.call(function, *args)
+
+    def _send(self, data):
+        """Sends the given data back to the client.
+
+        :param data: the message to be sent to the client
+        :type data: bytes"""
+        self.socket.sendto(data, self.client_address)
+
+    def _set_nodelay(self, sock):
+        """Enables or disables the Nagle algorithm on the given client socket,
+        according to the `tcp_nodelay` server option. Sockets that are not
+        TCP sockets are left untouched.
+
+        :param sock: the socket connected to the client
+        :type sock: socket.socket"""
+        if (
+            sock.family in (socket.AF_INET, socket.AF_INET6)
+            and sock.type == socket.SOCK_STREAM
+        ):
+            sock.setsockopt(
+                socket.IPPROTO_TCP,
+                socket.TCP_NODELAY,
+                int(self.tcp_nodelay)
+            )
+
+    def _shutdown_server(self):
+        """Stops the server this handler belongs to, after giving the client
+        some time to receive the `$server_shutdown%%%%%` response. The
+        dispatcher of the system, if any, is stopped as well."""
+        time.sleep(0.01)
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+        self.server.shutdown()
+        self.server.server_close()
 
 
 class ListenHandler(BaseHandler):
 
+    buffer_size = 1024
+
+    # The log of the server, written when the `capture` option is given,
+    # and the identifier of the captured connection
+    capture_log = None
+    connection = None
+
+    # The link of the client through the emulated network, shared by all the
+    # clients of a UDP server, and the subscriber that writes the delayed
+    # chunks of a TCP client without blocking
+    link = None
+    writer = None
+
     def setup(self):
-        self.custom_msg = ''
+        self.framing = CustomFraming(self.custom_header, self.custom_tail)
         self.socket = self.request
         self.connection_oriented = True
         if not isinstance(self.socket, tuple):  # TCP client
             logging.info('Got connection from %s', self.client_address)
-            greet_msg = self.system.system_greet()
-            if greet_msg:
-                self.socket.sendto(
-                    greet_msg.encode('latin-1'),
-                    self.client_address
-                )
+            self.session = self.system.new_session()
+            self._set_nodelay(self.socket)
+            self._open_capture()
+            self._greet()
         else:  # UDP client
             self.connection_oriented = False
+            # Every datagram is handled by a thread of its own, which must
+            # not parse it while another thread is using the system
+            self.session = self.system.new_session(shared=True)
+
+    def finish(self):
+        if self.writer is not None:
+            self.writer.drain()
+            self.writer.detach()
+        self._close_capture()
+
+    def _open_capture(self):
+        """Starts capturing the traffic of the connected TCP client, if
+        the `capture` server option is given."""
+        if self.capture_log is not None:
+            self.connection = self.capture_log.open(self.client_address)
+
+    def _close_capture(self):
+        """Records the end of the captured connection, if any."""
+        if self.connection is not None:
+            self.capture_log.close_connection(self.connection)
+            self.connection = None
+
+    def _send(self, data):
+        if self.connection is not None:
+            self.capture_log.write(capture.OUTPUT, self.connection, data)
+        if self.network is not None:
+            self._link().send(data, self.client_address)
+        else:
+            self._write(data, self.client_address)
+
+    def _write(self, data, address):
+        """Writes the given data to the client.
+
+        :param data: the message to be sent to the client
+        :param address: the address of the client
+        :type data: bytes
+        :type address: (ip, port)"""
+        if self.connection_oriented:
+            # A connected AF_UNIX socket refuses any destination address
+            self.socket.sendall(data)
+        elif address:
+            # A client on an AF_UNIX datagram socket that is not bound to
+            # any path can not be answered
+            self.socket.sendto(data, address)
+
+    def _link(self):
+        """Returns the link of the client through the emulated network,
+        opening it the first time.
+
+        :rtype: Link"""
+        if self.link is None:
+            if self.connection_oriented:
+                self.writer = SocketSubscriber(
+                    self.socket,
+                    self.client_address
+                )
+                self.link = self.network.link(
+                    self._write_nowait,
+                    self._abort
+                )
+            else:
+                # Every datagram gets its own handler
+                with _link_lock:
+                    if type(self).link is None:
+                        type(self).link = self.network.link(
+                            self._write_nowait
+                        )
+                    self.link = type(self).link
+        return self.link
+
+    def _write_nowait(self, data, address):
+        """Writes the given data to the client without blocking, on behalf
+        of its link through the emulated network. The delayed chunks of
+        every link of the process are written by the same `Scheduler`
+        thread, which must not wait for a single client: the data of a TCP
+        client that does not fit into its socket right away is written by
+        the `Flusher` thread as soon as the client reads it, while a
+        datagram that does not fit is lost.
+
+        :param data: the message to be sent to the client
+        :param address: the address of the client
+        :type data: bytes
+        :type address: (ip, port)"""
+        if self.connection_oriented:
+            self.writer.send(data)
+        elif address:
+            try:
+                self.socket.sendto(data, socket.MSG_DONTWAIT, address)
+            except BlockingIOError:
+                pass
+
+    def _abort(self):
+        """Resets the connection with the client, as the emulated network
+        dictates. It is called by the thread that handles the client, which
+        will stop waiting for data as soon as the socket is closed."""
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _linger)
+        self.socket.close()
+
+    def _greet(self):
+        """Sends the system greeting message, if any, to a newly connected
+        client."""
+        greet_msg = self.system.system_greet()
+        if greet_msg:
+            self._send(greet_msg.encode('latin-1'))
 
     def handle(self):
         """Method that gets called right after the `setup` method ends its
         execution. It handles incoming messages, whether they are received via
         a TCP or a UDP socket. It passes down the `System` class the received
-        messages one byte at a time in order for the `System.parse()` method to
-        work properly. It then returns the `System` response when  received
-        from the `System` class. It also constantly listens for custom commands
-        that do not belong to a specific `System` class, but are useful
-        additions to the framework with the purpose of reproducing a specific
-        scenario (i.e. some error condition)."""
+        chunks of bytes, by calling the `System.parse_bytes()` method, which
+        in turn feeds the `System.parse()` method one byte at a time unless
+        the system knows how to consume the whole chunk at once. The bytes
+        of a TCP client go through its own parsing `Session`, so the clients
+        connected at the same time do not corrupt each other's messages. It
+        then returns the `System` responses when received from the `System`
+        class. It also constantly listens for custom commands that do not
+        belong to a specific `System` class, but are useful additions to the
+        framework with the purpose of reproducing a specific scenario (i.e.
+        some error condition)."""
         if not self.connection_oriented:  # UDP client
             msg, self.socket = self.socket
             msg += b'\n'
             self._handle(msg)
         else:  # TCP client
+            buffer = bytearray(self.buffer_size)
+            view = memoryview(buffer)
             while True:
                 try:
-                    msg = self.socket.recv(1024)
-                    if not msg:
+                    length = self.socket.recv_into(buffer)
+                    if not length:
                         break
-                    self._handle(msg)
+                    self._handle(view[:length])
                 except IOError:
                     break
 
     def _handle(self, msg):
-        """Handles a single message.
+        """Handles a chunk of received bytes.
 
-        :param msg: the received message. Usually, in case of a TCP socket,
-            this is a single byte to be passed down to the `System.parse()`
-            method. In case of a connection-less communication (UDP socket),
-            this parameter contains a chunk of bytes, each one of them is then
-            processed on its own.
+        :param msg: the received bytes. In case of a TCP socket, this is
+            whatever a single `recv` call returned. In case of a
+            connection-less communication (UDP socket), this parameter
+            contains the whole datagram.
+        :type msg: bytes-like object
         """
-        response = None
-        for byte in msg:
-            byte = chr(byte)
-            try:
-                response = self.system.parse(byte)
-            except ValueError as ex:
-                logging.debug(ex)
-            except Exception:
+        t0 = self._received(msg)
+        for segment, msg_body in self._segments(msg):
+            self._respond(segment, self._call(self._parse, segment), t0)
+            if msg_body is not None:
+                self._execute_custom_command(msg_body)
+
+    def _received(self, msg):
+        """Records a chunk of received bytes, before it gets parsed.
+
+        :param msg: the received bytes
+        :type msg: bytes-like object
+        :return: the time the parsing starts at, if the `stats` server
+            option is enabled
+        :rtype: float"""
+        if self.connection is not None:
+            self.capture_log.write(capture.INPUT, self.connection, msg)
+        if self.metrics is not None:
+            return time.perf_counter()
+        return None
+
+    def _parse(self, msg):
+        """Passes a chunk of received bytes to the parsing session of the
+        client, or to the system itself if the client has none.
+
+        :param msg: the received bytes
+        :type msg: bytes-like object
+        :return: the outcomes of the parsing, in order
+        :rtype: list"""
+        parser = self.system if self.session is None else self.session
+        return parser.parse_bytes(msg)
+
+    def _respond(self, msg, outcomes, t0):
+        """Sends back to the client the responses to a chunk of parsed
+        bytes.
+
+        :param msg: the parsed bytes
+        :param outcomes: the outcomes of the parsing, in order
+        :param t0: the time the parsing started at, see `_received`
+        :type msg: bytes-like object
+        :type outcomes: list
+        :type t0: float"""
+        responses = []
+        for response in outcomes:
+            if isinstance(response, ValueError):
+                logging.debug(response)
+            elif isinstance(response, Exception):
                 logging.debug('unexpected exception')
-            if isinstance(response, bool):
-                pass
             elif response and isinstance(response, str):
-                try:
-                    response = response.encode('latin-1')
-                    self.socket.sendto(response, self.client_address)
-                except IOError:  # skip coverage
-                    # Something went wrong while sending the response,
-                    # probably the client was stopped without closing
-                    # the connection
-                    break
+                responses.append(response)
             else:
                 logging.debug('unexpected response: %s', response)
+        # Flush the responses before executing any custom command, so that
+        # the client receives all the answers in order
+        sent = self._flush(responses)
+        if self.metrics is not None:
+            self._account(msg, outcomes, t0, sent)
+
+    def _account(self, msg, outcomes, t0, sent):
+        """Records the metrics of a chunk of parsed bytes: a call for each
+        message it completes, whether it gets a response or not, and the
+        received and sent bytes. The latency of every message is the time
+        the server took to answer the whole chunk.
+
+        :param msg: the parsed bytes
+        :param outcomes: the outcomes of the parsing, see `_respond`
+        :param t0: the time the chunk was received at
+        :param sent: the number of bytes sent back to the client
+        :type msg: bytes-like object
+        :type outcomes: list
+        :type t0: float
+        :type sent: int"""
+        metrics = self.metrics
+        elapsed = time.perf_counter() - t0
+        # A system returning a plain list only reports the messages that
+        # get a response
+        messages = getattr(outcomes, 'messages', None)
+        if messages is None:
+            messages = [(None, outcome) for outcome in outcomes]
+        name = None
+        for message, outcome in messages:
+            if message is not None:
+                command = self.system.command_name(message.encode('latin-1'))
+            else:
+                # The message is accounted to the command the chunk starts
+                # with
+                name = name or self.system.command_name(msg)
+                command = name
+            failed = outcome is not True and not (
+                outcome and isinstance(outcome, str)
+            )
+            metrics.record(command, elapsed, int(failed))
+        metrics.transfer(len(msg), sent)
+
+    def _segments(self, msg):
+        """Splits a chunk of received bytes right after each custom command
+        it completes, the admin port excepted, which only listens for them.
+        Each segment is parsed by the system before the custom command that
+        ends it gets executed, so the commands are handled in the very same
+        order they were sent.
+
+        :param msg: the received bytes
+        :type msg: bytes-like object
+        :return: the segments of the chunk, each one along with the body of
+            the custom command it ends with, None for the last segment if it
+            does not end with a custom command
+        :rtype: list of (bytes-like object, string) tuples"""
+        if self.admin_port:
+            return [(msg, None)]
+        segments = []
+        start = 0
+        for end, msg_body in self.framing.split(msg):
+            segments.append((msg[start:end], msg_body))
+            start = end
+        if start < len(msg):
+            segments.append((msg[start:], None))
+        return segments
+
+    def _flush(self, responses):
+        """Sends back to the client the responses to a chunk of received
+        bytes. If the `coalesce_responses` server option is enabled and the
+        client is connected via TCP, the responses are joined and sent with
+        a single write, otherwise each response is sent on its own (every
+        UDP response always travels in its own datagram).
+
+        :param responses: the responses to be sent, in order
+        :type responses: list of strings
+        :return: the number of sent bytes
+        :rtype: int"""
+        if self.coalesce_responses and self.connection_oriented:
+            responses = [''.join(responses)] if responses else []
+        sent = 0
+        for response in responses:
+            data = response.encode('latin-1')
+            try:
+                self._send(data)
+            except IOError:  # skip coverage
+                # Something went wrong while sending the response,
+                # probably the client was stopped without closing
+                # the connection
+                break
+            sent += len(data)
+        return sent
+
+
+class AdminHandler(ListenHandler):
+    """Handles the clients of the server the custom commands are routed to,
+    see the `admin_port` server option. The received bytes are only
+    searched for custom commands, which are executed as if they were
+    received by the servers of the system, anything else is ignored."""
+
+    # The servers of the system, which get stopped along with the admin
+    # server by the `$system_stop%%%%%` command
+    servers = ()
+
+    def setup(self):
+        self.framing = CustomFraming(self.custom_header, self.custom_tail)
+        self.socket = self.request
+        self.connection_oriented = True
+        self._set_nodelay(self.socket)
 
-            if byte == self.custom_header:
-                self.custom_msg = byte
-            elif self.custom_msg.startswith(self.custom_header):
-                self.custom_msg += byte
-                if self.custom_msg.endswith(self.custom_tail):
-                    msg_body = self.custom_msg[1:-len(self.custom_tail)]
-                    self.custom_msg = ''
-                    self._execute_custom_command(msg_body)
+    def _handle(self, msg):
+        for msg_body in self.framing.feed(msg):
+            self._execute_custom_command(msg_body)
+
+    def _admitting_server(self):
+        return self.servers[0]
+
+    def _shutdown_server(self):
+        time.sleep(0.01)
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+        for server in self.servers + (self.server,):
+            server.shutdown()
+            server.server_close()
+
+
+class AdminServer(ThreadingTCPServer):
+    """The server of the custom commands of a system, see the `admin_port`
+    server option."""
+
+    allow_reuse_address = True
+    daemon_threads = True
 
 
 class SendHandler(BaseHandler):
 
+    subscriber = None
+    aborted = False
+
     def handle(self):
         """Method that gets called right after the `setup` method ends its
         execution. It handles messages that the server has to periodically send
-        to its connected client(s). It also constantly listens for custom
-        commands that do not belong to a specific `System` class, but are
-        useful additions to the framework with the purpose of reproducing a
-        specific scenario (i.e. some error condition)."""
-        sampling_time = self.system.sampling_time
-        message_queue = Queue(1)
-
+        to its connected client(s). TCP clients are subscribed to the system
+        by means of a `SocketSubscriber`, which writes the messages published
+        by the system directly into the client socket, so the handler thread
+        only waits for incoming data, without any timeout. It also constantly
+        listens for custom commands that do not belong to a specific `System`
+        class, but are useful additions to the framework with the purpose of
+        reproducing a specific scenario (i.e. some error condition)."""
         self.socket = self.request
-        msg = None
-        if isinstance(self.socket, tuple):
+        if isinstance(self.socket, tuple):  # UDP client
             msg, self.socket = self.socket
-        self.socket.setblocking(False)
-
-        self.system.subscribe(message_queue)
-        while True:
+            if msg:
+                self._handle(msg)
+            message_queue = Queue(1)
+            self.system.subscribe(message_queue)
             try:
-                if msg:
-                    custom_msg = msg
-                    msg = None
-                else:
-                    custom_msg = self.socket.recv(1024)
-                # Check if the client is sending a custom command
-                if not custom_msg:
+                # The socket is the one of the server, it gets closed when
+                # the server stops
+                while self.socket.fileno() >= 0:
+                    try:
+                        response = message_queue.get(
+                            timeout=self.system.sampling_time
+                        )
+                    except Empty:
+                        continue
+                    self.socket.sendto(response, self.client_address)
                     break
-                custom_msg = custom_msg.decode('latin-1')
-                if (
-                    custom_msg.startswith(self.custom_header)
-                    and custom_msg.endswith(self.custom_tail)
-                ):
-                    self._execute_custom_command(
-                        custom_msg[1:-len(self.custom_tail)]
-                    )
-            except IOError:
-                # No data received, just pass
+            except IOError:  # skip coverage
                 pass
-            try:
-                response = message_queue.get(timeout=sampling_time)
-                self.socket.sendto(response, self.client_address)
-                if self.socket.type == socket.SOCK_DGRAM:
+            finally:
+                self.system.unsubscribe(message_queue)
+            return
+
+        self._set_nodelay(self.socket)
+        self.subscriber = SocketSubscriber(
+            self.socket,
+            self.client_address,
+            **self._backpressure_options()
+        )
+        subscription = self._subscription()
+        self.system.subscribe(subscription)
+        try:
+            while True:
+                msg = self.socket.recv(1024)
+                # Check if the client is sending a custom command
+                if not msg:
                     break
+                self._handle(msg)
+        except IOError:
+            # Something went wrong while receiving, probably the client was
+            # stopped without closing the connection
+            pass
+        finally:
+            self.system.unsubscribe(subscription)
+            # The replies to the last custom commands might still be waiting
+            # for the client to read them
+            self.subscriber.drain()
+            self.subscriber.detach()
+            if self.aborted:
+                self.socket.close()
+
+    def _subscription(self):
+        """Returns what gets subscribed to the system: the subscriber of
+        the client or, when the `impairment` option is given, a subscriber
+        that delivers the messages to it through the emulated network.
+
+        :rtype: Subscriber"""
+        if self.network is None:
+            return self.subscriber
+        return ImpairedSubscriber(
+            self.subscriber,
+            self.network.link(self.subscriber.deliver, self._abort)
+        )
+
+    def _abort(self):
+        """Resets the connection with the client, as the emulated network
+        dictates. It is called by the publisher thread, so the socket is
+        only shut down in order for the handler thread to stop waiting for
+        data, and it is closed by the handler thread itself."""
+        self.aborted = True
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _linger)
+        self.socket.shutdown(socket.SHUT_RD)
+
+    def _backpressure_options(self):
+        """Returns the arguments of the client subscriber, according to the
+        `backpressure` server options.
+
+        :rtype: dict"""
+        return {
+            'policy': self.backpressure,
+            'buffer_size': self.backpressure_buffer,
+            'max_misses': self.backpressure_misses,
+        }
+
+    def _send(self, data):
+        if self.subscriber:
+            self.subscriber.send(data)
+        else:
+            super()._send(data)
+
+    def _handle(self, msg):
+        """Executes the received message if it is a custom command, any other
+        message is ignored, as well as the custom commands when the
+        `admin_port` server option routes them to another server.
+
+        :param msg: the message received from the client
+        :type msg: bytes"""
+        for msg_body in self._custom_commands(msg):
+            self._execute_custom_command(msg_body)
+
+    def _custom_commands(self, msg):
+        """Returns the custom command carried by the received message, if
+        any.
+
+        :param msg: the message received from the client
+        :type msg: bytes
+        :return: the body of the custom command, if any
+        :rtype: list of strings"""
+        if self.admin_port:
+            return []
+        msg = msg.decode('latin-1')
+        if (
+            msg.startswith(self.custom_header)
+            and msg.endswith(self.custom_tail)
+        ):
+            return [msg[1:-len(self.custom_tail)]]
+        return []
+
+
+class EventLoop:
+    """A single `asyncio` event loop, running in a daemon thread, shared by
+    all the event loop servers of the current process. Hosting every endpoint
+    on the same loop means that the number of threads of a simulator process
+    does not grow with its endpoints or with its connected clients, but for
+    the systems that block while parsing, which are served by the threads of
+    the loop executor. Use `EventLoop.get()` to retrieve the loop of the
+    current process."""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    # The clients of a system take turns, so a busy thread of the executor
+    # is needed for each `blocking` system, i.e. each line of the active
+    # surface. The threads are only started when needed.
+    executor_workers = 256
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(
+            self.executor_workers,
+            thread_name_prefix='EventLoop'
+        )
+        self.thread = threading.Thread(
+            target=self.loop.run_forever,
+            daemon=True
+        )
+        self.thread.start()
+
+    @classmethod
+    def get(cls):
+        """Returns the event loop of the current process, starting it the
+        first time it is requested.
+
+        :return: the event loop shared by the servers of this process
+        :rtype: EventLoop"""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @classmethod
+    def _after_fork(cls):
+        # The loop thread does not survive a fork, the child process will
+        # start its own loop the first time it needs it.
+        cls._instance = None
+        cls._lock = threading.Lock()
+
+    def call(self, function, *args):
+        """Executes a function inside the loop thread and returns its result.
+        If called from the loop thread itself, the function is executed
+        immediately.
+
+        :param function: the function to be executed
+        :param args: the function arguments"""
+        if threading.current_thread() is self.thread:
+            return function(*args)
+        future = Future()
+
+        def _call():
+            try:
+                future.set_result(function(*args))
+            except Exception as ex:
+                future.set_exception(ex)
+        self.loop.call_soon_threadsafe(_call)
+        return future.result()
+
+    def call_at(self, when, function, *args):
+        """Calls a function inside the loop thread at the given time. It
+        must be called from the loop thread.
+
+        :param when: the `time.perf_counter()` time of the call
+        :param function: the function to be called
+        :param args: the function arguments
+        :type when: float
+        :type function: callable"""
+        self.loop.call_later(when - time.perf_counter(), function, *args)
+
+    def run(self, coroutine):
+        """Runs a coroutine inside the loop thread, waiting for its result.
+        It must not be called from the loop thread.
+
+        :param coroutine: the coroutine to be executed"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+
+os.register_at_fork(
+    after_in_child=EventLoop._after_fork  # pylint: disable=protected-access
+)
+
+
+class LoopQueue(Queue):
+    """Queue passed to `SendingSystem.subscribe()` by the event loop servers.
+    It behaves like a regular `Queue` for the system that fills it, but every
+    message put into it wakes the event loop up, which then calls the given
+    callback. This way no client has to poll its queue.
+
+    :param loop: the event loop in which the callback gets executed
+    :param callback: the function to be called as soon as a message is put
+        into the queue
+    :param maxsize: the maximum size of the queue
+    :type loop: asyncio.AbstractEventLoop
+    :type callback: callable
+    :type maxsize: int"""
+
+    def __init__(self, loop, callback, maxsize=1):
+        super().__init__(maxsize)
+        self.loop = loop
+        self.callback = callback
+
+    def _put(self, item):
+        super()._put(item)
+        try:
+            self.loop.call_soon_threadsafe(self.callback)
+        except RuntimeError:  # skip coverage
+            # The loop has already been closed
+            pass
+
+
+class ExecutorMixIn:
+    """Lets the event loop protocols execute the calls to the system that
+    would block the loop thread, which would not serve any other endpoint
+    meanwhile: the calls are handed to the dispatcher when the
+    `single_writer` server option is enabled, or to a thread of the executor
+    of the `EventLoop` for a `blocking` system (see `BaseSystem.blocking`),
+    and awaited by means of their futures. Reading from the transport is
+    paused meanwhile, so the chunks are still handled one at a time and in
+    order. The responses are sent by the loop thread, as for any other
+    system."""
+
+    def _offloading(self):
+        """Tells whether the calls to the system have to be executed outside
+        the loop thread.
+
+        :rtype: bool"""
+        return self.dispatcher is not None or self.system.blocking
+
+    def _receive(self, msg):
+        """Handles a chunk of received bytes, in the loop thread unless the
+        calls to the system might block it.
+
+        :param msg: the received bytes
+        :type msg: bytes"""
+        if not self._offloading():
+            self._handle(msg)
+            return
+        self.transport.pause_reading()
+        self.server.event_loop.loop.create_task(self._handle_offloaded(msg))
+
+    async def _handle_offloaded(self, msg):
+        """Handles a chunk of received bytes, then resumes reading.
+
+        :param msg: the received bytes
+        :type msg: bytes"""
+        try:
+            await self._handle_async(msg)
+        finally:
+            if not self.transport.is_closing():
+                self.transport.resume_reading()
+
+    async def _handle_async(self, msg):
+        """Executes the custom commands carried by a chunk of received bytes,
+        the asynchronous counterpart of `_handle`.
+
+        :param msg: the received bytes
+        :type msg: bytes"""
+        await self._execute_custom_commands(self._custom_commands(msg))
+
+    def _offload(self, function, *args):
+        """Calls a function of the system outside the loop thread.
+
+        :param function: the function to be called
+        :param args: the arguments of the function
+        :return: the future of the value returned by the function
+        :rtype: asyncio.Future"""
+        event_loop = self.server.event_loop
+        dispatcher = self.dispatcher
+        if dispatcher is not None and not dispatcher.closed:
+            return asyncio.wrap_future(
+                dispatcher.submit(function, *args),
+                loop=event_loop.loop
+            )
+        return event_loop.loop.run_in_executor(
+            event_loop.executor,
+            function,
+            *args
+        )
+
+    async def _execute_custom_commands(self, msg_bodies):
+        """Executes the given custom commands, the asynchronous counterpart
+        of `_execute_custom_command`.
+
+        :param msg_bodies: the custom commands, without their header and
+            tail
+        :type msg_bodies: list of strings"""
+        for msg_body in msg_bodies:
+            name, params = self._split_custom_command(msg_body)
+            if self._builtin_command(name, params):
+                continue
+            t0 = time.perf_counter()
+            try:
+                response = await self._offload(
+                    self._system_command,
+                    name,
+                    params
+                )
+            except Exception as ex:
+                response = ex
+            self._custom_response(name, response, t0)
+
+
+class ListenExecutorMixIn(ExecutorMixIn):
+    """`ExecutorMixIn` of the listening protocols, which also parse the
+    received bytes outside the loop thread."""
+
+    async def _handle_async(self, msg):
+        t0 = self._received(msg)
+        for segment, msg_body in self._segments(msg):
+            outcomes = await self._offload(self._parse, segment)
+            # The client might have gone away meanwhile
+            if not self.transport.is_closing():
+                self._respond(segment, outcomes, t0)
+            if msg_body is not None:
+                await self._execute_custom_commands([msg_body])
+
+
+class ListenProtocol(
+    ListenExecutorMixIn, ListenHandler, asyncio.Protocol
+):
+    """`ListenHandler` counterpart for the `AsyncTCPServer` class. It is
+    instanced once per client connection and receives data from the event
+    loop instead of reading it from a dedicated thread."""
+
+    connection_oriented = True
+
+    def __init__(self, server):  # pylint: disable=super-init-not-called
+        self.server = server
+        self.transport = None
+        self.client_address = None
+        self.framing = CustomFraming(self.custom_header, self.custom_tail)
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.client_address = transport.get_extra_info('peername')
+        logging.info('Got connection from %s', self.client_address)
+        self.session = self.system.new_session()
+        self._set_nodelay(transport.get_extra_info('socket'))
+        self._open_capture()
+        self._greet()
+
+    def connection_lost(self, exc):
+        self._close_capture()
+
+    def data_received(self, data):
+        self._receive(data)
+
+    def _write(self, data, address):
+        self.transport.write(data)
+
+    def _link(self):
+        if self.link is None:
+            self.link = self.network.link(
+                self._write,
+                self._abort,
+                self.server.event_loop.call_at
+            )
+        return self.link
+
+    def _abort(self):
+        sock = self.transport.get_extra_info('socket')
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _linger)
+        self.transport.abort()
+
+
+class ListenDatagramProtocol(
+    ListenExecutorMixIn, ListenHandler, asyncio.DatagramProtocol
+):
+    """`ListenHandler` counterpart for the `AsyncUDPServer` class. A single
+    instance handles every datagram received by the server."""
+
+    connection_oriented = False
+
+    def __init__(self, server):  # pylint: disable=super-init-not-called
+        self.server = server
+        self.transport = None
+        self.client_address = None
+        self.framing = CustomFraming(self.custom_header, self.custom_tail)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.client_address = addr
+        self.framing.reset()
+        self._receive(data + b'\n')
+
+    def _parse(self, msg):
+        self.system.peer = self.client_address
+        return super()._parse(msg)
+
+    def _write(self, data, address):
+        if address:
+            self.transport.sendto(data, address)
+
+    def _link(self):
+        if self.link is None:
+            self.link = self.network.link(
+                self._write,
+                schedule=self.server.event_loop.call_at
+            )
+        return self.link
+
+
+class TransportSubscriber(StreamSubscriber):
+    """Delivers the messages published by a system to a client connected to
+    an event loop server. The messages are written into the client transport
+    inside the event loop, a transport that still holds some unsent data
+    is considered full, so the new messages are buffered or dropped
+    according to the backpressure policy.
+
+    :param transport: the transport connected to the client
+    :param loop: the event loop the transport belongs to
+    :type transport: asyncio.Transport
+    :type loop: asyncio.AbstractEventLoop"""
+
+    def __init__(self, transport, loop, address=None, **kwargs):
+        super().__init__(address, **kwargs)
+        self.transport = transport
+        self.loop = loop
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(super().deliver, message)
+        except RuntimeError:  # skip coverage
+            # The loop has already been closed
+            self.dropped += 1
+
+    def _write(self, data):
+        if self.transport.is_closing():
+            raise ConnectionResetError('The transport is closing.')
+        if self.transport.get_write_buffer_size():
+            return 0
+        self.transport.write(data)
+        return len(data)
+
+    def _disconnect(self):
+        self.transport.abort()
+
+
+class SendProtocol(ExecutorMixIn, SendHandler, asyncio.Protocol):
+    """`SendHandler` counterpart for the `AsyncTCPServer` class. The client
+    is subscribed to the system by means of a `TransportSubscriber`, so the
+    messages are written as soon as they are published, without polling."""
+
+    def __init__(self, server):  # pylint: disable=super-init-not-called
+        self.server = server
+        self.transport = None
+        self.client_address = None
+        self.subscription = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.client_address = transport.get_extra_info('peername')
+        self._set_nodelay(transport.get_extra_info('socket'))
+        transport.set_write_buffer_limits(high=0)
+        self.subscriber = TransportSubscriber(
+            transport,
+            self.server.event_loop.loop,
+            self.client_address,
+            **self._backpressure_options()
+        )
+        self.subscription = self._subscription()
+        self.system.subscribe(self.subscription)
+
+    def connection_lost(self, exc):
+        self.system.unsubscribe(self.subscription)
+
+    def resume_writing(self):
+        # The transport is paused as soon as it holds any unsent data, see
+        # `connection_made`, the subscriber writes the rest once it is empty
+        self.subscriber.resume()
+
+    def _abort(self):
+        def _abort():
+            sock = self.transport.get_extra_info('socket')
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _linger)
+            self.transport.abort()
+        self.server.event_loop.loop.call_soon_threadsafe(_abort)
+
+    def data_received(self, data):
+        self._receive(data)
+
+    def _send(self, data):
+        self.transport.write(data)
+
+
+class SendDatagramProtocol(
+    ExecutorMixIn, SendHandler, asyncio.DatagramProtocol
+):
+    """`SendHandler` counterpart for the `AsyncUDPServer` class. Every
+    received datagram is answered with the next message provided by the
+    system, as the threaded `SendHandler` does."""
+
+    def __init__(self, server):  # pylint: disable=super-init-not-called
+        self.server = server
+        self.transport = None
+        self.client_address = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.client_address = addr
+        if data:
+            self._receive(data)
+        queue = None
+
+        def _deliver():
+            try:
+                message = queue.get_nowait()
             except Empty:
-                pass
-            except IOError:
-                # Something went wrong while sending the message, probably
-                # the client was stopped without closing the connection
-                break
-        self.system.unsubscribe(message_queue)
+                return
+            self.system.unsubscribe(queue)
+            self.transport.sendto(message, addr)
+        queue = LoopQueue(self.server.event_loop.loop, _deliver)
+        self.system.subscribe(queue)
+
+    def _send(self, data):
+        self.transport.sendto(data, self.client_address)
+
+
+class AsyncTCPServer:
+    """Event loop based alternative to the `ThreadingTCPServer` class. It
+    exposes the same interface of the `socketserver` classes used by the
+    framework, but instead of spawning a thread for each client, it handles
+    all of them inside the `EventLoop` of the current process. The listening
+    socket is bound as soon as the object is created.
+
+    :param server_address: the address the server will listen on
+    :param request_handler_class: the protocol class used to handle clients
+    :type server_address: (ip, port)
+    :type request_handler_class: ListenProtocol or SendProtocol"""
+
+    address_family = socket.AF_INET
+    socket_type = socket.SOCK_STREAM
+    allow_reuse_address = True
+    request_queue_size = 5
+    handlers = (ListenProtocol, SendProtocol)
+
+    def __init__(self, server_address, request_handler_class):
+        self.server_address = server_address
+        self.RequestHandlerClass = request_handler_class
+        self.event_loop = EventLoop.get()
+        self.socket = socket.socket(self.address_family, self.socket_type)
+        try:
+            if self.allow_reuse_address:
+                self.socket.setsockopt(
+                    socket.SOL_SOCKET,
+                    socket.SO_REUSEADDR,
+                    1
+                )
+            self.socket.bind(server_address)
+            self.server_address = self.socket.getsockname()
+            if self.socket_type == socket.SOCK_STREAM:
+                self.socket.listen(self.request_queue_size)
+        except OSError:
+            self.socket.close()
+            raise
+        self.socket.setblocking(False)
+        self._server = None
+        self._closed = threading.Event()
+
+    def _protocol(self):
+        return self.RequestHandlerClass(self)
+
+    async def _start(self):
+        return await self.event_loop.loop.create_server(
+            self._protocol,
+            sock=self.socket
+        )
+
+    def start(self):
+        """Starts serving inside the event loop, without blocking."""
+        self._server = self.event_loop.run(self._start())
+
+    def join(self):
+        """Waits for the server to be shut down."""
+        self._closed.wait()
+
+    def serve_forever(self):
+        """Starts serving and waits for the server to be shut down."""
+        self.start()
+        self.join()
+
+    def _close(self):
+        if self._server is not None:
+            self._server.close()
+        self.socket.close()
+        self._closed.set()
+
+    def shutdown(self):
+        """Stops accepting requests. Clients that are already connected are
+        not disconnected, as it happens with the `socketserver` classes."""
+        self.event_loop.call(self._close)
+
+    def server_close(self):
+        """Closes the listening socket."""
+        self.event_loop.call(self._close)
+
+
+class AsyncUDPServer(AsyncTCPServer):
+    """Event loop based alternative to the `ThreadingUDPServer` class. Every
+    datagram is handled inside the `EventLoop` of the current process instead
+    of spawning a new thread.
+
+    :param server_address: the address the server will listen on
+    :param request_handler_class: the protocol class used to handle
+        datagrams
+    :type server_address: (ip, port)
+    :type request_handler_class: ListenDatagramProtocol or
+        SendDatagramProtocol"""
+
+    socket_type = socket.SOCK_DGRAM
+    handlers = (ListenDatagramProtocol, SendDatagramProtocol)
+
+    async def _start(self):
+        transport, _ = await self.event_loop.loop.create_datagram_endpoint(
+            self._protocol,
+            sock=self.socket
+        )
+        return transport
+
+
+class DatagramHandler(ListenHandler):
+    """`ListenHandler` counterpart for the `BatchedUDPServer` class. The
+    server keeps an instance for each client address, which handles all the
+    datagrams of that client.
+
+    :param server: the server that received the datagrams
+    :param client_address: the address of the client
+    :type server: BatchedUDPServer
+    :type client_address: (ip, port)"""
+
+    connection_oriented = False
+
+    def __init__(self, server, client_address):
+        # pylint: disable=super-init-not-called
+        self.server = server
+        self.client_address = client_address
+        self.socket = server.socket
+        self.framing = CustomFraming(self.custom_header, self.custom_tail)
+
+    def datagram_received(self, data):
+        """Handles a datagram received from the client.
+
+        :param data: the received datagram
+        :type data: bytes"""
+        self.framing.reset()
+        self.system.peer = self.client_address
+        self._handle(data + b'\n')
+
+    def _link(self):
+        if self.link is None:
+            self.link = self.network.link(self._write_nowait)
+        return self.link
+
+
+class BatchedUDPServer:
+    """Alternative to the `ThreadingUDPServer` class for the listening
+    servers, which handles every datagram in the thread of the server
+    instead of spawning a new thread for each one of them. As soon as the
+    socket is readable, up to `batch_size` datagrams are read and handled
+    back to back. Every client address gets its own `DatagramHandler`, the
+    `max_peers` most recent ones are kept, so the state of the server does
+    not grow with the number of clients.
+
+    With the `reuse_port` server option, many servers, each one in its own
+    worker process, can be bound to the same address, and the kernel spreads
+    the clients among them. Each worker has its own system, a given client
+    is always served by the same one.
+
+    :param server_address: the address the server will listen on
+    :param request_handler_class: the handler of the clients
+    :type server_address: (ip, port)
+    :type request_handler_class: DatagramHandler"""
+
+    address_family = socket.AF_INET
+    socket_type = socket.SOCK_DGRAM
+    allow_reuse_address = True
+    batch_size = 64
+    max_peers = 256
+    max_packet_size = 8192
+    poll_interval = 0.5
+    handlers = (DatagramHandler, None)
+
+    def __init__(self, server_address, request_handler_class):
+        self.RequestHandlerClass = request_handler_class
+        self.socket = socket.socket(self.address_family, self.socket_type)
+        try:
+            if self.allow_reuse_address:
+                self.socket.setsockopt(
+                    socket.SOL_SOCKET,
+                    socket.SO_REUSEADDR,
+                    1
+                )
+            reuse_port = request_handler_class.reuse_port > 1
+            if reuse_port and self.address_family != socket.AF_UNIX:
+                self.socket.setsockopt(
+                    socket.SOL_SOCKET,
+                    socket.SO_REUSEPORT,
+                    1
+                )
+            self.socket.bind(server_address)
+        except OSError:
+            self.socket.close()
+            raise
+        self.server_address = self.socket.getsockname()
+        self.peers = OrderedDict()
+        self._serving = None
+        self._shutdown = threading.Event()
+        self._closed = threading.Event()
+
+    def serve_forever(self):
+        """Handles the received datagrams until the server is shut down."""
+        self._serving = threading.current_thread()
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(self.socket, selectors.EVENT_READ)
+                while not self._shutdown.is_set():
+                    if selector.select(self.poll_interval):
+                        self._handle_batch()
+        finally:
+            self._closed.set()
+
+    def _handle_batch(self):
+        """Handles the datagrams waiting to be read, up to `batch_size`."""
+        for _ in range(self.batch_size):
+            try:
+                data, address = self.socket.recvfrom(
+                    self.max_packet_size,
+                    socket.MSG_DONTWAIT
+                )
+            except OSError:
+                # No more datagrams, or the socket has been closed
+                return
+            self._peer(address).datagram_received(data)
+
+    def _peer(self, address):
+        """Returns the handler of the given client address, evicting the
+        least recently seen client if there are too many of them.
+
+        :param address: the address of the client
+        :type address: (ip, port)
+        :rtype: DatagramHandler"""
+        handler = self.peers.get(address)
+        if handler is None:
+            while len(self.peers) >= self.max_peers:
+                self.peers.popitem(last=False)
+            handler = self.RequestHandlerClass(self, address)
+            self.peers[address] = handler
+        else:
+            self.peers.move_to_end(address)
+        return handler
+
+    def shutdown(self):
+        """Stops handling datagrams, waiting for the server to stop unless
+        called by the server thread itself (i.e. by the `$system_stop%%%%%`
+        command)."""
+        self._shutdown.set()
+        serving = self._serving
+        if serving is not None and serving is not threading.current_thread():
+            self._closed.wait()
+
+    def server_close(self):
+        """Closes the socket."""
+        self.socket.close()
+
+
+class AsyncUnixStreamServer(AsyncTCPServer):
+    """`AsyncTCPServer` counterpart listening on an AF_UNIX stream socket,
+    see the `unix_socket` server option.
+
+    :param server_address: the path of the socket
+    :param request_handler_class: the protocol class used to handle clients
+    :type server_address: str
+    :type request_handler_class: ListenProtocol or SendProtocol"""
+
+    address_family = socket.AF_UNIX
+
+
+class AsyncUnixDatagramServer(AsyncUDPServer):
+    """`AsyncUDPServer` counterpart bound to an AF_UNIX datagram socket,
+    see the `unix_socket` server option.
+
+    :param server_address: the path of the socket
+    :param request_handler_class: the protocol class used to handle
+        datagrams
+    :type server_address: str
+    :type request_handler_class: ListenDatagramProtocol or
+        SendDatagramProtocol"""
+
+    address_family = socket.AF_UNIX
+
+
+class BatchedUnixDatagramServer(BatchedUDPServer):
+    """`BatchedUDPServer` counterpart bound to an AF_UNIX datagram socket,
+    see the `unix_socket` server option.
+
+    :param server_address: the path of the socket
+    :param request_handler_class: the handler of the clients
+    :type server_address: str
+    :type request_handler_class: DatagramHandler"""
+
+    address_family = socket.AF_UNIX
+
+
+tcp_servers = (ThreadingTCPServer, AsyncTCPServer)
+udp_servers = (ThreadingUDPServer, AsyncUDPServer, BatchedUDPServer)
+asyncio_servers = {
+    ThreadingTCPServer: AsyncTCPServer,
+    ThreadingUDPServer: AsyncUDPServer,
+}
+unix_servers = {
+    ThreadingTCPServer: ThreadingUnixStreamServer,
+    ThreadingUDPServer: ThreadingUnixDatagramServer,
+    AsyncTCPServer: AsyncUnixStreamServer,
+    AsyncUDPServer: AsyncUnixDatagramServer,
+    BatchedUDPServer: BatchedUnixDatagramServer,
+}
+engines = ('threading', 'asyncio')
+server_options = (
+    'tcp_nodelay',
+    'coalesce_responses',
+    'backpressure',
+    'backpressure_buffer',
+    'backpressure_misses',
+    'stats',
+    'capture',
+    'impairment',
+    'reuse_port',
+    'unix_socket',
+    'multicast',
+    'multicast_interface',
+    'shared_memory',
+    'max_connections',
+    'admission',
+    'accept_queue',
+    'single_writer',
+    'admin_port',
+)
 
 
 class Server:
@@ -213,20 +1573,115 @@ class Server:
     must not share the same endpoint (IP address and/or port should be
     different).
 
+    The `AsyncTCPServer` and `AsyncUDPServer` types can be used in place of
+    their threading counterparts in order to handle the clients inside the
+    process `EventLoop` instead of using a thread for each one of them.
+
+    The behavior of the server towards its clients can be tuned by the
+    following options:
+
+    * `tcp_nodelay`: disables the Nagle algorithm on the sockets of the TCP
+      clients, so that small responses are sent without delay. Defaults to
+      True.
+    * `coalesce_responses`: all the responses generated from a single chunk
+      of received bytes are sent back to a TCP client with a single write,
+      instead of a write for each one of them. Defaults to True.
+    * `backpressure`: what a sending server does when one of its TCP
+      clients does not read the status messages fast enough, one of
+      `'drop-oldest'` (the default), `'drop-newest'`, `'coalesce-to-latest'`
+      and `'disconnect'`. See the `StreamSubscriber` class for details.
+    * `backpressure_buffer`: how many status messages are buffered for a
+      client that lags behind. Defaults to 1.
+    * `backpressure_misses`: with the `'disconnect'` policy, how many
+      consecutive status messages a client can lag behind before being
+      disconnected. Defaults to 10.
+    * `stats`: collects the number of calls and errors and the latency
+      percentiles of every command, along with the received and sent bytes,
+      returned by the `$stats%%%%%` custom command (`$stats:text%%%%%` for a
+      textual format) and cleared by the `$stats_reset%%%%%` one. Defaults to
+      False.
+    * `capture`: the directory where the listening server writes a log of
+      the traffic of its TCP clients, named after the simulator and the
+      port of the server, that can be replayed later on. See the `capture`
+      module for details. Defaults to None, nothing is captured.
+    * `impairment`: the settings of the emulated network between the server
+      and its clients, i.e. `'latency=50,jitter=10,drop=0.01'`, or True to
+      configure them later on by means of the `$impair%%%%%` custom command.
+      It affects the data sent to the clients of the listening servers and
+      to the TCP clients of the sending servers. See the `impairment` module
+      for details. Defaults to None, the network is not emulated.
+    * `reuse_port`: the number of worker processes a `BatchedUDPServer` is
+      replicated to, all of them bound to the same address. See the
+      `Simulator` class. Defaults to 1.
+    * `unix_socket`: the directory where every listening and sending server
+      is also exposed on an AF_UNIX socket of the same type (stream or
+      datagram), named after the simulator and the port of the server, i.e.
+      `acu-13000.sock`, or True for the runtime directory of the control
+      plane. The clients of both sockets are handled alike, by the same
+      system. A client of a datagram socket must bind its own socket to a
+      path in order to receive any answer. Defaults to None, the servers
+      are only exposed on their network address.
+    * `multicast`: the UDP multicast group (or the broadcast address) every
+      status message of the sending server is also published to, once for
+      all the clients that joined the group, i.e. `'239.255.0.1:13001'`.
+      The port of the sending server is used when the group is given
+      without one, the `DatagramSubscriber.default_group` when the option is
+      just True. Every datagram starts with a sequence number, so that the
+      clients can detect the lost messages. See the `DatagramSubscriber`
+      class for details. Defaults to None, the messages are only sent to the
+      TCP or UDP clients of the sending server.
+    * `multicast_interface`: the address of the local interface the
+      multicast datagrams are sent from, i.e. `'127.0.0.1'`. Defaults to the
+      interface chosen by the kernel.
+    * `shared_memory`: the name of the shared memory segment the latest
+      status message of the sending server is also written into, or True
+      for a name made of the simulator and the port of the server, i.e.
+      `discos-acu-13001`. The tools running on the same host read it by
+      means of a `SharedStatusReader`. See the `shared_status` module for
+      details. Defaults to None, no segment is created.
+    * `max_connections`: the maximum number of clients a threading TCP
+      server handles at once, by means of a pool of as many worker threads
+      instead of a new thread for each client. See the `admission` module
+      for details. Defaults to 0, no limit. The event loop servers, which do
+      not spawn any thread, are not affected.
+    * `admission`: what a server does with a new client when it is already
+      handling `max_connections` clients, one of `'reject'` (the default),
+      `'queue'` and `'evict-oldest'`.
+    * `accept_queue`: the length of the queue of the connections waiting to
+      be accepted by the TCP servers and, with the `'queue'` admission
+      policy, the maximum number of clients waiting for a free worker.
+      Defaults to 5.
+    * `single_writer`: the received bytes are parsed and the commands,
+      custom commands included, are executed by a single thread for each
+      system, one after the other, while the threads of the clients only
+      receive the bytes and send the responses. The counters of the
+      dispatcher are returned by the `$dispatcher%%%%%` custom command. See
+      the `dispatcher` module for details. Defaults to False.
+    * `admin_port`: the port of a dedicated TCP server, on the same host as
+      the servers of the system, the custom commands are routed to. The
+      clients of the system are not searched for custom commands anymore,
+      their bytes only go to the system. The `$system_stop%%%%%` command
+      received by the admin server stops every server of the system. See
+      the `framing` module for details. Defaults to None, the custom
+      commands are received along with the commands of the system.
+
     :param system: the desired simulator system module
-    :param server_type: the type of threading server to be used
+    :param server_type: the type of server to be used
     :param kwargs: the arguments to pass to the system instance constructor
         method
     :param l_address: the address of the server that exposes the
         `System.parse()` method
     :param s_address: the address of the server that exposes the
         `System.subscribe()` and `System.unsubscribe()` methods
+    :param options: the server options to override, by name
     :type system: System class that inherits from ListeningServer or/and
         SendingServer
-    :type server_type: ThreadingTCPServer or ThreadingUDPServer
+    :type server_type: ThreadingTCPServer, ThreadingUDPServer, AsyncTCPServer
+        or AsyncUDPServer
     :type kwargs: dict
     :type l_address: (ip, port)
     :type s_address: (ip, port)
+    :type options: dict
     """
     def __init__(
         self,
@@ -234,16 +1689,74 @@ class Server:
         server_type,
         kwargs,
         l_address=None,
-        s_address=None
+        s_address=None,
+        options=None
     ):
-        if server_type not in (ThreadingTCPServer, ThreadingUDPServer):
+        if server_type not in tcp_servers + udp_servers:
             raise ValueError(
-                'Provide either the `ThreadingTCPServer` class '
-                + 'or the `ThreadingUDPServer` class!'
+                'Provide either the `ThreadingTCPServer` class, '
+                + 'the `ThreadingUDPServer` class or one of their '
+                + '`AsyncTCPServer` and `AsyncUDPServer` counterparts!'
             )
         if not l_address and not s_address:
             raise ValueError('You must specify at least one server.')
-        for address in (l_address, s_address):
+        options = dict(options or {})
+        for name in options:
+            if name not in server_options:
+                raise ValueError(
+                    f"Unknown server option '{name}', "
+                    + f'choose among {server_options}.'
+                )
+        if options.get('backpressure', policies[0]) not in policies:
+            raise ValueError(
+                f"Unknown backpressure policy '{options['backpressure']}', "
+                + f'choose among {policies}.'
+            )
+        if options.get('impairment'):
+            Impairment.parse(options['impairment'])
+        for name, minimum in (
+            ('reuse_port', 1),
+            ('max_connections', 0),
+            ('accept_queue', 0),
+        ):
+            value = options.get(name, minimum)
+            if not isinstance(value, int) or value < minimum:
+                raise ValueError(
+                    f"Invalid {name} '{value}', "
+                    + f'it must be an integer not less than {minimum}.'
+                )
+        if options.get('admission', admission_policies[0]) not in (
+            admission_policies
+        ):
+            raise ValueError(
+                f"Unknown admission policy '{options['admission']}', "
+                + f'choose among {admission_policies}.'
+            )
+        admin_port = options.get('admin_port')
+        if admin_port is not None and (
+            not isinstance(admin_port, int)
+            or isinstance(admin_port, bool)
+            or not 0 < admin_port <= 65535
+        ):
+            raise ValueError(
+                f"Invalid admin_port '{admin_port}', "
+                + 'it must be an integer between 1 and 65535.'
+            )
+        for name in ('multicast', 'shared_memory'):
+            if options.get(name) and not s_address:
+                raise ValueError(
+                    f'The `{name}` option needs a sending server.'
+                )
+        if options.get('multicast'):
+            self._multicast_address(options['multicast'], s_address[1])
+        if s_address and getattr(server_type, 'handlers', (0, 1))[1] is None:
+            raise ValueError(
+                f'A `{server_type.__name__}` can only be a listening server.'
+            )
+        admin_address = None
+        if admin_port:
+            admin_address = ((l_address or s_address)[0], admin_port)
+        for address in (l_address, s_address, admin_address):
             if not address:
                 continue
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -259,40 +1772,238 @@ class Server:
         self.server_type.allow_reuse_address = True
         self.l_address = l_address
         self.s_address = s_address
+        self.options = options
         self.servers = []
         self.threads = []
         self.main_thread = None
+        self.capture_log = None
+        self.unix_paths = []
+        self.publishers = []
+        self.dispatcher = None
 
     def _setup(self):
+        listen_handler, send_handler = getattr(
+            self.server_type,
+            'handlers',
+            (ListenHandler, SendHandler)
+        )
+        server_class = self._server_class(self.server_type)
+        # Every server gets its own handler class, so that multiple servers
+        # hosted by the same process do not share the same system
         if self.l_address:
-            self.servers.append(
-                self.server_type(self.l_address, ListenHandler)
+            handler = type(
+                listen_handler.__name__,
+                (listen_handler,),
+                dict(self.options)
             )
+            self.servers.append(server_class(self.l_address, handler))
         if self.s_address:
-            self.servers.append(
-                self.server_type(self.s_address, SendHandler)
+            handler = type(
+                send_handler.__name__,
+                (send_handler,),
+                dict(self.options)
             )
+            self.servers.append(server_class(self.s_address, handler))
+        if self.options.get('unix_socket'):
+            for server in list(self.servers):
+                self.servers.append(self._unix_server(server))
         self.system = self.system_cls(**self.system_kwargs)
+        # The listening and the sending servers share the same metrics, the
+        # same emulated network and the same dispatcher
+        metrics = Metrics() if self.options.get('stats') else None
+        network = None
+        if self.options.get('impairment'):
+            network = Impairment.parse(self.options['impairment'])
+        if self.options.get('single_writer'):
+            self.dispatcher = Dispatcher(
+                f'{self._endpoint_name(self.servers[0])}-dispatcher'
+            )
         for server in self.servers:
             server.RequestHandlerClass.system = self.system
+            server.RequestHandlerClass.metrics = metrics
+            server.RequestHandlerClass.network = network
+            server.RequestHandlerClass.dispatcher = self.dispatcher
+        # The publishers get every status message along with the clients
+        # of the sending server
+        if self.options.get('multicast'):
+            self.publishers.append(DatagramSubscriber(
+                self._multicast_address(
+                    self.options['multicast'],
+                    self._sending_server().server_address[1]
+                ),
+                self.options.get('multicast_interface', '')
+            ))
+        if self.options.get('shared_memory'):
+            self.publishers.append(
+                self._shared_status(self._sending_server())
+            )
+        if self.options.get('admin_port'):
+            self.servers.append(self._admin_server(metrics))
+        for publisher in self.publishers:
+            self.system.subscribe(publisher)
+        capturing = self.options.get('capture')
+        if capturing and self.l_address and self.server_type in tcp_servers:
+            self.capture_log = self._capture_log(self.servers[0])
+            self.servers[0].RequestHandlerClass.capture_log = self.capture_log
 
-    def serve_forever(self, serving=None):
-        """This method starts the System and then cycle for incoming requests.
-        """
+    def _server_class(self, server_type):
+        """Returns the class of the servers of the given type, tuned by the
+        `max_connections` and `accept_queue` server options.
+
+        :param server_type: the type of the servers
+        :rtype: type"""
+        attributes = {}
+        if 'accept_queue' in self.options:
+            attributes['request_queue_size'] = self.options['accept_queue']
+        bases = (server_type,)
+        if (
+            self.options.get('max_connections')
+            and issubclass(server_type, ThreadingMixIn)
+            and server_type.socket_type == socket.SOCK_STREAM
+        ):
+            bases = (AdmissionMixIn, server_type)
+        if len(bases) == 1 and not attributes:
+            return server_type
+        return type(server_type.__name__, bases, attributes)
+
+    def _admin_server(self, metrics):
+        """Creates the server the custom commands are routed to, see the
+        `admin_port` server option. It shares the metrics and the dispatcher
+        of the other servers, but not their emulated network.
+
+        :param metrics: the metrics of the servers, if any
+        :type metrics: Metrics
+        :rtype: AdminServer"""
+        handler = type(AdminHandler.__name__, (AdminHandler,), {
+            'system': self.system,
+            'metrics': metrics,
+            'dispatcher': self.dispatcher,
+            'servers': tuple(self.servers),
+            'tcp_nodelay': self.options.get('tcp_nodelay', True),
+        })
+        host = (self.l_address or self.s_address)[0]
+        return AdminServer((host, self.options['admin_port']), handler)
+
+    def _sending_server(self):
+        """Returns the sending server, the options that need one are
+        rejected if none is given."""
+        return self.servers[1 if self.l_address else 0]
+
+    def _endpoint_name(self, server):
+        """Returns the name of the given server, made of the name of the
+        system module and the port of the server, i.e. `acu-13000`."""
+        name = self.system_cls.__module__.rsplit('.', 1)[-1]
+        return f'{name}-{server.server_address[1]}'
+
+    def _capture_log(self, server):
+        """Opens the log of the traffic of the given listening server."""
+        host, port = server.server_address[:2]
+        directory = self.options['capture']
+        os.makedirs(directory, exist_ok=True)
+        return capture.CaptureLog(
+            os.path.join(directory, f'{self._endpoint_name(server)}.cap'),
+            {
+                'system': self.system_cls.__module__,
+                'address': [host, port],
+                'pid': os.getpid(),
+            }
+        )
+
+    @staticmethod
+    def _multicast_address(value, port):
+        """Returns the address the status messages are published to,
+        according to the `multicast` server option.
+
+        :param value: the value of the option
+        :param port: the port of the sending server
+        :type value: str or bool
+        :type port: int
+        :return: the multicast group and its port
+        :rtype: (ip, port)
+        :raise ValueError: if the group or the port are not valid"""
+        group = DatagramSubscriber.default_group
+        if isinstance(value, str):
+            group, _, given_port = value.partition(':')
+            if given_port:
+                port = int(given_port)
+        ipaddress.IPv4Address(group)
+        if not 0 <= port <= 65535:
+            raise ValueError(f"Invalid multicast port '{port}'.")
+        return group, port
+
+    def _shared_status(self, server):
+        """Creates the shared memory segment of the given sending server,
+        see the `shared_memory` server option.
+
+        :param server: the sending server
+        :rtype: SharedStatusWriter"""
+        name = self.options['shared_memory']
+        if not isinstance(name, str):
+            name = f'discos-{self._endpoint_name(server)}'
+        try:
+            return SharedStatusWriter(name)
+        except FileExistsError:
+            # The address of the server is free, so the segment has been
+            # left behind by a simulator that did not exit cleanly
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            return SharedStatusWriter(name)
+
+    def _unix_server(self, server):
+        """Binds the AF_UNIX counterpart of the given server, which shares
+        its handler class, see the `unix_socket` server option.
+
+        :param server: the listening or sending server
+        :return: the server bound to the AF_UNIX socket"""
+        directory = self.options['unix_socket']
+        if not isinstance(directory, str):
+            directory = control.runtime_dir()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        path = os.path.join(directory, f'{self._endpoint_name(server)}.sock')
+        # The network address is free, so the socket has been left behind
+        # by a simulator that did not exit cleanly
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        unix_server = self._server_class(unix_servers[self.server_type])(
+            path,
+            server.RequestHandlerClass
+        )
+        self.unix_paths.append((path, os.stat(path).st_ino))
+        return unix_server
+
+    def start_serving(self):
+        """This method starts the System and its servers without blocking.
+        Threading servers are run in a daemon thread each, while event loop
+        servers are registered in the `EventLoop` of the current process."""
         self._setup()
         for server in self.servers:
-            t = threading.Thread(target=server.serve_forever)
-            t.daemon = True
-            t.start()
-            self.threads.append(t)
-        if serving is not None:
-            serving.set()
+            if isinstance(server, AsyncTCPServer):
+                runner = server
+            else:
+                runner = threading.Thread(target=server.serve_forever)
+                runner.daemon = True
+            runner.start()
+            self.threads.append(runner)
+
+    def wait(self):
+        """Waits for all the servers to be shut down."""
         try:
             for t in self.threads:
                 t.join()
         except KeyboardInterrupt:
             pass
 
+    def serve_forever(self, serving=None):
+        """This method starts the System and then cycle for incoming requests.
+        """
+        self.start_serving()
+        if serving is not None:
+            serving.set()
+        self.wait()
+
     def start(self):
         """Starts a daemon thread which calls the `serve_forever` method. The
         server is therefore started as a daemon."""
@@ -310,6 +2021,63 @@ class Server:
         for server in self.servers:
             server.shutdown()
             server.server_close()
+        if self.capture_log is not None:
+            self.capture_log.close()
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+        for publisher in self.publishers:
+            self.system.unsubscribe(publisher)
+            publisher.close()
+        for path, inode in self.unix_paths:
+            # Another copy of a `BatchedUDPServer` might have taken the path
+            try:
+                if os.stat(path).st_ino == inode:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def _stop_servers(servers):
+    """Stops the systems of the given servers, as the `$system_stop%%%%%`
+    command would, then the servers themselves. Shutting down a threading
+    server takes up to half a second, so all the servers are stopped
+    concurrently.
+
+    :param servers: the servers to be stopped
+    :type servers: list of Server objects"""
+    def _stop(server):
+        try:
+            if server.system is not None:
+                server.system.system_stop()
+        except Exception as ex:  # skip coverage
+            logging.debug(ex)
+        server.stop()
+    threads = [
+        threading.Thread(target=_stop, args=(server,)) for server in servers
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def _serve(servers, started=None):
+    """Starts the given servers inside the current process and waits for all
+    of them to be shut down. When run by the main thread of a worker process,
+    the servers get stopped as soon as the process receives a SIGTERM.
+
+    :param servers: the servers to be started
+    :param started: the event to be set as soon as all the servers are up
+    :type servers: list of Server objects
+    :type started: multiprocessing.Event"""
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: _stop_servers(servers))
+    for server in servers:
+        server.start_serving()
+    if started is not None:
+        started.set()
+    for server in servers:
+        server.wait()
 
 
 class Simulator:
@@ -317,20 +2085,62 @@ class Simulator:
     or more servers.
 
     :param system_module: the module that implements the System class.
+    :param engine: the serving engine, `threading` runs each server in its own
+        process and each client in its own thread, `asyncio` runs all the
+        servers in the current process, handling every client inside a single
+        event loop.
+    :param options: the options to be passed to every server of the
+        simulator, see the `Server` class. Every `BatchedUDPServer` of the
+        simulator is replicated as many times as the `reuse_port` option
+        tells, all the copies bound to the same address. Unless the workers
+        are given, each copy gets its own worker process.
+    :param workers: the number of worker processes the servers are
+        distributed to, each worker hosting many servers. By default every
+        server gets its own worker, unless the `asyncio` engine is used, in
+        which case all the servers are hosted by a single worker.
     :type system_module: module that implements the System class, string
+    :type engine: string
+    :type options: dict
+    :type workers: int
     """
-    def __init__(self, system_module, **kwargs):
+    def __init__(
+        self,
+        system_module,
+        engine='threading',
+        options=None,
+        workers=None,
+        **kwargs
+    ):
         if not isinstance(system_module, types.ModuleType):
             system_module = importlib.import_module(
                 f'simulators.{system_module}'
             )
+        if engine not in engines:
+            raise ValueError(
+                f"Unknown engine '{engine}', choose one of {engines}."
+            )
+        if workers is not None and (
+            not isinstance(workers, int) or workers < 1
+        ):
+            raise ValueError(
+                f"Invalid number of workers '{workers}', "
+                + 'it must be a positive integer.'
+            )
+        if workers is None and engine == 'asyncio':
+            # All the servers share the event loop of a single process
+            workers = 1
         self.system = system_module.System
+        self.engine = engine
+        self.options = options
+        self.workers = workers
         self.kwargs = kwargs
         self.servers = system_module.servers
         self.system_type = kwargs.get('system_type')  # From command line
-        module_name = system_module.__name__.split('.')[-1]
-        self.simulator_name = self.system_type or module_name
+        self.module_name = system_module.__name__.split('.')[-1]
+        self.simulator_name = self.system_type or self.module_name
         self.processes = []
+        self.shards = []
+        self.control = None
 
     def start(
         self,
@@ -339,7 +2149,10 @@ class Simulator:
         has_started=None
     ):
         """Starts a simulator by instancing the servers listed in the given
-        module.
+        module. The first worker is run in a thread of the current process,
+        every other worker gets its own process. Once all the servers are up,
+        the simulator registers itself in the control plane, see the
+        `simulators.control` module.
 
         :param daemon: if true, the server processes are created as daemons,
             meaning that when this simulator object is destroyed, they get
@@ -355,30 +2168,47 @@ class Simulator:
         try:
             for l_addr, s_addr, s_type, kwargs in self.servers:
                 kwargs.update(self.kwargs)
-                s = Server(
-                    self.system, s_type, kwargs, l_addr, s_addr
-                )
-                servers.append(s)
-            for s in servers:
+                if self.engine == 'asyncio':
+                    s_type = asyncio_servers.get(s_type, s_type)
+                for _ in range(self._copies(s_type)):
+                    options = self.options
+                    if options and options.get('admin_port'):
+                        # Every server gets its own admin port
+                        options = dict(options)
+                        options['admin_port'] += len(servers)
+                    s = Server(
+                        self.system, s_type, kwargs, l_addr, s_addr, options
+                    )
+                    servers.append(s)
+            if self.workers:
+                # Round robin, so that each worker gets a similar load
+                shards = [
+                    servers[index::self.workers]
+                    for index in range(min(self.workers, len(servers)))
+                ]
+            else:
+                shards = [[s] for s in servers]
+            for shard in shards:
                 started = mp.Event()
                 p = executor(
-                    target=s.serve_forever,
-                    args=(started,),
+                    target=_serve,
+                    args=(shard, started),
                     daemon=daemon
                 )
                 self.processes.append(p)
+                self.shards.append(shard)
                 started_servers.append(started)
                 executor = process_class
             for process in self.processes:
                 process.start()
             for started_server in started_servers:
                 started_server.wait()
+            self.control = control.ControlServer(self.module_name, self)
             print(f"Simulator '{self.simulator_name}' up and running.")
             if has_started is not None:
                 has_started.set()
             if not daemon:
-                for p in self.processes:
-                    p.join()
+                self._wait()
                 print(f"Simulator '{self.simulator_name}' stopped.")
         except KeyboardInterrupt:
             print('')  # Skip the line displaying the SIGINT character
@@ -386,52 +2216,133 @@ class Simulator:
         except OSError:
             print(f"Simulator '{self.simulator_name}' already running.")
 
-    def stop(self):
-        """Stops a simulator by sending the custom `$system_stop%%%%%` command
-        to all servers of the given simulator."""
-        def _send_stop(entry):
-            l_addr, s_addr, server_type, _ = entry
+    def _copies(self, server_type):
+        """Returns the number of copies of a server the simulator starts, see
+        the `reuse_port` server option.
+
+        :param server_type: the type of the server
+        :return: the number of copies of the server
+        :rtype: int"""
+        if server_type is BatchedUDPServer:
+            return (self.options or {}).get('reuse_port', 1)
+        return 1
+
+    def _stop_addresses(self):
+        """Returns the addresses the `$system_stop%%%%%` command is sent to
+        when the simulator can not be reached through its control socket:
+        the admin ports, if the `admin_port` server option is given, since
+        the other servers ignore the custom commands, or the addresses of
+        the servers otherwise.
+
+        :return: the addresses, along with the type of their sockets
+        :rtype: list of ((ip, port), int)"""
+        admin_port = (self.options or {}).get('admin_port')
+        addresses = []
+        for l_addr, s_addr, server_type, _ in self.servers:
+            if admin_port:
+                # The admin ports are given in the order the servers start
+                host = (l_addr or s_addr)[0]
+                for _ in range(self._copies(server_type)):
+                    addresses.append(((host, admin_port), socket.SOCK_STREAM))
+                    admin_port += 1
+                continue
+            if server_type in tcp_servers:
+                socket_type = socket.SOCK_STREAM
+            else:
+                socket_type = socket.SOCK_DGRAM
             for address in (l_addr, s_addr):
-                if not address:
-                    continue
-                if server_type == ThreadingTCPServer:
-                    socket_type = socket.SOCK_STREAM
-                else:
-                    socket_type = socket.SOCK_DGRAM
-                sockobj = socket.socket(socket.AF_INET, socket_type)
+                if address:
+                    addresses.append((address, socket_type))
+        return addresses
+
+    def _wait(self):
+        """Waits for all the workers to exit, then removes the simulator from
+        the control plane. Meanwhile, when called from the main thread, a
+        SIGTERM stops the simulator."""
+        handler = None
+        if threading.current_thread() is threading.main_thread():
+            handler = signal.signal(signal.SIGTERM, lambda *_: self.halt())
+        try:
+            for p in self.processes:
+                p.join()
+        finally:
+            if handler is not None:
+                signal.signal(signal.SIGTERM, handler)
+            if self.control:
+                self.control.close()
+
+    def halt(self):
+        """Stops all the servers of a simulator started by this object. The
+        servers of the first worker are stopped directly, every other worker
+        process gets a SIGTERM. It returns once all the workers have
+        exited."""
+        local = []
+        for process, shard in zip(self.processes, self.shards):
+            if isinstance(process, threading.Thread):
+                local = shard
+            elif process.is_alive():
                 try:
-                    sockobj.settimeout(0.1)
-                    sockobj.connect(address)
-                    try:
-                        while sockobj.recv(1024):
-                            pass
-                    except socket.timeout:
+                    os.kill(process.pid, signal.SIGTERM)
+                except ProcessLookupError:  # skip coverage
+                    pass
+        _stop_servers(local)
+        for p in self.processes:
+            p.join()
+
+    def stop(self):
+        """Stops a simulator. A running simulator gets stopped through its
+        control socket with a single round trip, otherwise the custom
+        `$system_stop%%%%%` command is sent to all servers of the given
+        simulator, or to their admin ports if the `admin_port` server option
+        is given."""
+        if control.stop(self.module_name):
+            for p in self.processes:
+                p.join()
+            if self.control:
+                self.control.close()
+            print(f"Simulator '{self.simulator_name}' stopped.")
+            return
+
+        def _send_stop(address, socket_type):
+            sockobj = socket.socket(socket.AF_INET, socket_type)
+            try:
+                sockobj.settimeout(0.1)
+                sockobj.connect(address)
+                try:
+                    while sockobj.recv(1024):
                         pass
-                    sockobj.sendto(b'$system_stop%%%%%', address)
-                    response = sockobj.recv(1024)
-                    if response != b'$server_shutdown%%%%%':  # skip coverage
-                        logging.warning(
-                            '%s %s %s',
-                            'The server did not answer with the',
-                            '$server_shutdown%%%%% string!',
-                            'The simulator might still be running!'
-                        )
-                except TimeoutError:  # skip coverage
-                    # We don't want to log this
+                except socket.timeout:
                     pass
-                except Exception as ex:  # skip coverage
-                    logging.debug(ex)
-                finally:
-                    sockobj.close()
+                sockobj.sendto(b'$system_stop%%%%%', address)
+                response = sockobj.recv(1024)
+                if response != b'$server_shutdown%%%%%':  # skip coverage
+                    logging.warning(
+                        '%s %s %s',
+                        'The server did not answer with the',
+                        '$server_shutdown%%%%% string!',
+                        'The simulator might still be running!'
+                    )
+            except TimeoutError:  # skip coverage
+                # We don't want to log this
+                pass
+            except Exception as ex:  # skip coverage
+                logging.debug(ex)
+            finally:
+                sockobj.close()
         threads = []
-        for entry in self.servers:
-            t = threading.Thread(target=_send_stop, args=(entry,))
+        for address, socket_type in self._stop_addresses():
+            t = threading.Thread(
+                target=_send_stop,
+                args=(address, socket_type)
+            )
             t.start()
             threads.append(t)
         for t in threads:
             t.join()
         for p in self.processes:
             p.join()
+        if self.control:
+            self.control.close()
         if self.processes:
             print(f"Simulator '{self.simulator_name}' stopped.")
         else:
@@ -0,0 +1,122 @@
+"""This module publishes the latest status message of a `SendingSystem` into a
+`multiprocessing.shared_memory` segment, enabled by the `shared_memory`
+server option, so that the tools running on the same host can read it
+without connecting to the simulator and without any system call.
+
+The segment starts with a header made of two native unsigned 64 bits
+integers, the sequence counter and the length of the status, followed by
+the status itself. The segment is guarded by a seqlock: the single writer
+increments the counter before and after copying each status, so the counter
+is odd while the status is being written. A reader copies the status out of
+the segment and retries whenever the counter was odd, or changed, meanwhile.
+Half the counter is the number of statuses published so far."""
+import os
+import mmap
+import time
+import struct
+import threading
+from multiprocessing import shared_memory
+from simulators.broadcast import Subscriber
+
+
+header = struct.Struct('QQ')
+
+
+class SharedStatusWriter(Subscriber):
+    """Creates a new shared memory segment and writes every published
+    message into it, in place of the previous one. Messages larger than the
+    segment are dropped, as well as the ones published after the segment
+    was closed, since a system might publish while its server is stopped.
+
+    :param name: the name of the segment
+    :param size: the maximum length of a message, in bytes
+    :type name: str
+    :type size: int"""
+
+    def __init__(self, name, size=65536):
+        super().__init__(name)
+        self.memory = shared_memory.SharedMemory(
+            name,
+            create=True,
+            size=header.size + size
+        )
+        self.size = size
+        self.sequence = 0
+        self.lock = threading.Lock()
+        self.closed = False
+        header.pack_into(self.memory.buf, 0, 0, 0)
+
+    def deliver(self, message):
+        length = len(message)
+        with self.lock:
+            if self.closed or length > self.size:
+                self.dropped += 1
+                return
+            buf = self.memory.buf
+            self.sequence += 1  # Odd, the readers will retry
+            header.pack_into(buf, 0, self.sequence, length)
+            buf[header.size:header.size + length] = message
+            self.sequence += 1
+            header.pack_into(buf, 0, self.sequence, length)
+            self.sent += 1
+
+    def close(self):
+        """Closes and removes the segment, it can be called more than once.
+        The readers that are still attached to it keep reading the last
+        status."""
+        with self.lock:
+            self.closed = True
+            self.memory.close()
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedStatusReader:
+    """Reads the latest status published by a `SharedStatusWriter`. The
+    segment is mapped read only, straight from `/dev/shm`, so the reader
+    can not alter the status and the segment is never registered to the
+    resource tracker of the reader process, which would remove it on exit.
+    It can be used as a context manager, which closes the reader on exit.
+
+    :param name: the name of the segment
+    :type name: str
+    :raise FileNotFoundError: if the segment does not exist"""
+
+    def __init__(self, name):
+        fd = os.open(os.path.join('/dev/shm', name), os.O_RDONLY)
+        try:
+            self.memory = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+
+    def read(self):
+        """Returns the latest status, along with the number of statuses
+        published so far, which tells whether the status changed since the
+        previous read.
+
+        :return: the number of published statuses and the latest status,
+            or None if no status has been published yet
+        :rtype: (int, bytes)"""
+        memory = self.memory
+        while True:
+            sequence, length = header.unpack_from(memory)
+            if sequence % 2:
+                time.sleep(0)  # Let the writer complete the status
+                continue
+            if not sequence:
+                return None
+            status = memory[header.size:header.size + length]
+            if header.unpack_from(memory)[0] == sequence:
+                return sequence // 2, status
+
+    def close(self):
+        """Detaches the reader from the segment."""
+        self.memory.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,14 +1,19 @@
 import datetime
-from socketserver import ThreadingUDPServer
-from threading import current_thread
 from simulators.common import ListeningSystem
+from simulators.server import BatchedUDPServer
 
 
-servers = [(('0.0.0.0', 12600), (), ThreadingUDPServer, {})]
+servers = [(('0.0.0.0', 12600), (), BatchedUDPServer, {})]
 
 
 class System(ListeningSystem):
 
+    # The maximum number of clients whose partial messages are kept
+    max_peers = 256
+
+    # Every connected client gets its own dictionary of partial messages
+    session_state = {'msg': {}}
+
     def __init__(self):
         starting_date = datetime.datetime.now(datetime.timezone.utc)
         self.starting_date = starting_date.strftime('%Y%m%d%H%M%S')
@@ -59,8 +64,11 @@ class System(ListeningSystem):
         del self.msg[t]
 
     def parse(self, byte):
-        t = current_thread().ident
+        # The partial messages are kept apart for each client
+        t = self.peer
         if not self.msg.get(t):
+            if len(self.msg) >= self.max_peers:
+                del self.msg[next(iter(self.msg))]
             self.msg[t] = ''
 
         self.msg[t] += byte
@@ -0,0 +1,145 @@
+"""This module implements the zygote used to start many simulators at once.
+Instead of running a fresh interpreter for each simulator, which would
+import the whole package and its dependencies (`numpy`, `scipy`) all over
+again, the zygote imports every simulator module once, freezes the objects
+it allocated so that the garbage collector never touches them again, and
+then forks a process for each simulator. The forked simulators therefore
+share the memory pages of the zygote, copy-on-write, for as long as they
+only read them."""
+import gc
+import os
+import sys
+import importlib
+import traceback
+import multiprocessing as mp
+from simulators.server import Simulator
+
+
+# Prefix of the process name of the simulators forked by a zygote, followed
+# by the simulator name. The whole process name is truncated by the kernel to
+# `process_name_length` characters.
+process_name_prefix = '@'
+process_name_length = 15
+
+
+def process_name(system_name):
+    """Returns the name a zygote gives to the process of a simulator, as it
+    is shown by `ps -o comm`.
+
+    :param system_name: the name of the simulator
+    :type system_name: str
+    :rtype: str
+
+    >>> process_name('active_surface')
+    '@active_surface'
+    >>> process_name('solar_attenuator')
+    '@solar_attenuat'
+    """
+    return (process_name_prefix + system_name)[:process_name_length]
+
+
+def _set_process_name(name):
+    try:
+        with open('/proc/self/comm', 'w', encoding='utf-8') as f:
+            f.write(name)
+    except OSError:  # skip coverage
+        # Not running on Linux, the process keeps the name of the zygote
+        pass
+
+
+class Zygote:
+    """Starts the given simulators, each one in its own process forked from
+    the current one, after importing all of them.
+
+    :param systems: the names of the simulators to be started
+    :param engine: the serving engine of the simulators, see `Simulator`
+    :param options: the server options of the simulators, see `Server`
+    :param workers: the number of workers of each simulator, see
+        `Simulator`
+    :type systems: list of strings
+    :type engine: string
+    :type options: dict
+    :type workers: int
+    """
+
+    def __init__(
+        self,
+        systems,
+        engine='threading',
+        options=None,
+        workers=None,
+        **kwargs
+    ):
+        self.systems = list(systems)
+        self.engine = engine
+        self.options = options
+        self.workers = workers
+        self.kwargs = kwargs
+        self.modules = {}
+        self.pids = {}
+
+    def preload(self):
+        """Imports the modules of all the simulators, along with their
+        dependencies, then moves every object allocated so far to the
+        permanent generation of the garbage collector. This way the
+        collections run by the forked simulators do not write into the shared
+        pages, which would otherwise get copied into each process."""
+        for name in self.systems:
+            self.modules[name] = importlib.import_module(f'simulators.{name}')
+        gc.collect()
+        gc.freeze()
+
+    def fork(self, name, started):
+        """Forks the process of a single simulator. The forked process runs
+        the simulator until it is stopped, then it exits without returning.
+
+        :param name: the name of the simulator
+        :param started: the event to be set as soon as the simulator is up
+        :type name: str
+        :type started: multiprocessing.Event
+        :return: the identifier of the forked process
+        :rtype: int"""
+        pid = os.fork()
+        if pid:
+            return pid
+        exit_code = 1
+        try:
+            _set_process_name(process_name(name))
+            simulator = Simulator(
+                self.modules[name],
+                self.engine,
+                self.options,
+                self.workers,
+                **self.kwargs
+            )
+            simulator.start(has_started=started)
+            exit_code = 0
+        except Exception:  # skip coverage
+            traceback.print_exc()
+        finally:
+            # Never return into the zygote code
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)  # pylint: disable=protected-access
+        return None  # skip coverage
+
+    def start(self):
+        """Preloads the simulators and forks them, returning as soon as all
+        of them are up and running.
+
+        :return: the identifiers of the running simulator processes, by
+            simulator name. Simulators that exited without starting (i.e.
+            because they are already running) are not included.
+        :rtype: dict"""
+        self.preload()
+        events = {}
+        for name in self.systems:
+            events[name] = mp.get_context('fork').Event()
+            self.pids[name] = self.fork(name, events[name])
+        for name, started in events.items():
+            while not started.wait(0.1):
+                pid, _ = os.waitpid(self.pids[name], os.WNOHANG)
+                if pid:
+                    del self.pids[name]
+                    break
+        return self.pids
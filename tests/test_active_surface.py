@@ -1,5 +1,6 @@
 import unittest
 import time
+from threading import Thread, Event
 from random import randrange
 from simulators.active_surface import command_library, System
 from simulators import utils
@@ -776,6 +777,21 @@ class TestASParse(unittest.TestCase):
     def tearDown(self):
         del self.system
 
+    def test_driver_lock(self):
+        drivers = list(self.system.drivers.values())
+        first, second = drivers[0], drivers[1]
+        self.assertIsNot(first.lock, second.lock)
+        done = Event()
+
+        def move():
+            first.set_absolute_position(1000)
+            done.set()
+        with first.lock:
+            Thread(target=move, daemon=True).start()
+            self.assertFalse(done.wait(0.05))
+            second.set_absolute_position(1000)  # Not blocked
+        self.assertTrue(done.wait(1))
+
     def _send_cmd(self, cmd):
         """This method is useful to send the whole command without repeating
         the `for` loop every test. If an exception is expected this method can
@@ -888,6 +904,40 @@ class TestASParse(unittest.TestCase):
         self.assertFalse(self.system.parse('w'))
         self.assertTrue(self.system.parse('\xFA'))
 
+    def test_parse_bytes(self):
+        """Multiple commands received in a single chunk are answered in the
+        same order they have been sent."""
+        commands = ''
+        expected_responses = []
+        for i in range(self.min_usd_index, self.max_usd_index + 1):
+            command = command_library.get_position(usd_index=i)
+            commands += 'w' + command
+            expected_responses.append(self._send_cmd(command))
+        responses = self.system.parse_bytes(commands.encode('latin-1'))
+        self.assertEqual(responses, expected_responses)
+
+    def test_parse_bytes_split_commands(self):
+        """Commands can be split across different chunks."""
+        command = command_library.set_absolute_position(
+            usd_index=self.min_usd_index,
+            position=1000
+        ).encode('latin-1')
+        responses = []
+        for byte in range(len(command)):
+            responses += self.system.parse_bytes(command[byte:byte + 1])
+        responses += self.system.parse_bytes(command[:4])
+        responses += self.system.parse_bytes(command[4:])
+        self.assertEqual(responses, [byte_ack, byte_ack])
+
+    def test_parse_bytes_wrong_message_length(self):
+        msg = '\xFA\x40\x01\x02\x03'
+        msg += utils.checksum(msg)
+        msg += command_library.get_status(usd_index=self.min_usd_index)
+        responses = self.system.parse_bytes(msg.encode('latin-1'))
+        self.assertEqual(len(responses), 2)
+        self.assertIsInstance(responses[0], ValueError)
+        self.assertTrue(responses[1].startswith(byte_ack))
+
     def test_soft_reset(self):
         """The system returns True for every proper byte, and
         returns the byte_ack when the message is completed."""
@@ -1,6 +1,10 @@
 import unittest
+import sys
 import time
+import json
 import socket
+from queue import Queue
+from threading import Thread
 from datetime import datetime, timedelta, timezone
 from simulators import acu
 from simulators import utils
@@ -65,12 +69,74 @@ class TestACU(unittest.TestCase):
         # Wait for command to start its execution
         time.sleep(0.01)
 
+    def test_command_name(self):
+        for command, name in (
+            (ModeCommand(1, 1), 'mode_command'),
+            (ParameterCommand(2, 11, 10.25, 10.25), 'parameter_command'),
+        ):
+            message = Command(command).get().encode('latin-1')
+            self.assertEqual(self.system.command_name(message), name)
+            self.assertEqual(self.system.command_name(message[16:]), 'binary')
+
+    def test_parse_bytes_messages(self):
+        # The commands get no response, they are completed nonetheless
+        messages = ''.join(Command(ModeCommand(1, 1)).get() for _ in range(3))
+        responses = self.system.parse_bytes(messages.encode('latin-1'))
+        self.assertEqual(responses, [])
+        self.assertEqual(len(responses.messages), 3)
+        for message, outcome in responses.messages:
+            self.assertTrue(outcome)
+            name = self.system.command_name(message.encode('latin-1'))
+            self.assertEqual(name, 'mode_command')
+
+    def test_concurrent_status_writes(self):
+        # Every thread changes its own bit of the same word of the azimuth
+        # status, while the update thread changes and serializes it as well
+        axis = self.system.AZ
+        errors = []
+
+        def toggle(name):
+            for count in range(5000):
+                value = bool(count % 2)
+                setattr(axis, name, value)
+                if getattr(axis, name) != value:
+                    errors.append(name)
+                axis.snapshot()
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [
+                Thread(target=toggle, args=(name,))
+                for name in ('Rate_Mode', 'Safety_Chain', 'Wrong_Sys_State')
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+
     def test_status_message_length(self):
         status = bytes(self.system.status)
         msg_length = utils.bytes_to_uint(status[4:8])
         self.assertEqual(msg_length, 813)
         self.assertEqual(len(status), 813)
 
+    def test_subscribers(self):
+        q = Queue(1)
+        self.system.subscribe(q)
+        self.assertEqual(len(q.get(timeout=1)), 813)
+        response = self.system.subscribers()
+        self.assertTrue(response.startswith('$subscribers:'))
+        self.assertTrue(response.endswith('%%%%%'))
+        counters = json.loads(response[len('$subscribers:'):-len('%%%%%')])
+        self.assertGreater(counters['published'], 0)
+        self.assertEqual(len(counters['subscribers']), 1)
+        self.assertGreater(counters['subscribers'][0]['sent'], 0)
+        self.system.unsubscribe(q)
+
     def test_duplicated_command_counter(self):
         command_string = Command(ModeCommand(1, 1)).get()
         self._send(command_string)
@@ -92,6 +158,40 @@ class TestACU(unittest.TestCase):
     def test_parse_wrong_start_flag(self):
         self.assertFalse(self.system.parse('\x00'))
 
+    def test_parse_bytes_program_track(self):
+        start_time = datetime.now(timezone.utc) + timedelta(seconds=2)
+        pt_command = ProgramTrackCommand(
+            load_mode=1,
+            start_time=utils.mjd(start_time),
+            axis_rates=(0.5, 0.5)
+        )
+        for entry in range(50):
+            pt_command.add_entry(entry * 1000, 180, 89)
+        command = Command(pt_command)
+        command_string = command.get().encode('latin-1')
+
+        # Leading garbage, the message split in two chunks, the same message
+        # sent twice, which raises a duplicated command counter error
+        responses = self.system.parse_bytes(b'\x00' + command_string[:100])
+        responses += self.system.parse_bytes(command_string[100:])
+        self.assertEqual(responses, [])
+        time.sleep(0.01)
+        ps = self.system.PS
+        self.assertEqual(ps.parameter_command_counter, command.get_counter(0))
+        self.assertEqual(ps.parameter_command_answer, 1)
+
+        responses = self.system.parse_bytes(command_string)
+        self.assertEqual(len(responses), 1)
+        self.assertIsInstance(responses[0], ValueError)
+
+    def test_parse_bytes_wrong_end_flag(self):
+        command_string = Command(ModeCommand(1, 1)).get()
+        command_string = command_string[:-1] + '\x00'  # Wrong ending byte
+        command_string += Command(ModeCommand(1, 1)).get()
+        responses = self.system.parse_bytes(command_string.encode('latin-1'))
+        self.assertEqual(len(responses), 1)
+        self.assertIn('Wrong end flag', str(responses[0]))
+
     def test_multiple_command_same_subsystem(self):
         for subsystem in [1, 2]:
             command = Command(
@@ -2254,6 +2354,21 @@ class TestACUSimulator(unittest.TestCase):
         time.sleep(0.5)
         s2.close()
 
+    def test_subscribers_command(self):
+        with socket.create_connection(('127.0.0.1', 13001), timeout=2) as s:
+            address = s.getsockname()
+            s.sendall(b'$subscribers%%%%%')
+            data = b''
+            while b'%%%%%' not in data[data.find(b'$subscribers:'):]:
+                data += s.recv(1024)
+        response = data[data.find(b'$subscribers:'):]
+        response = response[len(b'$subscribers:'):response.find(b'%%%%%')]
+        counters = json.loads(response)
+        addresses = [tuple(c['address']) for c in counters['subscribers']]
+        self.assertIn(address, addresses)
+        for subscriber in counters['subscribers']:
+            self.assertEqual(subscriber['policy'], 'drop-oldest')
+
 
 class TestACUValues(unittest.TestCase):
 
@@ -0,0 +1,144 @@
+import json
+import time
+import socket
+import unittest
+from threading import Thread
+from socketserver import ThreadingTCPServer, BaseRequestHandler
+from simulators.admission import Admission, AdmissionMixIn
+
+
+class AdmittedServer(AdmissionMixIn, ThreadingTCPServer):
+    pass
+
+
+class EchoHandler(BaseRequestHandler):
+
+    max_connections = 2
+    admission = 'reject'
+    accept_queue = 1
+
+    def handle(self):
+        self.request.sendall(b'hello')
+        while True:
+            data = self.request.recv(1024)
+            if not data:
+                break
+            self.request.sendall(data)
+
+
+class TestAdmission(unittest.TestCase):
+
+    def _serve(self, policy, max_connections=2, accept_queue=1):
+        handler = type(
+            'Handler',
+            (EchoHandler,),
+            {
+                'max_connections': max_connections,
+                'admission': policy,
+                'accept_queue': accept_queue,
+            }
+        )
+        server = AdmittedServer(('127.0.0.1', 0), handler)
+        Thread(
+            target=server.serve_forever,
+            args=(0.01,),
+            daemon=True
+        ).start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+        self.addCleanup(stop)
+        return server
+
+    def _connect(self, server):
+        sock = socket.create_connection(server.server_address, timeout=2)
+        self.addCleanup(sock.close)
+        return sock
+
+    def _wait(self, server, **expected):
+        for _ in range(200):
+            counters = server.admission.counters()
+            if all(counters[key] == value for key, value in expected.items()):
+                return counters
+            time.sleep(0.01)
+        self.fail(f'{counters} never matched {expected}')
+
+    def test_wrong_policy(self):
+        with self.assertRaises(ValueError):
+            Admission(None, 1, 'lifo')
+
+    def test_reject(self):
+        server = self._serve('reject')
+        first, second = self._connect(server), self._connect(server)
+        self.assertEqual(first.recv(5), b'hello')
+        self.assertEqual(second.recv(5), b'hello')
+        third = self._connect(server)
+        self.assertEqual(third.recv(5), b'')
+        counters = self._wait(server, rejected=1)
+        self.assertEqual(counters['active'], 2)
+        self.assertEqual(counters['accepted'], 2)
+        self.assertEqual(counters['peak'], 2)
+        self.assertEqual(counters['workers'], 2)
+
+    def test_queue(self):
+        server = self._serve('queue')
+        first, second = self._connect(server), self._connect(server)
+        first.recv(5)
+        second.recv(5)
+        queued = self._connect(server)
+        self._wait(server, waiting=1)
+        rejected = self._connect(server)  # The queue is full
+        self.assertEqual(rejected.recv(5), b'')
+        first.close()
+        self.assertEqual(queued.recv(5), b'hello')
+        counters = self._wait(server, waiting=0, active=2)
+        self.assertEqual(counters['queued'], 1)
+        self.assertEqual(counters['rejected'], 1)
+        self.assertEqual(counters['workers'], 2)  # The worker was reused
+
+    def test_evict_oldest(self):
+        server = self._serve('evict-oldest')
+        first, second = self._connect(server), self._connect(server)
+        first.recv(5)
+        second.recv(5)
+        third = self._connect(server)
+        self.assertEqual(third.recv(5), b'hello')
+        self.assertEqual(first.recv(5), b'')  # Evicted
+        second.sendall(b'still')
+        self.assertEqual(second.recv(5), b'still')
+        counters = self._wait(server, evicted=1, active=2)
+        self.assertEqual(counters['accepted'], 3)
+        self.assertEqual(counters['rejected'], 0)
+
+    def test_closed(self):
+        server = self._serve('queue', max_connections=1)
+        self._connect(server).recv(5)
+        waiting = self._connect(server)
+        self._wait(server, waiting=1)
+        server.admission.close()
+        self.assertEqual(waiting.recv(5), b'')
+        late = self._connect(server)
+        self.assertEqual(late.recv(5), b'')
+
+    def test_to_json(self):
+        admission = Admission(None, 4, 'queue', 8)
+        self.assertEqual(
+            json.loads(admission.to_json()),
+            {
+                'max_connections': 4,
+                'policy': 'queue',
+                'active': 0,
+                'waiting': 0,
+                'workers': 0,
+                'peak': 0,
+                'accepted': 0,
+                'queued': 0,
+                'rejected': 0,
+                'evicted': 0,
+            }
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
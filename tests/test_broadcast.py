@@ -0,0 +1,308 @@
+import socket
+import unittest
+from threading import Thread
+from queue import Queue, Empty
+from simulators.broadcast import (
+    BroadcastHub, Subscriber, QueueSubscriber, StreamSubscriber,
+    SocketSubscriber, DatagramSubscriber, listen_datagrams
+)
+
+
+class TestBroadcastHub(unittest.TestCase):
+
+    def setUp(self):
+        self.hub = BroadcastHub()
+
+    def test_publish_same_object(self):
+        queues = [Queue(1) for _ in range(3)]
+        for q in queues:
+            self.hub.subscribe(q)
+        status = bytearray(b'status')
+        self.hub.publish(status)
+        messages = [q.get_nowait() for q in queues]
+        self.assertEqual(messages[0], b'status')
+        self.assertIsInstance(messages[0], bytes)
+        for message in messages[1:]:
+            self.assertIs(message, messages[0])
+
+    def test_latest(self):
+        self.assertEqual(self.hub.latest, b'')
+        status = bytearray(b'status')
+        self.hub.publish(status)
+        status[:] = b'update'
+        self.assertEqual(self.hub.latest, b'status')
+        self.assertIsInstance(self.hub.latest, bytes)
+
+    def test_publish_drop_oldest(self):
+        q = Queue(1)
+        self.hub.subscribe(q)
+        for index in range(5):
+            self.hub.publish(str(index).encode())
+        self.assertEqual(q.get_nowait(), b'4')
+        counters = self.hub.counters()
+        self.assertEqual(counters['published'], 5)
+        self.assertEqual(counters['subscribers'][0]['sent'], 5)
+        self.assertEqual(counters['subscribers'][0]['dropped'], 4)
+
+    def test_unsubscribe(self):
+        q = Queue(1)
+        self.hub.subscribe(q)
+        self.hub.unsubscribe(q)
+        self.hub.unsubscribe(q)  # Already unsubscribed, nothing happens
+        self.hub.publish(b'status')
+        with self.assertRaises(Empty):
+            q.get_nowait()
+        self.assertEqual(self.hub.counters()['subscribers'], [])
+
+    def test_subscriber_instance_is_not_wrapped(self):
+        q = Queue(1)
+        subscriber = QueueSubscriber(q, ('127.0.0.1', 10000))
+        self.hub.subscribe(subscriber)
+        self.hub.publish(b'status')
+        self.assertEqual(q.get_nowait(), b'status')
+        counters = self.hub.counters()['subscribers'][0]
+        self.assertEqual(counters['address'], ('127.0.0.1', 10000))
+
+
+class TestSubscriber(unittest.TestCase):
+
+    def test_deliver_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            Subscriber().deliver(b'status')
+
+    def test_stream_not_implemented(self):
+        subscriber = StreamSubscriber()
+        with self.assertRaises(NotImplementedError):
+            subscriber.deliver(b'status')
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            StreamSubscriber(policy='unknown')
+
+    def test_queue_interface(self):
+        q = Queue(1)
+        subscriber = QueueSubscriber(q)
+        with self.assertRaises(Empty):
+            subscriber.get_nowait()
+        subscriber.put(b'first')
+        subscriber.put_nowait(b'second')
+        self.assertEqual(q.get_nowait(), b'second')
+
+
+class TestSocketSubscriber(unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        self.client.settimeout(1)
+        self.subscriber = SocketSubscriber(self.server)
+
+    def tearDown(self):
+        self.server.close()
+        self.client.close()
+
+    def _receive(self, length):
+        data = b''
+        while len(data) < length:
+            data += self.client.recv(length - len(data))
+        return data
+
+    def _send_while_receiving(self, data, length):
+        """Calls `SocketSubscriber.send()` while the client reads the given
+        amount of bytes, the data that does not fit into the socket right
+        away is written by the flusher thread."""
+        received = []
+        reader = Thread(target=lambda: received.append(self._receive(length)))
+        reader.start()
+        self.subscriber.send(data)
+        reader.join()
+        return received[0]
+
+    def test_deliver(self):
+        self.subscriber.deliver(b'status')
+        self.assertEqual(self._receive(6), b'status')
+        self.assertEqual(self.subscriber.sent, 1)
+        self.assertEqual(self.subscriber.dropped, 0)
+
+    def test_slow_client(self):
+        """A client that does not read its messages makes the subscriber
+        buffer and then drop them, without blocking the publisher and without
+        ever sending a partial message followed by another one."""
+        messages = [bytes([index]) * 1000 for index in range(100)]
+        for message in messages:
+            self.subscriber.deliver(message)
+        self.assertGreater(self.subscriber.dropped, 0)
+        self.assertEqual(len(self.subscriber.buffer), 1)
+        # Complete the pending and the buffered messages
+        length = 1000 * (100 - self.subscriber.dropped)
+        data = self._send_while_receiving(b'', length)
+        self.assertEqual(self.subscriber.sent + self.subscriber.dropped, 100)
+        for index in range(0, len(data), 1000):
+            message = data[index:index + 1000]
+            self.assertEqual(message, message[:1] * 1000)
+
+    def test_send_after_pending_message(self):
+        message = b'x' * 100000
+        self.subscriber.deliver(message)
+        data = self._send_while_receiving(b'response', 100008)
+        self.assertEqual(data, message + b'response')
+
+    def test_pending_message_completed(self):
+        """The rest of a partially written message is written as soon as
+        the client reads, without waiting for the next message."""
+        message = b'x' * 100000
+        self.subscriber.deliver(message)
+        self.assertTrue(self.subscriber.pending)
+        self.assertEqual(self._receive(100000), message)
+
+    def test_send_does_not_block(self):
+        """A reply to a stalled client is queued, so neither its handler
+        nor the publisher ever wait for the client while holding the lock
+        of the subscriber."""
+        message = b'x' * 100000
+        self.subscriber.deliver(message)
+        self.subscriber.send(b'response')
+        publisher = Thread(target=self.subscriber.deliver, args=(b'status',))
+        publisher.start()
+        publisher.join(1)
+        self.assertFalse(publisher.is_alive())
+        self.assertEqual(self._receive(100014), message + b'responsestatus')
+        self.assertEqual(self.subscriber.sent, 2)
+        self.assertEqual(self.subscriber.dropped, 0)
+
+    def test_drain_and_detach(self):
+        message = b'x' * 100000
+        self.subscriber.deliver(message)
+        self.subscriber.send(b'response')
+        self.assertFalse(self.subscriber.drain(0.01))
+        received = []
+        reader = Thread(
+            target=lambda: received.append(self._receive(100008))
+        )
+        reader.start()
+        self.assertTrue(self.subscriber.drain())
+        reader.join()
+        self.assertEqual(received, [message + b'response'])
+        self.subscriber.detach()
+        self.subscriber.send(b'ignored')
+        self.assertFalse(self.subscriber.waiting())
+
+    def _deliver_all(self, **kwargs):
+        """Delivers 100 messages to a subscriber with the given backpressure
+        options while the client is not reading, then lets the client read
+        everything. It returns the indexes of the received messages."""
+        self.subscriber = SocketSubscriber(self.server, **kwargs)
+        for index in range(100):
+            self.subscriber.deliver(bytes([index]) * 1000)
+        counters = self.subscriber.counters()
+        self.assertEqual(
+            counters['sent'] + counters['dropped'] + counters['buffered'],
+            100
+        )
+        if self.subscriber.closed:
+            return None
+        length = (self.subscriber.sent + len(self.subscriber.buffer)) * 1000
+        data = self._send_while_receiving(b'', length)
+        self.assertEqual(self.subscriber.sent * 1000, len(data))
+        return list(data[::1000])
+
+    def test_drop_oldest(self):
+        received = self._deliver_all(policy='drop-oldest', buffer_size=3)
+        self.assertEqual(received[-3:], [97, 98, 99])
+        self.assertEqual(self.subscriber.late, 3)
+
+    def test_drop_newest(self):
+        received = self._deliver_all(policy='drop-newest', buffer_size=3)
+        self.assertNotIn(99, received)
+        self.assertEqual(received, list(range(len(received))))
+        self.assertEqual(self.subscriber.late, 3)
+
+    def test_coalesce_to_latest(self):
+        received = self._deliver_all(policy='coalesce-to-latest')
+        self.assertEqual(received[-1], 99)
+        self.assertEqual(self.subscriber.late, 1)
+        self.assertGreater(received[-1] - received[-2], 1)
+
+    def test_disconnect(self):
+        received = self._deliver_all(policy='disconnect', max_misses=5)
+        self.assertIsNone(received)
+        self.assertTrue(self.subscriber.closed)
+        self.assertEqual(self.subscriber.counters()['buffered'], 0)
+        # The client receives what was written, then the end of the stream
+        data = self.client.recv(1000)
+        while data:
+            data = self.client.recv(1000)
+
+    def test_disconnect_misses_reset(self):
+        self.subscriber = SocketSubscriber(
+            self.server,
+            policy='disconnect',
+            max_misses=2
+        )
+        for _ in range(10):
+            self.subscriber.deliver(b'status')
+            self.assertEqual(self._receive(6), b'status')
+        self.assertFalse(self.subscriber.closed)
+        self.assertEqual(self.subscriber.misses, 0)
+
+    def test_closed_client(self):
+        self.client.close()
+        self.subscriber.deliver(b'status')
+        self.subscriber.deliver(b'status')
+        self.assertTrue(self.subscriber.closed)
+        self.assertEqual(self.subscriber.dropped, 2)
+
+
+class TestDatagramSubscriber(unittest.TestCase):
+
+    def _listen(self, group):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        try:
+            receiver = listen_datagrams((group, port))
+        except OSError:  # skip coverage
+            self.skipTest(f'Cannot receive the datagrams sent to {group}')
+        receiver.settimeout(2)
+        self.addCleanup(receiver.close)
+        return receiver, (group, port)
+
+    def _publish(self, group):
+        receiver, address = self._listen(group)
+        subscriber = DatagramSubscriber(address)
+        self.addCleanup(subscriber.close)
+        hub = BroadcastHub()
+        hub.subscribe(subscriber)
+        for message in (b'first', b'second', b'third'):
+            hub.publish(message)
+        return receiver, subscriber
+
+    def test_sequence(self):
+        receiver, subscriber = self._publish('127.0.0.1')
+        for sequence, message in enumerate((b'first', b'second', b'third')):
+            self.assertEqual(
+                DatagramSubscriber.unpack(receiver.recv(1024)),
+                (sequence, message)
+            )
+        self.assertEqual(subscriber.counters()['sequence'], 3)
+        self.assertEqual(subscriber.sent, 3)
+
+    def test_multicast(self):
+        receiver, _ = self._publish(DatagramSubscriber.default_group)
+        self.assertEqual(
+            DatagramSubscriber.unpack(receiver.recv(1024)),
+            (0, b'first')
+        )
+
+    def test_lost_messages(self):
+        _, subscriber = self._publish('127.0.0.1')
+        subscriber.close()
+        subscriber.deliver(b'lost')
+        subscriber.deliver(b'lost')
+        # The lost messages leave a gap in the sequence
+        self.assertEqual(subscriber.dropped, 2)
+        self.assertEqual(subscriber.sequence, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
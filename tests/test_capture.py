@@ -0,0 +1,161 @@
+import os
+import time
+import socket
+import tempfile
+import unittest
+from socketserver import ThreadingTCPServer
+from simulators import calmux, capture
+from simulators.server import Server, AsyncTCPServer
+
+
+class TestCaptureLog(unittest.TestCase):
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'test.cap')
+
+    def test_write_and_read(self):
+        log = capture.CaptureLog(self.path, {'system': 'foo'})
+        connection = log.open(('127.0.0.1', 1234))
+        log.write(capture.INPUT, connection, b'?\n')
+        log.write(capture.OUTPUT, connection, memoryview(b'16 0 0\n'))
+        log.close_connection(connection)
+        log.close()
+        log.write(capture.INPUT, connection, b'ignored')
+        header, records = capture.read(self.path)
+        self.assertEqual(header['system'], 'foo')
+        self.assertIn('started', header)
+        self.assertEqual(
+            [(r.kind, r.connection, r.data) for r in records],
+            [
+                (capture.OPEN, 1, b'127.0.0.1:1234'),
+                (capture.INPUT, 1, b'?\n'),
+                (capture.OUTPUT, 1, b'16 0 0\n'),
+                (capture.CLOSE, 1, b''),
+            ]
+        )
+        times = [record.time for record in records]
+        self.assertEqual(times, sorted(times))
+
+    def test_truncated_record(self):
+        log = capture.CaptureLog(self.path)
+        log.write(capture.INPUT, log.open(('127.0.0.1', 1234)), b'?\n')
+        log.close()
+        with open(self.path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        _, records = capture.read(self.path)
+        self.assertEqual(len(records), 1)
+
+    def test_not_a_log(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'foo')
+        with self.assertRaises(ValueError):
+            capture.read(self.path)
+
+
+class TestCapture(unittest.TestCase):
+
+    server_type = ThreadingTCPServer
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def _start(self, **options):
+        server = Server(
+            calmux.System,
+            self.server_type,
+            {},
+            l_address=('127.0.0.1', 0),
+            options=options
+        )
+        server.start()
+        self.addCleanup(server.stop)
+        return server, server.servers[0].server_address[:2]
+
+    def _session(self, address, requests=(b'?\n', b'C 1\n', b'?\n')):
+        with socket.create_connection(address, timeout=2) as sock:
+            for request in requests:
+                sock.sendall(request)
+                sock.recv(1024)
+
+    @staticmethod
+    def _closed(path, timeout=2.0):
+        """Waits for the server to record the end of the connection."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            _, records = capture.read(path)
+            if records and records[-1].kind == capture.CLOSE:
+                break
+            time.sleep(0.01)
+
+    def test_capture(self):
+        server, address = self._start(capture=self.directory)
+        self._session(address)
+        path = os.path.join(self.directory, f'calmux-{address[1]}.cap')
+        self._closed(path)
+        server.stop()
+        header, records = capture.read(path)
+        self.assertEqual(header['system'], 'simulators.calmux')
+        self.assertEqual(header['address'], list(address))
+        self.assertEqual(
+            [(r.kind, r.data) for r in records[1:]],
+            [
+                (capture.INPUT, b'?\n'),
+                (capture.OUTPUT, b'16 0 0\n'),
+                (capture.INPUT, b'C 1\n'),
+                (capture.OUTPUT, b'ack\n'),
+                (capture.INPUT, b'?\n'),
+                (capture.OUTPUT, b'16 0 1\n'),
+                (capture.CLOSE, b''),
+            ]
+        )
+
+    def test_no_capture(self):
+        _, address = self._start()
+        self._session(address)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_replay(self):
+        server, address = self._start(capture=self.directory)
+        self._session(address, (b'?\n', b'C 1\n', b'?\n', b'C 0\n'))
+        server.stop()
+        path = os.path.join(self.directory, f'calmux-{address[1]}.cap')
+        # A fresh simulator answers as the recorded one did
+        _, address = self._start()
+        results = capture.replay(path, address, speed=0)
+        self.assertEqual(results['connections'], 1)
+        self.assertEqual(results['requests'], 4)
+        self.assertEqual(results['bytes_sent'], 12)
+        self.assertEqual(results['bytes_received'], 22)
+        self.assertEqual(results['mismatches'], 0)
+        self.assertEqual(results['timeouts'], 0)
+        self.assertEqual(results['errors'], 0)
+        self.assertEqual(results['latency']['count'], 4)
+        # At ten times the recorded pace, starting from a different state
+        self._session(address, (b'C 1\n',))
+        results = capture.replay(path, address, speed=10)
+        self.assertEqual(results['requests'], 4)
+        self.assertEqual(results['mismatches'], 1)
+
+    def test_replay_not_running(self):
+        server, address = self._start(capture=self.directory)
+        self._session(address)
+        server.stop()
+        path = os.path.join(self.directory, f'calmux-{address[1]}.cap')
+        results = capture.replay(path, speed=0)
+        self.assertEqual(results['errors'], 1)
+        self.assertEqual(results['requests'], 0)
+
+
+class TestAsyncCapture(TestCapture):
+
+    server_type = AsyncTCPServer
+
+
+if __name__ == '__main__':
+    unittest.main()
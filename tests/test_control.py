@@ -0,0 +1,100 @@
+import os
+import socket
+import tempfile
+import unittest
+import subprocess
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest.mock import patch
+from simulators import control
+from simulators.server import Simulator
+
+
+class TestControl(unittest.TestCase):
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = patch.dict(os.environ, {'XDG_RUNTIME_DIR': directory.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.directory = os.path.join(directory.name, 'discos-simulators')
+
+    def start(self, name='calmux', **kwargs):
+        simulator = Simulator(name, **kwargs)
+        with redirect_stdout(StringIO()):
+            simulator.start(daemon=True)
+        self.addCleanup(self.stop, simulator)
+        return simulator
+
+    @staticmethod
+    def stop(simulator):
+        with redirect_stdout(StringIO()):
+            simulator.stop()
+
+    def test_runtime_dir(self):
+        self.assertEqual(control.runtime_dir(), self.directory)
+        with patch.dict(os.environ, {'XDG_RUNTIME_DIR': ''}):
+            self.assertTrue(
+                control.runtime_dir().startswith(tempfile.gettempdir())
+            )
+
+    def test_register(self):
+        self.start()
+        self.assertEqual(control.running(), ['calmux'])
+        with open(control.pid_path('calmux'), encoding='ascii') as f:
+            self.assertEqual(int(f.read()), os.getpid())
+        self.assertTrue(os.path.exists(control.socket_path('calmux')))
+
+    def test_status_and_health(self):
+        self.start()
+        status = control.query('calmux', 'status')
+        self.assertEqual(status['name'], 'calmux')
+        self.assertEqual(status['pid'], os.getpid())
+        self.assertEqual(status['pids'], [os.getpid()])
+        self.assertEqual(status['workers'], 1)
+        self.assertEqual(status['servers'], 1)
+        health = control.query('calmux', 'health')
+        self.assertTrue(health['healthy'])
+        self.assertEqual(health['alive'], 1)
+
+    def test_unknown_command(self):
+        self.start()
+        self.assertIn('error', control.query('calmux', 'foo'))
+
+    def test_stop(self):
+        simulator = self.start()
+        self.assertTrue(control.stop('calmux'))
+        self.assertFalse(simulator.processes[0].is_alive())
+        self.assertEqual(control.running(), [])
+        self.assertFalse(os.path.exists(control.socket_path('calmux')))
+        with self.assertRaises(OSError):
+            socket.create_connection(('127.0.0.1', 12500), timeout=1)
+
+    def test_stop_workers(self):
+        simulator = self.start('lo', workers=2)
+        status = control.query('lo', 'status')
+        self.assertEqual(status['workers'], 2)
+        self.assertEqual(len(status['pids']), 2)
+        self.assertTrue(control.stop('lo'))
+        for process in simulator.processes:
+            self.assertFalse(process.is_alive())
+        self.assertEqual(control.running(), [])
+
+    def test_stop_not_running(self):
+        self.assertFalse(control.stop('calmux'))
+        self.assertEqual(control.running(), [])
+
+    def test_stale_pidfile(self):
+        with subprocess.Popen(['true']) as process:
+            process.wait()
+        os.makedirs(self.directory)
+        with open(control.pid_path('calmux'), 'w', encoding='ascii') as f:
+            f.write(f'{process.pid}\n')
+        self.assertEqual(control.running(), [])
+        self.assertFalse(os.path.exists(control.pid_path('calmux')))
+
+
+if __name__ == '__main__':
+    unittest.main()
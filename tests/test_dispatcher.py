@@ -0,0 +1,111 @@
+import json
+import unittest
+import threading
+from simulators.dispatcher import Dispatcher
+
+
+class TestDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.dispatcher = Dispatcher()
+        self.addCleanup(self.dispatcher.stop)
+
+    def test_call(self):
+        self.assertEqual(self.dispatcher.call(pow, 2, 10), 1024)
+        thread = self.dispatcher.call(threading.current_thread)
+        self.assertIs(thread, self.dispatcher.thread)
+
+    def test_exception(self):
+        with self.assertRaises(ValueError):
+            self.dispatcher.call(int, 'not a number')
+        self.dispatcher.stop()  # The counters are updated after each batch
+        self.assertEqual(self.dispatcher.counters()['errors'], 1)
+
+    def test_nested_call(self):
+        dispatcher = self.dispatcher
+        self.assertEqual(dispatcher.call(dispatcher.call, abs, -1), 1)
+
+    def test_order_and_batches(self):
+        executed = []
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+        self.dispatcher.submit(block)
+        started.wait()
+        futures = [
+            self.dispatcher.submit(executed.append, index)
+            for index in range(100)
+        ]
+        release.set()
+        for future in futures:
+            future.result()
+        self.assertEqual(executed, list(range(100)))
+        self.dispatcher.stop()
+        counters = self.dispatcher.counters()
+        self.assertEqual(counters['calls'], 101)
+        self.assertEqual(counters['max_depth'], 100)
+        self.assertEqual(counters['max_batch'], self.dispatcher.batch_size)
+        self.assertEqual(counters['depth'], 0)
+
+    def test_stop(self):
+        executed = []
+        release = threading.Event()
+        self.dispatcher.submit(release.wait)
+        future = self.dispatcher.submit(executed.append, 1)
+        stopper = threading.Thread(target=self.dispatcher.stop)
+        stopper.start()
+        release.set()
+        stopper.join()
+        self.assertTrue(future.done())
+        self.assertEqual(executed, [1])
+        self.assertFalse(self.dispatcher.thread.is_alive())
+        # The calls made after the dispatcher was stopped are executed
+        # right away
+        self.assertIs(
+            self.dispatcher.call(threading.current_thread),
+            threading.current_thread()
+        )
+
+    def test_stop_while_calling(self):
+        # The calls racing with the stop request are executed either by the
+        # dispatcher or right away, none of them is left waiting
+        results = []
+
+        def client():
+            for index in range(500):
+                results.append(self.dispatcher.call(abs, -index))
+        clients = [
+            threading.Thread(target=client, daemon=True) for _ in range(8)
+        ]
+        for thread in clients:
+            thread.start()
+        self.dispatcher.call(abs, 0)
+        self.dispatcher.stop()
+        for thread in clients:
+            thread.join(timeout=5)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(len(results), 8 * 500)
+        self.assertTrue(self.dispatcher.closed)
+        future = self.dispatcher.submit(abs, -1)
+        self.assertEqual(future.result(timeout=0), 1)
+
+    def test_stop_from_dispatcher(self):
+        self.dispatcher.call(self.dispatcher.stop)
+        self.dispatcher.thread.join(timeout=1)
+        self.assertFalse(self.dispatcher.thread.is_alive())
+
+    def test_to_json(self):
+        self.dispatcher.call(abs, -1)
+        self.dispatcher.stop()
+        counters = json.loads(self.dispatcher.to_json())
+        self.assertEqual(counters['calls'], 1)
+        self.assertEqual(counters['service']['count'], 1)
+        self.assertEqual(counters['waiting']['count'], 1)
+        self.dispatcher.reset()
+        self.assertEqual(self.dispatcher.counters()['calls'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from simulators.framing import CustomFraming
+
+
+class TestCustomFraming(unittest.TestCase):
+
+    def setUp(self):
+        self.framing = CustomFraming()
+
+    def test_no_header(self):
+        self.assertEqual(self.framing.feed(b'#command:a,b%%%%%'), [])
+        self.assertEqual(self.framing.pending, b'')
+
+    def test_commands(self):
+        self.assertEqual(
+            self.framing.feed(b'#cmd%%%%%$stats%%%%%#cmd$impair:drop=1%%%%%'),
+            ['stats', 'impair:drop=1']
+        )
+
+    def test_split_command(self):
+        self.assertEqual(self.framing.feed(b'#cmd$sta'), [])
+        self.assertEqual(self.framing.pending, b'$sta')
+        self.assertEqual(self.framing.feed(memoryview(b'ts%%')), [])
+        self.assertEqual(self.framing.feed(b'%%%$stats%%%%%'), ['stats'] * 2)
+        self.assertEqual(self.framing.pending, b'')
+
+    def test_split(self):
+        self.assertEqual(
+            self.framing.split(b'#a%%%%%$stats%%%%%#b$sta'),
+            [(18, 'stats')]
+        )
+        self.assertEqual(self.framing.split(b'ts%%%%%#c'), [(7, 'stats')])
+        self.assertEqual(self.framing.split(b'#d'), [])
+
+    def test_header_restarts_command(self):
+        self.assertEqual(self.framing.feed(b'$abc$stats%%%%%'), ['stats'])
+        self.assertEqual(self.framing.feed(b'$abc'), [])
+        self.assertEqual(self.framing.feed(b'$error%%%%%'), ['error'])
+
+    def test_binary_frame(self):
+        # A header inside a floating point field, followed by a tail
+        frame = b'\x1a\xcf\xfc\x1d$\x00\x00\x80?%%%%%\xd1\xe3\x2c\x8c'
+        self.assertEqual(self.framing.feed(frame), [])
+        self.assertEqual(self.framing.feed(frame[:5]), [])
+        self.assertEqual(self.framing.pending, b'$')
+        self.assertEqual(self.framing.feed(frame[5:]), [])
+        self.assertEqual(self.framing.pending, b'')
+        self.assertEqual(self.framing.feed(b'$\xff$stats%%%%%'), ['stats'])
+
+    def test_max_length(self):
+        body = b'a' * (CustomFraming.max_length - 5)
+        self.assertEqual(self.framing.feed(b'$' + body + b'%%%%%'), [])
+        self.assertEqual(self.framing.feed(b'$' + body + b'aaaaa'), [])
+        self.assertEqual(self.framing.pending, b'')  # It can not fit anymore
+        self.assertEqual(
+            self.framing.feed(b'$' + body[1:] + b'%%%%%'),
+            [body[1:].decode()]
+        )
+
+    def test_reset(self):
+        self.framing.feed(b'$sta')
+        self.framing.reset()
+        self.assertEqual(self.framing.feed(b'ts%%%%%'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import time
+import unittest
+from threading import Event
+from simulators.impairment import Impairment, Link, Scheduler
+
+
+class TestImpairment(unittest.TestCase):
+
+    def test_parse(self):
+        impairment = Impairment.parse('latency=50, jitter=10,drop=0.1')
+        self.assertEqual(impairment.latency, 50)
+        self.assertEqual(impairment.jitter, 10)
+        self.assertEqual(impairment.drop, 0.1)
+        self.assertEqual(impairment.rto, 200)
+        self.assertTrue(impairment.active)
+
+    def test_parse_enabled(self):
+        impairment = Impairment.parse(True)
+        self.assertFalse(impairment.active)
+        self.assertEqual(impairment.to_dict()['latency'], 0)
+
+    def test_configure(self):
+        impairment = Impairment(latency=50)
+        impairment.configure('bandwidth=1000', 'rto=100')
+        self.assertEqual(impairment.bandwidth, 1000)
+        impairment.configure('off')
+        self.assertFalse(impairment.active)
+        self.assertEqual(impairment.latency, 0)
+        self.assertEqual(impairment.rto, 200)
+        self.assertEqual(
+            impairment.to_json(),
+            '{"latency":0.0,"jitter":0.0,"bandwidth":0.0,"drop":0.0,'
+            + '"reset":0.0,"rto":200.0}'
+        )
+
+    def test_wrong_settings(self):
+        impairment = Impairment(latency=50)
+        for params in (['foo=1'], ['latency'], ['latency=a'], ['drop=2'],
+                       ['latency=10', 'jitter=-1']):
+            with self.assertRaises(ValueError):
+                impairment.configure(*params)
+        self.assertEqual(impairment.latency, 50)
+        self.assertEqual(impairment.jitter, 0)
+
+
+class TestLink(unittest.TestCase):
+
+    def setUp(self):
+        self.written = []
+        self.done = Event()
+
+    def write(self, data, *args):
+        self.written.append((time.perf_counter(), data) + args)
+        if data == b'last':
+            self.done.set()
+
+    def test_not_impaired(self):
+        link = Impairment().link(self.write)
+        link.send(b'foo', 'address')
+        self.assertEqual(self.written[0][1:], (b'foo', 'address'))
+
+    def test_latency(self):
+        link = Impairment(latency=50, jitter=50).link(self.write)
+        start = time.perf_counter()
+        chunks = [str(index).encode() for index in range(50)] + [b'last']
+        for chunk in chunks:
+            link.send(chunk)
+        self.assertEqual(self.written, [])
+        self.assertTrue(self.done.wait(2))
+        # Chunks are never reordered
+        self.assertEqual([data for _, data in self.written], chunks)
+        self.assertGreaterEqual(self.written[-1][0] - start, 0.05)
+
+    def test_bandwidth(self):
+        link = Impairment(bandwidth=1000).link(self.write)
+        start = time.perf_counter()
+        for chunk in (b'x' * 100, b'y' * 100, b'last'):
+            link.send(chunk)
+        self.assertTrue(self.done.wait(2))
+        self.assertGreaterEqual(self.written[1][0] - start, 0.2)
+
+    def test_drop_datagrams(self):
+        link = Impairment(drop=1).link(self.write)
+        link.send(b'foo')
+        self.assertEqual(link.dropped, 1)
+        link.impairment.configure('off')
+        link.send(b'last')
+        self.assertEqual([data for _, data in self.written], [b'last'])
+
+    def test_drop_segments(self):
+        impairment = Impairment(drop=1, rto=100)
+        link = impairment.link(self.write, abort=lambda: None)
+        start = time.perf_counter()
+        link.send(b'last')
+        self.assertTrue(self.done.wait(2))
+        self.assertGreaterEqual(self.written[0][0] - start, 0.1)
+        self.assertEqual(link.dropped, 0)
+
+    def test_reset(self):
+        aborted = []
+        link = Impairment(reset=1).link(self.write, lambda: aborted.append(1))
+        link.send(b'foo')
+        link.impairment.configure('off')
+        link.send(b'bar')
+        self.assertEqual(aborted, [1])
+        self.assertEqual(self.written, [])
+        self.assertTrue(link.closed)
+
+    def test_failed_write(self):
+        def write(data):
+            self.write(data)
+            raise ConnectionResetError
+        link = Link(Impairment(latency=1), write)
+        link.send(b'foo')
+        link.send(b'last')
+        self.assertTrue(self.done.wait(2))
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_call_at(self):
+        scheduler = Scheduler.get()
+        self.assertIs(Scheduler.get(), scheduler)
+        called = []
+        done = Event()
+        now = time.perf_counter()
+        scheduler.call_at(now + 0.02, called.append, 2)
+        scheduler.call_at(now + 0.01, called.append, 1)
+        scheduler.call_at(now + 0.02, called.append, 3)
+        scheduler.call_at(now + 0.03, done.set)
+        self.assertTrue(done.wait(2))
+        self.assertEqual(called, [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
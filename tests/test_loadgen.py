@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest.mock import patch
+from simulators import loadgen, registry
+from simulators.server import Simulator
+
+
+class TestLoadGenerator(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.registry = registry.load()
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = patch.dict(os.environ, {'XDG_RUNTIME_DIR': directory.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start(self, name):
+        simulator = Simulator(name)
+        with redirect_stdout(StringIO()):
+            simulator.start(daemon=True)
+        self.addCleanup(self.stop, simulator)
+
+    @staticmethod
+    def stop(simulator):
+        with redirect_stdout(StringIO()):
+            simulator.stop()
+
+    def test_run(self):
+        self.start('calmux')
+        results = loadgen.run(
+            'calmux', self.registry['calmux'], clients=4, duration=0.3
+        )
+        self.assertEqual(results['system'], 'calmux')
+        self.assertEqual(results['servers'], 1)
+        self.assertGreater(results['requests'], 0)
+        self.assertEqual(results['answers'], results['requests'])
+        self.assertEqual(sum(results['errors'].values()), 0)
+        self.assertEqual(results['error_rate'], 0)
+        self.assertIsNotNone(results['latency']['p99_us'])
+        self.assertGreaterEqual(results['server_cpu']['seconds'], 0)
+
+    def test_run_rate(self):
+        self.start('lo')
+        results = loadgen.run(
+            'lo', self.registry['lo'], clients=2, rate=40, duration=0.5
+        )
+        self.assertEqual(results['servers'], 6)  # generic_LO only
+        self.assertLessEqual(results['requests'], 22)
+        self.assertGreaterEqual(results['requests'], 15)
+        self.assertEqual(results['errors']['protocol'], 0)
+
+    def test_run_not_running(self):
+        results = loadgen.run(
+            'calmux', self.registry['calmux'], clients=1, duration=0.2
+        )
+        self.assertEqual(results['requests'], 0)
+        self.assertIsNone(results['error_rate'])
+        self.assertGreater(results['errors']['connection'], 0)
+        self.assertIsNone(results['server_cpu'])
+
+    def test_unknown_workload(self):
+        with self.assertRaises(ValueError):
+            loadgen.run('weather_station', self.registry['weather_station'])
+
+    def test_no_servers(self):
+        with self.assertRaises(ValueError):
+            loadgen.run('calmux', {'servers': []})
+
+    def test_addresses(self):
+        addresses = loadgen.addresses(self.registry['backend'])
+        self.assertEqual(
+            addresses,
+            [('127.0.0.1', 12801), ('127.0.0.1', 12802)]
+        )
+        addresses = loadgen.addresses(self.registry['backend'], ('mistral',))
+        self.assertEqual(addresses, [('127.0.0.1', 12802)])
+
+    def test_cpu_time(self):
+        self.assertGreater(loadgen.cpu_time([os.getpid()]), 0)
+        self.assertEqual(loadgen.cpu_time([]), 0)
+
+    def test_acu_requests(self):
+        workload = loadgen.workloads['acu']()
+        first, second = workload.request(0), workload.request(1)
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith(b'\x1A\xCF\xFC\x1D'))
+        self.assertTrue(first.endswith(b'\xD1\xCF\xFC\xA1'))
+        self.assertIsNone(workload.reply)
+
+    def test_active_surface_failed(self):
+        workload = loadgen.workloads['active_surface']()
+        self.assertFalse(workload.failed(b'\x06\xfc\x81\x00\x00\x00\x00|'))
+        self.assertTrue(workload.failed(b'\x15\xfc\x81\x00\x00\x00\x00|'))
+
+    def test_run_receiver(self):
+        self.start('receiver')
+        results = loadgen.run(
+            'receiver', self.registry['receiver'], clients=4, duration=0.3
+        )
+        self.assertEqual(results['servers'], 14)
+        self.assertGreater(results['requests'], 0)
+        self.assertEqual(results['answers'], results['requests'])
+        self.assertEqual(sum(results['errors'].values()), 0)
+
+    def test_receiver_failed(self):
+        workload = loadgen.workloads['receiver']()
+        self.assertTrue(workload.request(0).startswith(b'\x01\x7f\x01\x41'))
+        self.assertFalse(workload.failed(b'\x02\x01\x01\x41\x00\x00'))
+        self.assertTrue(workload.failed(b'\x02\x01\x01\x41\x00\x02'))
+
+    def test_backend_failed(self):
+        workload = loadgen.workloads['backend']()
+        self.assertFalse(workload.failed(b'!status,ok,0,ok,0\r\n'))
+        self.assertTrue(workload.failed(b'!status,fail\r\n'))
+        self.assertTrue(workload.failed(b'garbage\r\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import tempfile
+import unittest
+import tracemalloc
+from simulators import memory
+from simulators.common import BaseSystem
+
+
+class TestMemory(unittest.TestCase):
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'memory.jsonl')
+
+    def test_sample(self):
+        measure = memory.sample()
+        self.assertGreater(measure['rss'], 0)
+        self.assertGreater(measure['objects'], 0)
+        self.assertGreater(measure['threads'], 0)
+        self.assertNotIn('traced', measure)
+
+    def test_diff(self):
+        memory.start_tracing()
+        self.addCleanup(memory.stop_tracing)
+        leak = [bytearray(1000) for _ in range(100)]
+        result = memory.diff(limit=5)
+        self.assertLessEqual(len(result['sites']), 5)
+        site = result['sites'][0]
+        self.assertIn('test_memory.py', site['site'])
+        self.assertGreaterEqual(site['size_diff'], 100000)
+        self.assertGreaterEqual(site['count_diff'], 100)
+        self.assertIn('traced', memory.sample())
+        # Each diff is computed against the previous snapshot
+        result = memory.diff()
+        self.assertFalse(any(
+            'test_memory.py' in site['site'] and site['size_diff'] >= 100000
+            for site in result['sites']
+        ))
+        del leak
+
+    def test_diff_not_tracing(self):
+        with self.assertRaises(RuntimeError):
+            memory.diff()
+
+    def test_sampler(self):
+        self.assertTrue(memory.start_sampler(self.path, 0.01))
+        self.assertFalse(memory.start_sampler(self.path))
+        time.sleep(0.1)
+        path, samples = memory.stop_sampler()
+        self.assertEqual(path, self.path)
+        with open(self.path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), samples)
+        self.assertGreater(samples, 1)
+        self.assertIn('rss', lines[0])
+        with self.assertRaises(RuntimeError):
+            memory.stop_sampler()
+
+    def test_invalid_interval(self):
+        with self.assertRaises(ValueError):
+            memory.MemorySampler(self.path, 0)
+
+    def test_custom_commands(self):
+        system = BaseSystem()
+        self.assertEqual(
+            system.memory_snapshot(),
+            '$memory_snapshot:not tracing%%%%%'
+        )
+        self.assertEqual(system.memory_start('2'), '$memory_start%%%%%')
+        self.assertEqual(tracemalloc.get_traceback_limit(), 2)
+        response = system.memory_snapshot('3')
+        self.assertTrue(response.startswith('$memory_snapshot:{'))
+        result = json.loads(response[len('$memory_snapshot:'):-5])
+        self.assertLessEqual(len(result['sites']), 3)
+        self.assertEqual(system.memory_stop(), '$memory_stop%%%%%')
+        self.assertFalse(tracemalloc.is_tracing())
+
+        name = f'simulator-{os.getpid()}-test.jsonl'
+        path = os.path.join(tempfile.gettempdir(), name)
+        self.addCleanup(os.remove, path)
+        self.assertEqual(
+            system.memory_sampler_start(name, '10'),
+            f'$memory_sampler_start:{path}%%%%%'
+        )
+        self.assertEqual(
+            system.memory_sampler_start(),
+            '$memory_sampler_start:already running%%%%%'
+        )
+        self.assertEqual(
+            system.memory_sampler_stop(),
+            f'$memory_sampler_stop:{path},1%%%%%'
+        )
+        self.assertEqual(
+            system.memory_sampler_stop(),
+            '$memory_sampler_stop:not running%%%%%'
+        )
+
+    def test_sampler_command_errors(self):
+        system = BaseSystem()
+        for args in (
+            (self.path,),
+            ('../memory.jsonl',),
+            ('memory.jsonl', '0'),
+            ('memory.jsonl', '-1'),
+            ('memory.jsonl', 'abc'),
+        ):
+            self.assertEqual(
+                system.memory_sampler_start(*args),
+                '$memory_sampler_start:error%%%%%'
+            )
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(
+            system.memory_sampler_stop(),
+            '$memory_sampler_stop:not running%%%%%'
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
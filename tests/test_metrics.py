@@ -0,0 +1,72 @@
+import json
+import unittest
+from simulators.metrics import Histogram, Metrics
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_empty(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertEqual(histogram.summary()['count'], 0)
+        self.assertIsNone(histogram.summary()['p99_us'])
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        for microseconds in range(1, 1001):
+            histogram.record(microseconds / 1e6)
+        for percent in (50, 95, 99):
+            value = histogram.percentile(percent) * 1e6
+            self.assertGreaterEqual(value, percent * 10)
+            self.assertLess(value, percent * 10 * 1.1)
+        self.assertEqual(histogram.percentile(100), 0.001)
+        summary = histogram.summary()
+        self.assertEqual(summary['count'], 1000)
+        self.assertEqual(summary['max_us'], 1000.0)
+        self.assertEqual(summary['mean_us'], 500.5)
+
+    def test_tiny_values(self):
+        histogram = Histogram()
+        histogram.record(0)
+        self.assertEqual(histogram.percentile(50), 0)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_record(self):
+        metrics = Metrics()
+        metrics.record('foo', 0.001, received=10, sent=4)
+        metrics.record('foo', 0.002, errors=1, received=10)
+        metrics.record('bar', 0.001)
+        stats = metrics.to_dict()
+        self.assertEqual(list(stats['commands']), ['bar', 'foo'])
+        self.assertEqual(stats['commands']['foo']['calls'], 2)
+        self.assertEqual(stats['commands']['foo']['errors'], 1)
+        self.assertEqual(stats['bytes_in'], 20)
+        self.assertEqual(stats['bytes_out'], 4)
+        self.assertEqual(json.loads(metrics.to_json()), stats)
+        text = metrics.to_text().splitlines()
+        self.assertEqual(len(text), 3)
+        self.assertTrue(text[0].endswith('in=20B out=4B'))
+        self.assertTrue(text[2].startswith('foo calls=2 errors=1 p50='))
+
+    def test_transfer(self):
+        metrics = Metrics()
+        metrics.transfer(10, 4)
+        metrics.transfer(received=5)
+        stats = metrics.to_dict()
+        self.assertEqual(stats['commands'], {})
+        self.assertEqual(stats['bytes_in'], 15)
+        self.assertEqual(stats['bytes_out'], 4)
+
+    def test_reset(self):
+        metrics = Metrics()
+        metrics.record('foo', 0.001, received=10, sent=4)
+        metrics.reset()
+        stats = metrics.to_dict()
+        self.assertEqual(stats['commands'], {})
+        self.assertEqual(stats['bytes_in'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
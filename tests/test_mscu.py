@@ -316,6 +316,13 @@ class TestMSCU(unittest.TestCase):
                 position = int(round(position))
                 self.assertEqual(position, 0)
 
+    def test_history_lock(self):
+        servos = self.system.servos
+        locks = {id(servo.history.lock) for servo in servos.values()}
+        self.assertEqual(len(locks), len(servos))
+        with servos[0].history.lock:  # The other servos are not blocked
+            self.assertEqual(len(servos[1].history.get()), 1 + servos[1].axes)
+
 
 if __name__ == '__main__':
     unittest.main()
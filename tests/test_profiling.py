@@ -0,0 +1,123 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+from simulators import acu, profiling
+from simulators.profiling import Sampler
+
+
+def busy_function(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSampler(unittest.TestCase):
+
+    def setUp(self):
+        self.stop = threading.Event()
+        self.thread = threading.Thread(
+            target=busy_function,
+            args=(self.stop,),
+            name='busy-42',
+            daemon=True
+        )
+        self.thread.start()
+        self.addCleanup(self.thread.join)
+        self.addCleanup(self.stop.set)
+
+    def test_sample(self):
+        sampler = Sampler()
+        sampler.sample()
+        self.assertEqual(sampler.samples, 1)
+        stacks = [s for s in sampler.stacks if s.startswith('busy;')]
+        self.assertEqual(len(stacks), 1)
+        self.assertIn(';busy_function (test_profiling.py:', stacks[0])
+
+    def test_collapsed_and_summary(self):
+        sampler = Sampler(0.001)
+        sampler.start()
+        time.sleep(0.1)
+        sampler.stop()
+        self.assertGreater(sampler.samples, 0)
+        for line in sampler.collapsed().splitlines():
+            stack, count = line.rsplit(' ', 1)
+            self.assertNotIn('profiler', stack.split(';')[0])
+            self.assertGreater(int(count), 0)
+        summary = sampler.summary().splitlines()
+        self.assertTrue(summary[0].startswith(f'{sampler.samples} samples'))
+        self.assertTrue(any('busy_function' in line for line in summary))
+
+    def test_invalid_interval(self):
+        with self.assertRaises(ValueError):
+            Sampler(0)
+
+
+class TestProfilingSession(unittest.TestCase):
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_start_and_stop(self):
+        self.assertTrue(profiling.start(0.001))
+        self.assertFalse(profiling.start())
+        time.sleep(0.05)
+        path = os.path.join(self.directory, 'profile.folded')
+        self.assertEqual(profiling.stop(path)[0], path)
+        self.assertTrue(os.path.exists(path))
+        with self.assertRaises(RuntimeError):
+            profiling.stop()
+
+    def test_default_path(self):
+        profiling.start()
+        path, _ = profiling.stop()
+        self.addCleanup(os.remove, path)
+        self.assertTrue(path.startswith(tempfile.gettempdir()))
+
+    def test_custom_commands(self):
+        system = acu.System()
+        self.addCleanup(system.system_stop)
+        self.assertEqual(system.profile_start('1'), '$profile_start%%%%%')
+        self.assertEqual(
+            system.profile_start(),
+            '$profile_start:already running%%%%%'
+        )
+        time.sleep(0.1)
+        name = f'simulator-{os.getpid()}-acu.txt'
+        path = os.path.join(tempfile.gettempdir(), name)
+        self.addCleanup(os.remove, path)
+        response = system.profile_stop(name)
+        self.assertTrue(response.startswith(f'$profile_stop:{path},'))
+        with open(path, encoding='utf-8') as f:
+            self.assertIn('_update_loop', f.read())
+        self.assertEqual(
+            system.profile_stop(),
+            '$profile_stop:not running%%%%%'
+        )
+
+    def test_custom_command_errors(self):
+        system = acu.System()
+        self.addCleanup(system.system_stop)
+        for interval in ('0', '-1', 'abc', 'nan', 'inf'):
+            self.assertEqual(
+                system.profile_start(interval),
+                '$profile_start:error%%%%%'
+            )
+        self.assertEqual(system.profile_start(), '$profile_start%%%%%')
+        for name in (f'{self.directory}/acu.txt', '../acu.txt', 'a\\b'):
+            self.assertEqual(
+                system.profile_stop(name),
+                '$profile_stop:error%%%%%'
+            )
+        path = os.path.join(self.directory, 'acu.txt')
+        self.assertFalse(os.path.exists(path))
+        # The session is still running, so it can be stopped
+        profiling.stop(path)
+        self.assertTrue(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
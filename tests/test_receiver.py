@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 from datetime import datetime, timedelta, timezone
 from simulators import utils
 from simulators.receiver import System
@@ -64,6 +65,44 @@ class TestProtocol(unittest.TestCase):
         expected_answer += DEF.CMD_EOT
         self.assertEqual(answer, expected_answer)
 
+    def test_parse_bytes(self):
+        ext_inquiry = DEF.CMD_SOH + '\x01\x01\x41\x00'
+        ext_inquiry += checksum(ext_inquiry) + DEF.CMD_ETX
+        abbr_inquiry = DEF.CMD_SOH + '\x01\x01\x61\x00'
+        ext_set_address = DEF.CMD_SOH + '\x01\x01\x47\x01'
+        ext_set_address += '\x01\x01'  # Same address as before
+        ext_set_address += checksum(ext_set_address) + DEF.CMD_ETX
+        unknown = DEF.CMD_SOH + '\x01\x01\x51\x02'
+        commands = ext_inquiry + abbr_inquiry + DEF.CMD_EOT
+        commands += ext_set_address + unknown + ext_inquiry
+        # The answers carry the time of the last command, it must not change
+        now = datetime.now(timezone.utc)
+        with patch('simulators.receiver.slaves.datetime') as mock_datetime:
+            mock_datetime.now.return_value = now
+            expected_answers = []
+            for byte in commands:
+                answer = self.system.parse(byte)
+                if not isinstance(answer, bool):
+                    expected_answers.append(answer)
+            self.assertEqual(len(expected_answers), 5)
+
+            system = System(slave_type=Slave, max_index=0x1F)
+            answers = system.parse_bytes(commands.encode('latin-1'))
+        self.assertEqual(answers, expected_answers)
+
+    def test_parse_bytes_split_commands(self):
+        command = DEF.CMD_SOH + '\x01\x01\x47\x00'
+        command += '\x01\x01'
+        command += checksum(command) + DEF.CMD_ETX
+        for byte in command[:-1]:
+            self.assertTrue(self.system.parse(byte))
+        expected_answer = self.system.parse(command[-1])
+        command = command.encode('latin-1')
+        for index in range(1, len(command)):
+            self.assertEqual(self.system.parse_bytes(command[:index]), [])
+            answers = self.system.parse_bytes(command[index:])
+            self.assertEqual(answers, [expected_answer])
+
     def test_ext_inquiry(self, slave_index='\x01', expected_data='\x00' * 11):
         command = DEF.CMD_SOH + f'{slave_index}\x01\x41\x00'
         command += checksum(command) + DEF.CMD_ETX
@@ -0,0 +1,71 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+from simulators import registry, utils
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = os.path.join(directory.name, 'registry.json')
+
+    def test_build(self):
+        simulators = registry.build()
+        self.assertEqual(sorted(simulators), utils.list_simulators())
+        self.assertEqual(simulators['calmux'], {
+            'systems': [],
+            'servers': [{
+                'l_address': ['0.0.0.0', 12500],
+                's_address': None,
+                'server_type': 'ThreadingTCPServer',
+                'kwargs': {},
+            }],
+        })
+        self.assertIn('generic_LO', simulators['lo']['systems'])
+        self.assertEqual(len(simulators['active_surface']['servers']), 96)
+
+    def test_load_from_cache(self):
+        simulators = registry.load(cache=self.cache)
+        self.assertTrue(os.path.exists(self.cache))
+        with patch.object(registry, 'build') as build:
+            self.assertEqual(registry.load(cache=self.cache), simulators)
+            build.assert_not_called()
+
+    def test_cache_invalidation(self):
+        registry.load(cache=self.cache)
+        mtime = registry.package_mtime()
+        with patch.object(registry, 'package_mtime', return_value=mtime + 1):
+            with patch.object(registry, 'build', return_value={}) as build:
+                self.assertEqual(registry.load(cache=self.cache), {})
+                build.assert_called_once()
+
+    def test_corrupted_cache(self):
+        with open(self.cache, 'w', encoding='utf-8') as f:
+            f.write('{')
+        simulators = registry.load(cache=self.cache)
+        self.assertIn('acu', simulators)
+        with open(self.cache, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['simulators'], simulators)
+
+    def test_class_arguments(self):
+        simulators = registry.load(cache=self.cache)
+        slave_types = {
+            server['kwargs']['slave_type']
+            for server in simulators['receiver']['servers']
+        }
+        self.assertIn('simulators.receiver.slaves.Dewar', slave_types)
+
+    def test_cache_path(self):
+        with patch.dict(os.environ, {'XDG_CACHE_HOME': '/cache'}):
+            path = registry.cache_path('/some/path')
+        self.assertTrue(path.startswith('/cache/discos-simulators/'))
+        self.assertNotEqual(path, registry.cache_path('/other/path'))
+
+
+if __name__ == '__main__':
+    unittest.main()
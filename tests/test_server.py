@@ -1,17 +1,27 @@
 import sys
 import os
+import json
+import shutil
+import tempfile
 import time
 import socket
 import unittest
 
 from types import ModuleType
+import threading
 from threading import Thread, Event
 from queue import Empty
 from io import StringIO
 from socketserver import ThreadingTCPServer, ThreadingUDPServer
+from unittest.mock import patch
 
-from simulators.server import Server, Simulator
+from simulators.server import (
+    Server, Simulator, AsyncTCPServer, AsyncUDPServer, BatchedUDPServer,
+    ListenHandler, SendHandler
+)
 from simulators.common import ListeningSystem, SendingSystem
+from simulators.broadcast import DatagramSubscriber, listen_datagrams
+from simulators.shared_status import SharedStatusReader
 
 
 STARTING_PORT = 10000
@@ -37,12 +47,14 @@ address_generator = address_generator_function()
 
 class TestListeningServer(unittest.TestCase):
 
+    server_type = ThreadingTCPServer
+
     @classmethod
     def setUpClass(cls):
         cls.address = next(address_generator)
         cls.server = Server(
             ListeningTestSystem,
-            ThreadingTCPServer,
+            cls.server_type,
             kwargs={},
             l_address=cls.address
         )
@@ -67,6 +79,41 @@ class TestListeningServer(unittest.TestCase):
         )
         self.assertEqual(response, b'aabbcc')
 
+    def test_concurrent_clients(self):
+        # Every client splits its commands into small chunks, so that the
+        # chunks of different clients get interleaved by the server
+        greeting = b'This is a greeting message!'
+        commands = 300
+        errors = []
+
+        def client(index):
+            expected = b''
+            received = b''
+            with socket.create_connection(self.address, timeout=5) as sock:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                received_greeting = b''
+                while len(received_greeting) < len(greeting):
+                    received_greeting += sock.recv(1024)
+                for count in range(commands):
+                    param = f'c{index}n{count}'.encode()
+                    msg = b'#command:' + param + b'%%%%%'
+                    for start in range(0, len(msg), 3):
+                        sock.sendall(msg[start:start + 3])
+                    expected += param * 2
+                while len(received) < len(expected):
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        break
+                    received += chunk
+            if received != expected:
+                errors.append(index)
+        clients = [Thread(target=client, args=(i,)) for i in range(8)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        self.assertEqual(errors, [])
+
     def test_wrong_request(self):
         """Wrong request but expected by the protocol"""
         response = get_response(
@@ -120,15 +167,32 @@ class TestListeningServer(unittest.TestCase):
         )
         self.assertRegex(response, b'no_params')
 
+    def test_mixed_commands(self):
+        # The commands sent with a single write are answered in order
+        greeting = b'This is a greeting message!'
+        msg = b'#command:a%%%%%$custom_command:x%%%%%#command:b%%%%%'
+        with socket.create_connection(self.address, timeout=5) as sock:
+            received = b''
+            while not received.endswith(b'bb'):
+                chunk = sock.recv(1024)
+                if not chunk:
+                    break
+                received += chunk
+                if received == greeting:
+                    sock.sendall(msg)
+        self.assertRegex(received[len(greeting):], rb'^aaok_x \(id: \d+\)bb$')
+
 
 class TestListeningUDPServer(unittest.TestCase):
 
+    server_type = ThreadingUDPServer
+
     @classmethod
     def setUpClass(cls):
         cls.address = next(address_generator)
         cls.server = Server(
             ListeningTestSystem,
-            ThreadingUDPServer,
+            cls.server_type,
             kwargs={},
             l_address=cls.address
         )
@@ -180,15 +244,42 @@ class TestListeningUDPServer(unittest.TestCase):
         )
         self.assertRegex(response, b'no_params')
 
+    def test_unix_socket(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        address = next(address_generator)
+        server = Server(
+            ListeningTestSystem,
+            self.server_type,
+            kwargs={},
+            l_address=address,
+            options={'unix_socket': directory}
+        )
+        server.start()
+        self.addCleanup(server.stop)
+        path = os.path.join(directory, f'test_server-{address[1]}.sock')
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            # A client that is not bound to any path gets no answer
+            sock.sendto(b'#command:a%%%%%', path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.bind(os.path.join(directory, 'client'))
+            sock.settimeout(2)
+            sock.sendto(b'#command:a,b%%%%%', path)
+            self.assertEqual(sock.recv(1024), b'aabb')
+        response = get_response(address, msg=b'#command:c%%%%%', udp=True)
+        self.assertEqual(response, b'cc')
+
 
 class TestSendingServer(unittest.TestCase):
 
+    server_type = ThreadingTCPServer
+
     @classmethod
     def setUpClass(cls):
         cls.address = next(address_generator)
         cls.server = Server(
             SendingTestSystem,
-            ThreadingTCPServer,
+            cls.server_type,
             kwargs={},
             s_address=cls.address
         )
@@ -219,12 +310,14 @@ class TestSendingServer(unittest.TestCase):
 
 class TestSendingUDPServer(unittest.TestCase):
 
+    server_type = ThreadingUDPServer
+
     @classmethod
     def setUpClass(cls):
         cls.address = next(address_generator)
         cls.server = Server(
             SendingTestSystem,
-            ThreadingUDPServer,
+            cls.server_type,
             kwargs={},
             s_address=cls.address
         )
@@ -259,15 +352,39 @@ class TestSendingUDPServer(unittest.TestCase):
         )
 
 
+class TestSilentSendingUDPServer(unittest.TestCase):
+
+    def test_stop_while_waiting(self):
+        address = next(address_generator)
+        server = Server(
+            SilentTestSystem,
+            ThreadingUDPServer,
+            kwargs={},
+            s_address=address
+        )
+        server.start()
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sockobj:
+            sockobj.sendto(b'', address)
+            time.sleep(0.1)  # Let the handler wait for a message
+        # Closing the server waits for the handler thread, which has to
+        # notice that the server was stopped
+        stopping = Thread(target=server.stop, daemon=True)
+        stopping.start()
+        stopping.join(2)
+        self.assertFalse(stopping.is_alive())
+
+
 class TestDuplexServer(unittest.TestCase):
 
+    server_type = ThreadingTCPServer
+
     @classmethod
     def setUpClass(cls):
         cls.l_address = next(address_generator)
         cls.s_address = next(address_generator)
         cls.server = Server(
             DuplexTestSystem,
-            ThreadingTCPServer,
+            cls.server_type,
             kwargs={},
             l_address=cls.l_address,
             s_address=cls.s_address
@@ -329,13 +446,15 @@ class TestDuplexServer(unittest.TestCase):
 
 class TestDuplexUDPServer(unittest.TestCase):
 
+    server_type = ThreadingUDPServer
+
     @classmethod
     def setUpClass(cls):
         cls.l_address = next(address_generator)
         cls.s_address = next(address_generator)
         cls.server = Server(
             DuplexTestSystem,
-            ThreadingUDPServer,
+            cls.server_type,
             kwargs={},
             l_address=cls.l_address,
             s_address=cls.s_address
@@ -385,6 +504,107 @@ class TestDuplexUDPServer(unittest.TestCase):
         self.assertEqual(s_response, message[1:].strip(b'%'))
 
 
+class TestAsyncListeningServer(TestListeningServer):
+
+    server_type = AsyncTCPServer
+
+
+class TestAsyncListeningUDPServer(TestListeningUDPServer):
+
+    server_type = AsyncUDPServer
+
+
+class TestBatchedListeningUDPServer(TestListeningUDPServer):
+
+    server_type = BatchedUDPServer
+
+    def test_peers(self):
+        server = self.server.servers[0]
+        system = self.server.system
+        sockets = [
+            socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(3)
+        ]
+        try:
+            with patch.object(server, 'max_peers', 2):
+                for sock in sockets:
+                    sock.settimeout(2)
+                    sock.sendto(b'#command:a%%%%%', self.address)
+                    self.assertEqual(sock.recv(1024), b'aa')
+                    self.assertEqual(system.peer[1], sock.getsockname()[1])
+                self.assertEqual(
+                    [address[1] for address in server.peers],
+                    [sock.getsockname()[1] for sock in sockets[1:]]
+                )
+        finally:
+            for sock in sockets:
+                sock.close()
+
+    def test_batch(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(2)
+            for index in range(200):
+                sock.sendto(f'#command:{index}%%%%%'.encode(), self.address)
+            responses = [sock.recv(1024) for _ in range(200)]
+        self.assertEqual(responses[-1], b'199199')
+
+    def test_sending_server(self):
+        with self.assertRaises(ValueError):
+            Server(
+                SendingTestSystem,
+                self.server_type,
+                kwargs={},
+                s_address=next(address_generator)
+            )
+
+    def test_reuse_port(self):
+        address = next(address_generator)
+        servers = [
+            Server(
+                ListeningTestSystem,
+                self.server_type,
+                kwargs={},
+                l_address=address,
+                options={'reuse_port': 2}
+            )
+            for _ in range(2)
+        ]
+        for server in servers:
+            server.start()
+            self.addCleanup(server.stop)
+        response = get_response(address, msg=b'#command:a%%%%%', udp=True)
+        self.assertEqual(response, b'aa')
+
+    def test_wrong_reuse_port(self):
+        with self.assertRaises(ValueError):
+            Server(
+                ListeningTestSystem,
+                self.server_type,
+                kwargs={},
+                l_address=next(address_generator),
+                options={'reuse_port': 0}
+            )
+
+
+class TestAsyncSendingServer(TestSendingServer):
+
+    server_type = AsyncTCPServer
+
+
+class TestAsyncSendingUDPServer(TestSendingUDPServer):
+
+    server_type = AsyncUDPServer
+
+
+class TestAsyncDuplexServer(TestDuplexServer):
+
+    server_type = AsyncTCPServer
+
+
+class TestAsyncDuplexUDPServer(TestDuplexUDPServer):
+
+    server_type = AsyncUDPServer
+
+
 class TestServerVarious(unittest.TestCase):
 
     def test_server_shutdown(self):
@@ -404,6 +624,91 @@ class TestServerVarious(unittest.TestCase):
         )
         self.assertEqual(response, b'$server_shutdown%%%%%')
 
+    def test_async_server_shutdown(self):
+        address = next(address_generator)
+        server = Server(
+            ListeningTestSystem,
+            AsyncTCPServer,
+            kwargs={},
+            l_address=address,
+        )
+        server.start()
+        response = get_response(
+            address,
+            greet_msg=b'This is a greeting message!',
+            msg=b'$system_stop%%%%%'
+        )
+        self.assertEqual(response, b'$server_shutdown%%%%%')
+        server.main_thread.join(timeout=1)
+        self.assertFalse(server.main_thread.is_alive())
+
+    def test_async_server_no_thread_per_client(self):
+        address = next(address_generator)
+        server = Server(
+            ListeningTestSystem,
+            AsyncTCPServer,
+            kwargs={},
+            l_address=address,
+        )
+        server.start()
+        threads = threading.active_count()
+        clients = []
+        try:
+            for _ in range(20):
+                client = socket.create_connection(address, timeout=2)
+                client.recv(len(b'This is a greeting message!'))
+                clients.append(client)
+            self.assertEqual(threading.active_count(), threads)
+            for client in clients:
+                client.sendall(b'#command:a,b%%%%%')
+                self.assertEqual(client.recv(1024), b'aabb')
+        finally:
+            for client in clients:
+                client.close()
+            server.stop()
+
+    def _serve_while_sleeping(self, system_cls, options):
+        sleeping_address = next(address_generator)
+        address = next(address_generator)
+        servers = [
+            Server(
+                system_cls,
+                AsyncTCPServer,
+                {},
+                l_address=sleeping_address,
+                options=options
+            ),
+            Server(ListeningTestSystem, AsyncTCPServer, {}, l_address=address)
+        ]
+        for server in servers:
+            server.start()
+        greeting = b'This is a greeting message!'
+        try:
+            with socket.create_connection(sleeping_address, timeout=2) as sl, \
+                    socket.create_connection(address, timeout=2) as client:
+                sl.recv(len(greeting))
+                client.recv(len(greeting))
+                sl.sendall(b'#sleep:a%%%%%#command:b%%%%%')
+                time.sleep(0.05)
+                # The other endpoint of the loop is served meanwhile
+                t0 = time.perf_counter()
+                client.sendall(b'#command:c%%%%%')
+                self.assertEqual(client.recv(1024), b'cc')
+                self.assertLess(time.perf_counter() - t0, 0.2)
+                received = b''
+                while len(received) < 4:
+                    received += sl.recv(1024)
+                self.assertEqual(received, b'aabb')
+        finally:
+            for server in servers:
+                server.stop()
+
+    def test_async_server_blocking_system(self):
+        self._serve_while_sleeping(BlockingTestSystem, {})
+
+    def test_async_server_single_writer(self):
+        self._serve_while_sleeping(SlowTestSystem, {'single_writer': True})
+
     def test_server_no_addresses(self):
         with self.assertRaises(ValueError):
             Server(
@@ -441,6 +746,584 @@ class TestServerVarious(unittest.TestCase):
             s2.start()
 
 
+class TestSession(unittest.TestCase):
+
+    def test_interleaved_messages(self):
+        system = ListeningTestSystem()
+        first, second = system.new_session(), system.new_session()
+        self.assertEqual(first.parse_bytes(b'#command:a,'), [])
+        self.assertEqual(second.parse_bytes(b'#command:1'), [])
+        self.assertEqual(system.parse_bytes(b'#comm'), [])
+        self.assertEqual(first.parse_bytes(b'b%%%%%'), ['aabb'])
+        self.assertEqual(second.parse_bytes(b',2%%%%%'), ['1122'])
+        self.assertEqual(system.parse_bytes(b'and:x%%%%%'), ['xx'])
+        self.assertEqual(system.last_cmd, b'command:x')
+
+    def test_session_state(self):
+        system = ListeningTestSystem()
+        system.session_state = {'msg': '', 'extra': []}
+        system.extra = None
+        session = system.new_session()
+        session.parse_bytes(b'#command')
+        self.assertEqual(session.state['msg'], '#command')
+        self.assertEqual(session.state['extra'], [])
+        self.assertEqual(system.msg, '')
+        self.assertIsNone(system.extra)
+        self.assertIs(session.lock, system.new_session().lock)
+
+    def test_missing_attribute(self):
+        system = ListeningTestSystem()
+        system.session_state = {'msg': '', 'extra': 0}
+        session = system.new_session()
+        session.parse_bytes(b'#command')
+        self.assertNotIn('extra', vars(system))
+        self.assertEqual(session.state['extra'], 0)
+
+    def test_call(self):
+        system = ListeningTestSystem()
+        session = system.new_session()
+        self.assertTrue(session.call(session.lock.locked))
+        self.assertEqual(
+            session.call(system.custom_command, 'a'),
+            f'ok_a (id: {id(system)})'
+        )
+
+    def test_shared_session(self):
+        system = ListeningTestSystem()
+        session = system.new_session(shared=True)
+        self.assertEqual(session.state, {})
+        self.assertEqual(session.parse_bytes(b'#comm'), [])
+        self.assertEqual(system.msg, '#comm')
+        self.assertEqual(system.parse_bytes(b'and:x%%%%%'), ['xx'])
+        self.assertIs(session.lock, system.new_session().lock)
+
+
+class TestServerOptions(unittest.TestCase):
+
+    server_type = ThreadingTCPServer
+
+    def _start(self, **options):
+        address = next(address_generator)
+        server = Server(
+            ListeningTestSystem,
+            self.server_type,
+            kwargs={},
+            l_address=address,
+            options=options
+        )
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def _sends(self, msg, **options):
+        """Sends the given message in a single chunk, returning the whole
+        response and the number of writes the server used to send it."""
+        server = self._start(**options)
+        handler = server.servers[0].RequestHandlerClass
+        with patch.object(
+            handler,
+            '_send',
+            autospec=True,
+            side_effect=handler._send  # pylint: disable=protected-access
+        ) as send:
+            with socket.create_connection(server.l_address, timeout=2) as sock:
+                sock.recv(len(b'This is a greeting message!'))
+                send.reset_mock()
+                sock.sendall(msg)
+                response = b''
+                while len(response) < 10:
+                    response += sock.recv(1024)
+        return response, send.call_count
+
+    def test_unknown_option(self):
+        with self.assertRaises(ValueError):
+            self._start(unknown=True)
+
+    def test_options_do_not_leak(self):
+        self._start(tcp_nodelay=False, coalesce_responses=False)
+        self.assertTrue(ListenHandler.tcp_nodelay)
+        self.assertTrue(ListenHandler.coalesce_responses)
+
+    def test_coalesce_responses(self):
+        msg = b'#command:a,b%%%%%#command:c%%%%%#command:d,e%%%%%'
+        response, writes = self._sends(msg)
+        self.assertEqual(response, b'aabbccddee')
+        self.assertEqual(writes, 1)
+
+    def test_do_not_coalesce_responses(self):
+        msg = b'#command:a,b%%%%%#command:c%%%%%#command:d,e%%%%%'
+        response, writes = self._sends(msg, coalesce_responses=False)
+        self.assertEqual(response, b'aabbccddee')
+        self.assertEqual(writes, 3)
+
+    def test_tcp_nodelay(self):
+        for tcp_nodelay in (True, False):
+            address = self._start(tcp_nodelay=tcp_nodelay).l_address
+            with patch.object(
+                ListenHandler,
+                '_set_nodelay',
+                autospec=True,
+                # pylint: disable=protected-access
+                side_effect=ListenHandler._set_nodelay
+            ) as set_nodelay:
+                with socket.create_connection(address, timeout=2) as sock:
+                    sock.recv(len(b'This is a greeting message!'))
+                    client_socket = set_nodelay.call_args[0][1]
+                    value = client_socket.getsockopt(
+                        socket.IPPROTO_TCP,
+                        socket.TCP_NODELAY
+                    )
+                    self.assertEqual(bool(value), tcp_nodelay)
+
+    def test_unknown_backpressure_policy(self):
+        with self.assertRaises(ValueError):
+            self._start(backpressure='unknown')
+
+    def test_backpressure(self):
+        address = next(address_generator)
+        server = Server(
+            SendingTestSystem,
+            self.server_type,
+            kwargs={},
+            s_address=address,
+            options={
+                'backpressure': 'disconnect',
+                'backpressure_buffer': 4,
+                'backpressure_misses': 3,
+            }
+        )
+        server.start()
+        self.addCleanup(server.stop)
+        with patch.object(
+            SendingTestSystem,
+            'subscribe',
+            autospec=True,
+            side_effect=SendingTestSystem.subscribe
+        ) as subscribe:
+            with socket.create_connection(address, timeout=2) as sock:
+                self.assertEqual(sock.recv(1024), b'message')
+                subscriber = subscribe.call_args[0][1]
+        self.assertEqual(subscriber.policy, 'disconnect')
+        self.assertEqual(subscriber.buffer_size, 4)
+        self.assertEqual(subscriber.max_misses, 3)
+        self.assertEqual(SendHandler.backpressure, 'drop-oldest')
+
+    def _query(self, address, *messages):
+        """Sends each message and waits for its answer, returning the last
+        one."""
+        with socket.create_connection(address, timeout=2) as sock:
+            sock.recv(len(b'This is a greeting message!'))
+            for msg in messages:
+                sock.sendall(msg)
+                response = sock.recv(4096)
+        return response
+
+    def test_stats(self):
+        address = self._start(stats=True).l_address
+        response = self._query(
+            address,
+            b'#command:a,b%%%%%',
+            b'#command:c%%%%%',
+            b'#wrong_command:%%%%%',
+            b'$custom_command%%%%%',
+            b'$stats%%%%%'
+        )
+        self.assertTrue(response.startswith(b'$stats:'))
+        stats = json.loads(response[len(b'$stats:'):-len(b'%%%%%')])
+        self.assertEqual(stats['commands']['command']['calls'], 2)
+        self.assertEqual(stats['commands']['command']['errors'], 0)
+        self.assertEqual(stats['commands']['wrong_command']['calls'], 1)
+        self.assertEqual(stats['commands']['$custom_command']['calls'], 1)
+        self.assertEqual(stats['bytes_in'], 83)
+        self.assertEqual(stats['bytes_out'], 30)
+        self.assertIsNotNone(stats['commands']['command']['p99_us'])
+
+        # The error gets no answer, the statistics are in the same chunk
+        response = self._query(address, b'#valueerror:%%%%%$stats:text%%%%%')
+        self.assertIn(b'valueerror calls=1 errors=1', response)
+
+        response = self._query(
+            address,
+            b'$stats_reset%%%%%',
+            b'$stats%%%%%'
+        )
+        stats = json.loads(response[len(b'$stats:'):-len(b'%%%%%')])
+        self.assertEqual(stats['commands'], {})
+
+    def test_stats_messages(self):
+        # Every message is accounted on its own, even when it is pipelined
+        # with other ones or when it gets no response
+        address = self._start(stats=True).l_address
+        response = self._query(
+            address,
+            b'#command:a%%%%%#silent:%%%%%#comm',
+            b'and:b%%%%%#silent:%%%%%',
+            b'#silent:%%%%%$stats%%%%%'
+        )
+        stats = json.loads(response[len(b'$stats:'):-len(b'%%%%%')])
+        self.assertEqual(stats['commands']['command']['calls'], 2)
+        self.assertEqual(stats['commands']['silent']['calls'], 3)
+        self.assertEqual(stats['commands']['silent']['errors'], 0)
+        self.assertEqual(stats['bytes_in'], 80)
+        self.assertEqual(stats['bytes_out'], 4)
+
+    def test_builtin_command_error(self):
+        address = self._start(stats=True).l_address
+        response = self._query(
+            address,
+            b'$stats_reset:x%%%%%',
+        )
+        self.assertEqual(response, b'$stats_reset:error%%%%%')
+        # The client is still connected after the error
+        response = self._query(
+            address,
+            b'$stats:json,x%%%%%',
+            b'#command:a%%%%%'
+        )
+        self.assertEqual(response, b'aa')
+
+    def test_stats_disabled(self):
+        address = self._start().l_address
+        response = self._query(
+            address,
+            b'#command:a%%%%%',
+            b'$stats%%%%%'
+        )
+        self.assertEqual(response, b'$stats:{"enabled":false}%%%%%')
+        response = self._query(address, b'$stats_reset%%%%%')
+        self.assertEqual(response, b'$stats_reset%%%%%')
+
+    def test_impairment(self):
+        address = self._start(impairment='latency=100').l_address
+        # The server might greet the client before `connect` returns
+        start = time.perf_counter()
+        with socket.create_connection(address, timeout=2) as sock:
+            sock.recv(len(b'This is a greeting message!'))
+            self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+            sock.sendall(b'$impair:off%%%%%')
+            response = sock.recv(4096)
+            settings = json.loads(response[len(b'$impair:'):-len(b'%%%%%')])
+            self.assertEqual(settings['latency'], 0)
+            start = time.perf_counter()
+            sock.sendall(b'#command:a%%%%%')
+            self.assertEqual(sock.recv(1024), b'aa')
+            self.assertLess(time.perf_counter() - start, 0.1)
+            # Wrong settings are ignored
+            sock.sendall(b'$impair:latency=foo%%%%%')
+            self.assertEqual(sock.recv(4096), response)
+
+    def test_impairment_reset(self):
+        address = self._start(impairment=True).l_address
+        with socket.create_connection(address, timeout=2) as sock:
+            sock.recv(len(b'This is a greeting message!'))
+            sock.sendall(b'$impair:reset=1%%%%%')
+            with self.assertRaises(ConnectionResetError):
+                sock.recv(1024)
+
+    def test_impairment_sending(self):
+        address = next(address_generator)
+        server = Server(
+            SendingTestSystem,
+            self.server_type,
+            kwargs={},
+            s_address=address,
+            options={'impairment': 'latency=100'}
+        )
+        server.start()
+        self.addCleanup(server.stop)
+        with socket.create_connection(address, timeout=2) as sock:
+            start = time.perf_counter()
+            self.assertEqual(sock.recv(1024), b'message')
+            self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+            sock.sendall(b'$impair:reset=1%%%%%')
+            self.assertTrue(sock.recv(1024).startswith(b'$impair:'))
+            with self.assertRaises(ConnectionResetError):
+                while sock.recv(1024):
+                    pass
+
+    def test_impairment_stalled_client(self):
+        # A client that does not read its responses does not delay the
+        # delivery to the other clients of the emulated network
+        address = self._start(impairment='latency=1').l_address
+        greeting = b'This is a greeting message!'
+        set_nodelay = ListenHandler._set_nodelay  # pylint: disable=W0212
+
+        def _set_nodelay(handler, sock):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+            set_nodelay(handler, sock)
+        with patch.object(ListenHandler, '_set_nodelay', _set_nodelay), \
+                socket.socket() as stalled:
+            stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            stalled.settimeout(2)
+            stalled.connect(address)
+            self.assertEqual(stalled.recv(len(greeting)), greeting)
+            stalled.sendall((b'#command:' + b'x' * 200 + b'%%%%%') * 500)
+            time.sleep(0.5)
+            start = time.perf_counter()
+            with socket.create_connection(address, timeout=2) as sock:
+                self.assertEqual(sock.recv(len(greeting)), greeting)
+                sock.sendall(b'#command:a%%%%%')
+                self.assertEqual(sock.recv(1024), b'aa')
+            self.assertLess(time.perf_counter() - start, 1)
+
+    def test_impairment_disabled(self):
+        address = self._start().l_address
+        response = self._query(address, b'$impair:latency=100%%%%%')
+        self.assertEqual(response, b'$impair:{"enabled":false}%%%%%')
+
+    def test_wrong_impairment(self):
+        with self.assertRaises(ValueError):
+            self._start(impairment='latency=-1')
+
+    def _unix_socket(self, server):
+        directory = server.options['unix_socket']
+        port = (server.l_address or server.s_address)[1]
+        return os.path.join(directory, f'test_server-{port}.sock')
+
+    def test_unix_socket(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        server = self._start(unix_socket=directory)
+        path = self._unix_socket(server)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(2)
+            sock.connect(path)
+            self.assertEqual(
+                sock.recv(len(b'This is a greeting message!')),
+                b'This is a greeting message!'
+            )
+            sock.sendall(b'#command:a,b%%%%%')
+            self.assertEqual(sock.recv(1024), b'aabb')
+        response = self._query(server.l_address, b'#command:c%%%%%')
+        self.assertEqual(response, b'cc')
+        server.stop()
+        self.assertFalse(os.path.exists(path))
+
+    def test_unix_socket_sending(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        server = Server(
+            SendingTestSystem,
+            self.server_type,
+            kwargs={},
+            s_address=next(address_generator),
+            options={'unix_socket': directory}
+        )
+        server.start()
+        self.addCleanup(server.stop)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(2)
+            sock.connect(self._unix_socket(server))
+            self.assertEqual(sock.recv(1024), b'message')
+
+    def test_multicast(self):
+        address = next(address_generator)
+        receiver = listen_datagrams(('127.0.0.1', address[1]))
+        self.addCleanup(receiver.close)
+        receiver.settimeout(2)
+        server = Server(
+            SendingTestSystem,
+            self.server_type,
+            kwargs={},
+            s_address=address,
+            options={'multicast': '127.0.0.1'}
+        )
+        server.start()
+        self.addCleanup(server.stop)
+        sequence, message = DatagramSubscriber.unpack(receiver.recv(1024))
+        self.assertEqual(message, b'message')
+        sequence_next, _ = DatagramSubscriber.unpack(receiver.recv(1024))
+        self.assertEqual(sequence_next, sequence + 1)
+        self.assertEqual(
+            server.publishers[0].address,
+            ('127.0.0.1', address[1])
+        )
+
+    def test_wrong_multicast(self):
+        with self.assertRaises(ValueError):
+            self._start(multicast=True)  # Not a sending server
+        for multicast in ('239.255.0', '239.255.0.1:port', '239.255.0.1:-1'):
+            with self.assertRaises(ValueError):
+                Server(
+                    SendingTestSystem,
+                    self.server_type,
+                    kwargs={},
+                    s_address=next(address_generator),
+                    options={'multicast': multicast}
+                )
+
+    def test_shared_memory(self):
+        address = next(address_generator)
+        server = Server(
+            SendingTestSystem,
+            self.server_type,
+            kwargs={},
+            s_address=address,
+            options={'shared_memory': True}
+        )
+        server.start()
+        self.addCleanup(server.stop)
+        name = f'discos-test_server-{address[1]}'
+        with SharedStatusReader(name) as reader:
+            status = reader.read()
+            while status is None:
+                time.sleep(0.01)
+                status = reader.read()
+            self.assertEqual(status[1], b'message')
+        server.stop()
+        self.assertFalse(os.path.exists(f'/dev/shm/{name}'))
+        with self.assertRaises(ValueError):
+            self._start(shared_memory=True)  # Not a sending server
+
+    def _connections(self, sock):
+        sock.sendall(b'$connections%%%%%')
+        response = b''
+        while not response.endswith(b'%%%%%'):
+            response += sock.recv(1024)
+        return json.loads(response[len(b'$connections:'):-5])
+
+    def test_max_connections(self):
+        server = self._start(max_connections=1)
+        greeting = b'This is a greeting message!'
+        with socket.create_connection(server.l_address, timeout=2) as sock:
+            self.assertEqual(sock.recv(len(greeting)), greeting)
+            with socket.create_connection(server.l_address, timeout=2) as s:
+                self.assertEqual(s.recv(1024), b'')  # Rejected
+            counters = self._connections(sock)
+        self.assertEqual(counters['max_connections'], 1)
+        self.assertEqual(counters['policy'], 'reject')
+        self.assertEqual(counters['active'], 1)
+        self.assertEqual(counters['rejected'], 1)
+
+    def test_connections_disabled(self):
+        server = self._start()
+        greeting = b'This is a greeting message!'
+        with socket.create_connection(server.l_address, timeout=2) as sock:
+            sock.recv(len(greeting))
+            self.assertEqual(self._connections(sock), {'enabled': False})
+
+    def test_single_writer(self):
+        server = self._start(single_writer=True)
+        threads = []
+        system = server.system
+        parse_bytes = system.parse_bytes
+
+        def _parse_bytes(data):
+            threads.append(threading.current_thread())
+            return parse_bytes(data)
+        system.parse_bytes = _parse_bytes
+        greeting = b'This is a greeting message!'
+        with socket.create_connection(server.l_address, timeout=2) as sock:
+            sock.recv(len(greeting))
+            sock.sendall(b'#command:a,b%%%%%')
+            self.assertEqual(sock.recv(1024), b'aabb')
+            sock.sendall(b'$dispatcher%%%%%')
+            response = b''
+            while not response.endswith(b'%%%%%'):
+                response += sock.recv(1024)
+        self.assertEqual(set(threads), {server.dispatcher.thread})
+        counters = json.loads(response[len(b'$dispatcher:'):-5])
+        self.assertGreaterEqual(counters['calls'], 1)
+        self.assertEqual(counters['errors'], 0)
+        server.stop()
+        self.assertFalse(server.dispatcher.thread.is_alive())
+
+    def test_single_writer_system_stop(self):
+        server = self._start(single_writer=True)
+        response = get_response(
+            server.l_address,
+            greet_msg=b'This is a greeting message!',
+            msg=b'$system_stop%%%%%'
+        )
+        self.assertEqual(response, b'$server_shutdown%%%%%')
+        server.dispatcher.thread.join(timeout=1)
+        self.assertFalse(server.dispatcher.thread.is_alive())
+
+    def test_dispatcher_disabled(self):
+        server = self._start()
+        response = get_response(
+            server.l_address,
+            greet_msg=b'This is a greeting message!',
+            msg=b'$dispatcher%%%%%'
+        )
+        self.assertEqual(response, b'$dispatcher:{"enabled":false}%%%%%')
+
+    def test_wrong_admission(self):
+        for options in (
+                {'max_connections': -1},
+                {'max_connections': 1.5},
+                {'accept_queue': 'none'},
+                {'max_connections': 1, 'admission': 'lifo'}):
+            with self.assertRaises(ValueError):
+                self._start(**options)
+
+    def test_admin_port(self):
+        admin_address = next(address_generator)
+        server = self._start(stats=True, admin_port=admin_address[1])
+        # The custom commands of the clients of the system are ignored
+        response = self._query(server.l_address, b'#command:a%%%%%$stats%%%%%')
+        self.assertEqual(response, b'aa')
+        with socket.create_connection(admin_address, timeout=2) as sock:
+            sock.sendall(b'#command:b%%%%%$st')
+            sock.sendall(b'ats%%%%%')
+            response = b''
+            while not response.endswith(b'%%%%%'):
+                response += sock.recv(4096)
+            stats = json.loads(response[len(b'$stats:'):-5])
+            for _ in range(100):
+                # The command is accounted right after it is answered
+                if 'command' in stats['commands']:
+                    break
+                time.sleep(0.01)
+                sock.sendall(b'$stats%%%%%')
+                response = b''
+                while not response.endswith(b'%%%%%'):
+                    response += sock.recv(4096)
+                stats = json.loads(response[len(b'$stats:'):-5])
+            self.assertEqual(stats['commands']['command']['calls'], 1)
+            sock.sendall(b'$system_stop%%%%%')
+            self.assertEqual(sock.recv(1024), b'$server_shutdown%%%%%')
+        for _ in range(100):
+            try:
+                socket.create_connection(server.l_address, timeout=1).close()
+            except OSError:
+                break
+            time.sleep(0.01)
+        else:
+            self.fail('the listening server was not stopped')
+
+    def test_wrong_admin_port(self):
+        for admin_port in (0, 65536, 'admin', True):
+            with self.assertRaises(ValueError):
+                self._start(admin_port=admin_port)
+
+    def test_unix_socket_runtime_directory(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with patch.dict(os.environ, {'XDG_RUNTIME_DIR': directory}):
+            server = self._start(unix_socket=True)
+        path = os.path.join(
+            directory,
+            'discos-simulators',
+            f'test_server-{server.l_address[1]}.sock'
+        )
+        self.assertTrue(os.path.exists(path))
+
+
+class TestAsyncServerOptions(TestServerOptions):
+
+    server_type = AsyncTCPServer
+
+    def test_max_connections(self):
+        # The event loop does not spawn a thread per connection, so the
+        # admission control is not needed
+        server = self._start(max_connections=1)
+        greeting = b'This is a greeting message!'
+        with socket.create_connection(server.l_address, timeout=2) as sock:
+            sock.recv(len(greeting))
+            self.assertEqual(self._connections(sock), {'enabled': False})
+
+
 class TestSimulator(unittest.TestCase):
 
     @classmethod
@@ -549,6 +1432,22 @@ class TestSimulator(unittest.TestCase):
 
         simulator.stop()
 
+    def test_stop_admin_port(self):
+        l_addr = next(address_generator)
+        admin_address = next(address_generator)
+        self.mymodule.servers = [(l_addr, (), ThreadingTCPServer, {})]
+        self.mymodule.System = ListeningTestSystem
+        simulator = Simulator(
+            self.mymodule,
+            options={'admin_port': admin_address[1]}
+        )
+        simulator.start(daemon=True)
+        # The simulator can not be reached through the control plane
+        with patch('simulators.control.stop', return_value=False):
+            simulator.stop()
+        with self.assertRaises(OSError):
+            socket.create_connection(l_addr, timeout=1).close()
+
     def test_stop_without_start(self):
         address = next(address_generator)
         self.mymodule.servers = [((), address, ThreadingUDPServer, {})]
@@ -582,6 +1481,108 @@ class TestSimulator(unittest.TestCase):
         simulator.start(has_started=e)
         t.join()
 
+    def test_start_and_stop_asyncio(self):
+        l_addr = next(address_generator)
+        s_addr = next(address_generator)
+        self.mymodule.servers = [
+            (l_addr, s_addr, ThreadingTCPServer, {}),
+            (next(address_generator), (), ThreadingTCPServer, {}),
+        ]
+        self.mymodule.System = DuplexTestSystem
+
+        simulator = Simulator(self.mymodule, engine='asyncio')
+        simulator.start(daemon=True)
+        # All the servers are hosted by the current process
+        self.assertEqual(len(simulator.processes), 1)
+
+        l_response = get_response(
+            l_addr,
+            greet_msg=b'This is a greeting message!',
+            msg=b'#command:a,b,c%%%%%'
+        )
+        self.assertEqual(l_response, b'aabbcc')
+        s_response = get_response(s_addr)
+        self.assertEqual(s_response, b'command:a,b,c')
+
+        simulator.stop()
+        self.assertFalse(simulator.processes[0].is_alive())
+
+    def test_start_and_stop_workers(self):
+        addresses = [next(address_generator) for _ in range(5)]
+        self.mymodule.servers = [
+            (address, (), ThreadingTCPServer, {}) for address in addresses
+        ]
+        self.mymodule.System = ListeningTestSystem
+
+        simulator = Simulator(self.mymodule, workers=2)
+        simulator.start(daemon=True)
+        self.assertEqual(len(simulator.processes), 2)
+
+        for address in addresses:
+            response = get_response(
+                address,
+                greet_msg=b'This is a greeting message!',
+                msg=b'#command:a,b,c%%%%%'
+            )
+            self.assertEqual(response, b'aabbcc')
+
+        simulator.stop()
+        for process in simulator.processes:
+            self.assertFalse(process.is_alive())
+
+    def test_reuse_port(self):
+        address = next(address_generator)
+        self.mymodule.servers = [(address, (), BatchedUDPServer, {})]
+        self.mymodule.System = ListeningTestSystem
+
+        simulator = Simulator(self.mymodule, options={'reuse_port': 3})
+        with patch('sys.stdout', new=StringIO()):
+            simulator.start(daemon=True)
+        self.assertEqual(len(simulator.processes), 3)
+        for _ in range(10):
+            response = get_response(address, msg=b'#command:a%%%%%', udp=True)
+            self.assertEqual(response, b'aa')
+        with patch('sys.stdout', new=StringIO()):
+            simulator.stop()
+        for process in simulator.processes:
+            self.assertFalse(process.is_alive())
+
+    def test_more_workers_than_servers(self):
+        address = next(address_generator)
+        self.mymodule.servers = [(address, (), ThreadingTCPServer, {})]
+        self.mymodule.System = ListeningTestSystem
+
+        simulator = Simulator(self.mymodule, workers=4)
+        simulator.start(daemon=True)
+        self.assertEqual(len(simulator.processes), 1)
+        simulator.stop()
+
+    def test_invalid_workers(self):
+        self.mymodule.servers = [
+            (next(address_generator), (), ThreadingTCPServer, {})
+        ]
+        self.mymodule.System = ListeningTestSystem
+        for workers in (0, -1, 1.5):
+            with self.assertRaises(ValueError):
+                Simulator(self.mymodule, workers=workers)
+
+    def test_unknown_engine(self):
+        self.mymodule.servers = [
+            (next(address_generator), (), ThreadingTCPServer, {})
+        ]
+        self.mymodule.System = ListeningTestSystem
+        with self.assertRaises(ValueError):
+            Simulator(self.mymodule, engine='foo')
+
+    def test_unknown_server_option(self):
+        self.mymodule.servers = [
+            (next(address_generator), (), ThreadingTCPServer, {})
+        ]
+        self.mymodule.System = ListeningTestSystem
+        simulator = Simulator(self.mymodule, options={'foo': True})
+        with self.assertRaises(ValueError):
+            simulator.start(daemon=True)
+
     def test_start_simulator_twice(self):
         try:
             address = next(address_generator)
@@ -692,6 +1693,8 @@ class ListeningTestSystem(ListeningSystem):
                     raise AttributeError('unexpected exception')
                 elif name == 'unexpected_response':
                     return 0.0  # Nor boolean or str
+                elif name == 'silent':
+                    return True  # Completed, without any response
                 params = params_str.split(',')
                 response = ''
                 for param in params:
@@ -702,6 +1705,10 @@ class ListeningTestSystem(ListeningSystem):
         else:
             return False
 
+    @staticmethod
+    def command_name(data):
+        return bytes(data).decode('latin-1').lstrip('#').partition(':')[0]
+
     def custom_command(self, *params):
         params_str = ''.join(list(params))
         msg = 'ok_' + params_str if params else 'no_params'
@@ -712,6 +1719,21 @@ class ListeningTestSystem(ListeningSystem):
         return 'This is a greeting message!'
 
 
+class BlockingTestSystem(ListeningTestSystem):
+
+    blocking = True
+
+    def parse_bytes(self, data):
+        if b'sleep' in data:
+            time.sleep(0.5)
+        return super().parse_bytes(data)
+
+
+class SlowTestSystem(BlockingTestSystem):
+
+    blocking = False
+
+
 class SendingTestSystem(SendingSystem):
 
     def __init__(self, **kwargs):  # pylint: disable=unused-argument
@@ -752,6 +1774,21 @@ class SendingTestSystem(SendingSystem):
         raise Exception('raised by sendingtestsystem')
 
 
+class SilentTestSystem(SendingSystem):
+    """A sending system that never publishes any message."""
+
+    sampling_time = 0.01
+
+    def __init__(self, **kwargs):  # pylint: disable=unused-argument
+        self.subscribers = []
+
+    def subscribe(self, q):
+        self.subscribers.append(q)
+
+    def unsubscribe(self, q):
+        self.subscribers.remove(q)
+
+
 class DuplexTestSystem(ListeningTestSystem, SendingTestSystem):
 
     def __init__(self, **kwargs):
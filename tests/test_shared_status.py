@@ -0,0 +1,71 @@
+import os
+import unittest
+from threading import Thread, Event
+from simulators.broadcast import BroadcastHub
+from simulators.shared_status import SharedStatusWriter, SharedStatusReader
+
+
+class TestSharedStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.name = f'discos-test-{os.getpid()}'
+        self.writer = SharedStatusWriter(self.name, size=16)
+        self.addCleanup(self.writer.close)
+        self.reader = SharedStatusReader(self.name)
+        self.addCleanup(self.reader.close)
+
+    def test_nothing_published(self):
+        self.assertIsNone(self.reader.read())
+
+    def test_latest_status(self):
+        hub = BroadcastHub()
+        hub.subscribe(self.writer)
+        hub.publish(b'first')
+        self.assertEqual(self.reader.read(), (1, b'first'))
+        hub.publish(b'second status')
+        hub.publish(b'third')
+        self.assertEqual(self.reader.read(), (3, b'third'))
+        self.assertEqual(self.writer.sent, 3)
+
+    def test_too_large(self):
+        self.writer.deliver(b'x' * 17)
+        self.assertIsNone(self.reader.read())
+        self.assertEqual(self.writer.dropped, 1)
+
+    def test_closed(self):
+        self.writer.close()
+        self.writer.deliver(b'status')
+        self.assertEqual(self.writer.dropped, 1)
+        self.assertEqual(self.writer.sent, 0)
+
+    def test_no_torn_reads(self):
+        stop = Event()
+
+        def write():
+            while not stop.is_set():
+                for status in (b'a' * 16, b'b' * 8):
+                    self.writer.deliver(status)
+        writer = Thread(target=write)
+        writer.start()
+        try:
+            for _ in range(20000):
+                status = self.reader.read()
+                if status is not None:
+                    self.assertIn(status[1], (b'a' * 16, b'b' * 8))
+        finally:
+            stop.set()
+            writer.join()
+
+    def test_missing_segment(self):
+        with self.assertRaises(FileNotFoundError):
+            SharedStatusReader(f'{self.name}-missing')
+
+    def test_removed_on_close(self):
+        with SharedStatusReader(self.name):
+            pass
+        self.writer.close()
+        self.assertFalse(os.path.exists(f'/dev/shm/{self.name}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
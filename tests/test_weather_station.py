@@ -189,6 +189,30 @@ class TestWeatherStation(unittest.TestCase):
             self.assertTrue(self.system.parse(byte))
         self.assertFalse(self.system.parse('\n'))
 
+    def test_peers(self):
+        first, second = ('127.0.0.1', 1), ('127.0.0.1', 2)
+        self.system.peer = first
+        for byte in 'r th':
+            self.assertTrue(self.system.parse(byte))
+        self.system.peer = second
+        for byte in 'r vh01':
+            self.assertTrue(self.system.parse(byte))
+        self.system.peer = first
+        self.assertTrue(self.system.parse('0'))
+        self.assertTrue(self.system.parse('1'))
+        response = self._parseString(self.system.parse('\n'))
+        self.assertEqual(response['Id'], 'th01')
+        self.system.peer = second
+        response = self._parseString(self.system.parse('\n'))
+        self.assertEqual(response['Id'], 'vh01')
+        self.assertEqual(self.system.msg, {})
+
+    def test_max_peers(self):
+        for port in range(self.system.max_peers + 10):
+            self.system.peer = ('127.0.0.1', port)
+            self.assertTrue(self.system.parse('r'))
+        self.assertEqual(len(self.system.msg), self.system.max_peers)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,55 @@
+import gc
+import os
+import socket
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from simulators.server import Simulator
+from simulators.zygote import Zygote, process_name
+
+
+class TestZygote(unittest.TestCase):
+
+    def setUp(self):
+        # The zygote freezes the garbage collector of the current process
+        self.addCleanup(gc.unfreeze)
+
+    def test_process_name(self):
+        self.assertEqual(process_name('acu'), '@acu')
+        self.assertEqual(process_name('solar_attenuator'), '@solar_attenuat')
+
+    def test_start_and_stop(self):
+        zygote = Zygote(['calmux', 'dbesm'])
+        with redirect_stdout(StringIO()):
+            pids = zygote.start()
+        self.assertGreater(gc.get_freeze_count(), 0)
+        for name, pid in pids.items():
+            self.assertNotEqual(pid, os.getpid())
+            with open(f'/proc/{pid}/comm', encoding='utf-8') as f:
+                self.assertEqual(f.read().strip(), process_name(name))
+
+        with socket.create_connection(('127.0.0.1', 12500), timeout=2) as s:
+            s.sendall(b'?\n')
+            self.assertTrue(s.recv(1024))
+
+        with redirect_stdout(StringIO()):
+            Simulator('calmux').stop()
+            Simulator('dbesm').stop()
+        for pid in pids.values():
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+    def test_already_running(self):
+        simulator = Simulator('calmux')
+        with redirect_stdout(StringIO()):
+            simulator.start(daemon=True)
+        self.addCleanup(simulator.stop)
+        zygote = Zygote(['calmux'])
+        with redirect_stdout(StringIO()):
+            pids = zygote.start()
+        # The forked simulator exits as soon as it finds its port taken
+        self.assertEqual(pids, {})
+
+
+if __name__ == '__main__':
+    unittest.main()